@@ -0,0 +1,52 @@
+"""
+外部服务后端
+搜索、大模型和元数据客户端的可替换实现，支持录制/回放和合成数据以便离线运行整个流水线
+"""
+
+from .latency import LatencyModel
+from .fixtures import FixtureStore
+from .search import (
+    SearchBackend,
+    TavilySearchBackend,
+    RecordingSearchBackend,
+    ReplaySearchBackend,
+    SyntheticSearchBackend,
+    create_search_backend,
+)
+from .llm import (
+    SyntheticChatClient,
+    RecordingChatClient,
+    ReplayChatClient,
+    create_llm_clients,
+    get_llm_clients,
+)
+from .metadata import (
+    MetadataBackend,
+    HttpMetadataBackend,
+    RecordingMetadataBackend,
+    ReplayMetadataBackend,
+    SyntheticMetadataBackend,
+    create_metadata_backend,
+)
+
+__all__ = [
+    "LatencyModel",
+    "FixtureStore",
+    "SearchBackend",
+    "TavilySearchBackend",
+    "RecordingSearchBackend",
+    "ReplaySearchBackend",
+    "SyntheticSearchBackend",
+    "create_search_backend",
+    "SyntheticChatClient",
+    "RecordingChatClient",
+    "ReplayChatClient",
+    "create_llm_clients",
+    "get_llm_clients",
+    "MetadataBackend",
+    "HttpMetadataBackend",
+    "RecordingMetadataBackend",
+    "ReplayMetadataBackend",
+    "SyntheticMetadataBackend",
+    "create_metadata_backend",
+]
@@ -0,0 +1,249 @@
+"""
+预置的大模型响应
+根据请求内容识别主题扩展、搜索规划、评分、关键词和列表生成等调用，返回格式正确的确定性响应，
+供合成LLM后端和本地OpenAI兼容桩服务共用
+"""
+
+import hashlib
+import json
+import re
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+
+SEARCH_TYPES = ["arxiv_papers", "github_repos", "huggingface_models", "academic_datasets"]
+
+# 生成提示词中搜索结果行的格式：1. [标题](链接) - 来源 - 摘要
+RESULT_LINE_PATTERN = re.compile(r"^\d+\. \[(.+?)\]\((\S+?)\) - (\S+) - (.*)$", re.MULTILINE)
+SCORING_ITEM_PATTERN = re.compile(r"结果 (\d+):")
+WORD_PATTERN = re.compile(r"[A-Za-z][A-Za-z0-9\-]{3,}|[\u4e00-\u9fff]{2,}")
+
+
+def stable_fraction(text: str) -> float:
+    """根据文本得到0-1之间的确定性伪随机数"""
+    return int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16) / 0xFFFFFFFF
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算token数（约4个字符一个token）"""
+    return max(1, len(text) // 4)
+
+
+def _messages_text(params: Dict[str, Any], role: str) -> str:
+    return "\n".join(
+        str(message.get("content") or "")
+        for message in params.get("messages", [])
+        if message.get("role") == role
+    )
+
+
+def extract_topic(prompt: str) -> str:
+    """从提示词中提取主题"""
+    # 主题扩展提示词单独一行给出主题（"主题：..." / "Topic: ..."）
+    labelled = re.search(r"^\s*(?:主题：|Topic:)\s*(.+?)\s*$", prompt, re.MULTILINE)
+    if labelled:
+        return labelled.group(1)
+    quoted = re.search(r'"([^"\n]{1,80})"', prompt)
+    if quoted:
+        return quoted.group(1)
+    awesome = re.search(r"Awesome (.+?) (?:列表|list)", prompt)
+    if awesome:
+        return awesome.group(1)
+    words = WORD_PATTERN.findall(prompt)
+    return " ".join(words[:3]) or "topic"
+
+
+def _expansion(topic: str) -> Dict[str, List[str]]:
+    return {
+        "extended_keywords": [topic, f"{topic} implementation", f"{topic} benchmark", f"{topic} survey"],
+        "related_concepts": [f"{topic} dataset", f"{topic} pretrained model", f"efficient {topic}"],
+        "search_queries": [f"{topic} paper", f"{topic} github", f"{topic} tutorial"],
+    }
+
+
+def _search_calls(topic: str, count: int = 4) -> List[Dict[str, str]]:
+    queries = [topic, f"{topic} implementation", f"{topic} pretrained model", f"{topic} dataset"]
+    return [
+        {
+            "name": "search_web",
+            "arguments": json.dumps(
+                {"query": queries[i % len(queries)], "search_type": SEARCH_TYPES[i % len(SEARCH_TYPES)], "max_results": 5},
+                ensure_ascii=False
+            ),
+        }
+        for i in range(count)
+    ]
+
+
+def _scores(prompt: str) -> Dict[str, Any]:
+    indices = [int(index) for index in SCORING_ITEM_PATTERN.findall(prompt)] or [1]
+    scores = []
+    for index in indices:
+        base = stable_fraction(f"{prompt[:200]}#{index}")
+        scores.append({
+            "result_index": index,
+            "relevance_score": round(0.5 + base * 0.5, 2),
+            "authority_score": round(0.4 + stable_fraction(f"a{index}{base}") * 0.6, 2),
+            "quality_score": round(0.4 + stable_fraction(f"q{index}{base}") * 0.6, 2),
+            "utility_score": round(0.4 + stable_fraction(f"u{index}{base}") * 0.6, 2),
+            "reasoning": "预置评分",
+        })
+    return {"scores": scores}
+
+
+def _keywords(prompt: str) -> Dict[str, List[str]]:
+    counts = Counter(word.lower() for word in WORD_PATTERN.findall(prompt))
+    return {"keywords": [word for word, _ in counts.most_common(8)] or ["awesome"]}
+
+
+def _awesome_list(prompt: str) -> str:
+    topic = extract_topic(prompt)
+    sections = {"📄 论文": [], "🛠️ 代码库": [], "🤗 模型": [], "🔗 其他资源": []}
+    for title, url, source, snippet in RESULT_LINE_PATTERN.findall(prompt):
+        if "arxiv" in source:
+            section = "📄 论文"
+        elif "github" in source:
+            section = "🛠️ 代码库"
+        elif "huggingface" in url:
+            section = "🤗 模型"
+        else:
+            section = "🔗 其他资源"
+        sections[section].append(f"- [{title}]({url}) - {snippet[:120]}")
+
+    lines = [f"# Awesome {topic}", "", f"> 精选的 {topic} 相关资源列表", ""]
+    for name, items in sections.items():
+        if items:
+            lines.extend([f"## {name}", ""] + items + [""])
+    return "\n".join(lines)
+
+
+def canned_reply(params: Dict[str, Any]) -> Tuple[Optional[str], List[Dict[str, str]]]:
+    """
+    根据请求生成预置响应
+
+    Args:
+        params: chat.completions.create 的请求参数
+
+    Returns:
+        Tuple[Optional[str], List[Dict[str, str]]]: 文本内容和工具调用列表（name/arguments）
+    """
+    prompt = _messages_text(params, "user")
+    system = _messages_text(params, "system")
+    tool_names = [tool.get("function", {}).get("name") for tool in params.get("tools") or []]
+
+    if tool_names:
+        topic = extract_topic(prompt)
+        calls = []
+        if "record_topic_expansion" in tool_names:
+            calls.append({
+                "name": "record_topic_expansion",
+                "arguments": json.dumps(_expansion(topic), ensure_ascii=False),
+            })
+        if "search_web" in tool_names:
+            calls.extend(_search_calls(topic))
+        return None, calls
+
+    if (params.get("response_format") or {}).get("type") == "json_object":
+        if '"scores"' in system:
+            payload = _scores(prompt)
+        elif '"extended_keywords"' in system:
+            payload = _expansion(extract_topic(prompt))
+        else:
+            payload = _keywords(prompt)
+        return json.dumps(payload, ensure_ascii=False), []
+
+    return _awesome_list(prompt), []
+
+
+def build_completion(
+    model: str,
+    content: Optional[str],
+    tool_calls: List[Dict[str, str]],
+    prompt_tokens: int
+) -> Dict[str, Any]:
+    """构建与OpenAI ChatCompletion格式一致的响应"""
+    message: Dict[str, Any] = {"role": "assistant", "content": content}
+    if tool_calls:
+        message["tool_calls"] = [
+            {"id": f"call_{i}", "type": "function", "function": call}
+            for i, call in enumerate(tool_calls)
+        ]
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": message,
+            "finish_reason": "tool_calls" if tool_calls else "stop",
+        }],
+        "usage": build_usage(prompt_tokens, content, tool_calls),
+    }
+
+
+def build_usage(prompt_tokens: int, content: Optional[str], tool_calls: List[Dict[str, str]]) -> Dict[str, int]:
+    """估算token用量"""
+    completion_text = (content or "") + "".join(call["arguments"] for call in tool_calls)
+    completion_tokens = estimate_tokens(completion_text)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def prompt_tokens_of(params: Dict[str, Any]) -> int:
+    """估算请求的输入token数"""
+    return estimate_tokens(json.dumps(params.get("messages", []), ensure_ascii=False))
+
+
+def build_chunks(
+    model: str,
+    content: Optional[str],
+    tool_calls: List[Dict[str, str]],
+    chunk_chars: int = 16,
+    usage: Optional[Dict[str, int]] = None
+) -> List[Dict[str, Any]]:
+    """
+    构建与OpenAI ChatCompletionChunk格式一致的流式分片
+    传入usage时（请求带 stream_options.include_usage）追加一个只含用量的分片
+    """
+    created = int(time.time())
+
+    def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> Dict[str, Any]:
+        return {
+            "id": "chatcmpl-stream",
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+
+    chunks = [chunk({"role": "assistant", "content": ""})]
+    for start in range(0, len(content or ""), chunk_chars):
+        chunks.append(chunk({"content": content[start:start + chunk_chars]}))
+    for index, call in enumerate(tool_calls):
+        chunks.append(chunk({"tool_calls": [{
+            "index": index, "id": f"call_{index}", "type": "function",
+            "function": {"name": call["name"], "arguments": ""},
+        }]}))
+        arguments = call["arguments"]
+        for start in range(0, len(arguments), chunk_chars):
+            chunks.append(chunk({"tool_calls": [{
+                "index": index, "function": {"arguments": arguments[start:start + chunk_chars]},
+            }]}))
+    chunks.append(chunk({}, "tool_calls" if tool_calls else "stop"))
+    if usage is not None:
+        usage_chunk = chunk({})
+        usage_chunk["choices"] = []
+        usage_chunk["usage"] = usage
+        chunks.append(usage_chunk)
+    return chunks
+
+
+def wants_stream_usage(params: Dict[str, Any]) -> bool:
+    """流式请求是否要求返回用量"""
+    return bool((params.get("stream_options") or {}).get("include_usage"))
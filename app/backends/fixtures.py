@@ -0,0 +1,57 @@
+"""
+录制数据存储
+把外部服务的请求和响应保存为JSON文件，供离线回放使用
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Dict, Optional
+
+
+class FixtureStore:
+    """
+    按请求内容寻址的录制数据目录
+    每个请求保存为 <root>/<namespace>/<sha1>.json，包含请求、响应和录制时的延迟
+    """
+
+    def __init__(self, root: str, namespace: str):
+        self.directory = os.path.join(root, namespace)
+
+    @staticmethod
+    def key(request: Dict[str, Any]) -> str:
+        """根据请求内容计算稳定的键"""
+        canonical = json.dumps(request, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def save(self, request: Dict[str, Any], response: Any, latency: float) -> str:
+        """
+        保存一次请求的响应
+
+        Returns:
+            str: 录制数据的键
+        """
+        key = self.key(request)
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(key), "w", encoding="utf-8") as f:
+            json.dump(
+                {"request": request, "response": response, "latency": latency},
+                f, ensure_ascii=False, indent=2, default=str
+            )
+        return key
+
+    def load(self, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        读取请求对应的录制数据
+
+        Returns:
+            Optional[Dict[str, Any]]: 包含response和latency的字典，未录制时返回None
+        """
+        path = self._path(self.key(request))
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
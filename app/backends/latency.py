@@ -0,0 +1,79 @@
+"""
+延迟模型
+为回放和合成后端模拟外部服务的响应延迟
+"""
+
+import asyncio
+import math
+import random
+from typing import Optional
+
+from app.utils.exceptions import ConfigException
+
+
+class LatencyModel:
+    """
+    延迟分布
+
+    支持的配置格式：
+    - none: 不等待
+    - recorded: 使用录制时的真实延迟（没有录制值时不等待）
+    - fixed:0.5: 固定0.5秒
+    - uniform:0.2,1.0: 0.2到1.0秒均匀分布
+    - lognormal:0.8,0.5: 中位数0.8秒、sigma为0.5的对数正态分布
+    """
+
+    def __init__(self, kind: str = "recorded", params: tuple = (), rng: Optional[random.Random] = None):
+        self.kind = kind
+        self.params = params
+        self.rng = rng or random.Random()
+
+    @classmethod
+    def parse(cls, spec: str, seed: Optional[int] = None) -> "LatencyModel":
+        """
+        解析延迟配置
+
+        Args:
+            spec: 配置字符串
+            seed: 随机种子，便于基准测试复现
+
+        Returns:
+            LatencyModel: 延迟模型
+        """
+        kind, _, raw_params = (spec or "recorded").strip().lower().partition(":")
+        try:
+            params = tuple(float(value) for value in raw_params.split(",") if value.strip())
+        except ValueError:
+            raise ConfigException(f"无效的延迟配置: {spec}")
+
+        expected = {"none": 0, "recorded": 0, "fixed": 1, "uniform": 2, "lognormal": 2}
+        if kind not in expected or len(params) != expected[kind]:
+            raise ConfigException(f"无效的延迟配置: {spec}")
+        return cls(kind, params, random.Random(seed))
+
+    def sample(self, recorded: Optional[float] = None) -> float:
+        """
+        采样一次延迟
+
+        Args:
+            recorded: 录制时的真实延迟
+
+        Returns:
+            float: 延迟秒数
+        """
+        if self.kind == "recorded":
+            return recorded or 0.0
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return self.rng.uniform(*self.params)
+        if self.kind == "lognormal":
+            median, sigma = self.params
+            return self.rng.lognormvariate(math.log(median), sigma)
+        return 0.0
+
+    async def wait(self, recorded: Optional[float] = None) -> None:
+        """按采样的延迟等待"""
+        delay = self.sample(recorded)
+        if delay > 0:
+            await asyncio.sleep(delay)
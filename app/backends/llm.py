@@ -0,0 +1,171 @@
+"""
+大模型后端
+提供与 openai.AsyncOpenAI 接口一致的客户端（chat.completions.create），
+LLMService无需区分真实API、录制/回放和合成数据
+"""
+
+import asyncio
+import time
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import openai
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+from app.utils.config import Settings, get_settings
+from app.utils.exceptions import APIException
+from app.utils.logger import get_logger
+from .canned import build_chunks, build_completion, build_usage, canned_reply, prompt_tokens_of, wants_stream_usage
+from .fixtures import FixtureStore
+from .latency import LatencyModel
+
+
+logger = get_logger(__name__)
+
+
+class _Completions:
+    def __init__(self, handler):
+        self.create = handler
+
+
+class _Chat:
+    def __init__(self, handler):
+        self.completions = _Completions(handler)
+
+
+class _ChatClient:
+    """仿照AsyncOpenAI的 client.chat.completions.create 调用路径"""
+
+    def __init__(self):
+        self.chat = _Chat(self._create)
+
+    async def _create(self, **params: Any) -> Any:
+        raise NotImplementedError
+
+
+async def _iterate_chunks(chunks: List[Dict[str, Any]], delay: float) -> AsyncIterator[ChatCompletionChunk]:
+    """按总延迟均匀地逐个返回流式分片"""
+    interval = delay / max(len(chunks), 1)
+    for data in chunks:
+        if interval > 0:
+            await asyncio.sleep(interval)
+        yield ChatCompletionChunk.model_validate(data)
+
+
+class SyntheticChatClient(_ChatClient):
+    """合成客户端：根据请求内容返回预置的确定性响应"""
+
+    def __init__(self, latency: LatencyModel):
+        super().__init__()
+        self.latency = latency
+
+    async def _create(self, **params: Any) -> Any:
+        content, tool_calls = canned_reply(params)
+        model = params.get("model", "synthetic")
+        prompt_tokens = prompt_tokens_of(params)
+
+        if params.get("stream"):
+            usage = build_usage(prompt_tokens, content, tool_calls) if wants_stream_usage(params) else None
+            return _iterate_chunks(build_chunks(model, content, tool_calls, usage=usage), self.latency.sample())
+
+        await self.latency.wait()
+        return ChatCompletion.model_validate(build_completion(model, content, tool_calls, prompt_tokens))
+
+
+class RecordingChatClient(_ChatClient):
+    """录制客户端：调用真实API并保存响应，流式响应保存为分片列表"""
+
+    def __init__(self, inner: Any, store: FixtureStore):
+        super().__init__()
+        self.inner = inner
+        self.store = store
+
+    async def _create(self, **params: Any) -> Any:
+        start = time.monotonic()
+        response = await self.inner.chat.completions.create(**params)
+        if not params.get("stream"):
+            self.store.save(params, response.model_dump(), time.monotonic() - start)
+            return response
+        return self._record_stream(params, response, start)
+
+    async def _record_stream(self, params: Dict[str, Any], stream: Any, start: float) -> AsyncIterator[Any]:
+        chunks = []
+        async for chunk in stream:
+            chunks.append(chunk.model_dump())
+            yield chunk
+        self.store.save(params, chunks, time.monotonic() - start)
+
+
+class ReplayChatClient(_ChatClient):
+    """回放客户端：按请求内容返回录制的响应"""
+
+    def __init__(self, store: FixtureStore, latency: LatencyModel):
+        super().__init__()
+        self.store = store
+        self.latency = latency
+
+    async def _create(self, **params: Any) -> Any:
+        fixture = self.store.load(params)
+        if fixture is None:
+            raise APIException(f"没有录制的大模型响应: {params.get('model')}", status_code=404)
+
+        if params.get("stream"):
+            return _iterate_chunks(fixture["response"], self.latency.sample(fixture.get("latency")))
+
+        await self.latency.wait(fixture.get("latency"))
+        return ChatCompletion.model_validate(fixture["response"])
+
+
+def _openai_client(api_key: Optional[str], settings: Settings, base_url: Optional[str] = None) -> openai.AsyncOpenAI:
+    return openai.AsyncOpenAI(
+        api_key=api_key or "missing-api-key",
+        base_url=base_url,
+        timeout=settings.request_timeout,
+        max_retries=0  # 重试由统一的重试策略负责
+    )
+
+
+def create_llm_clients(settings: Settings) -> Tuple[Any, Any]:
+    """
+    根据配置创建OpenAI和DeepSeek客户端
+
+    Args:
+        settings: 应用配置
+
+    Returns:
+        Tuple[Any, Any]: (OpenAI客户端, DeepSeek客户端)
+    """
+    latency = LatencyModel.parse(settings.backend_latency)
+    if settings.llm_backend == "synthetic":
+        return SyntheticChatClient(latency), SyntheticChatClient(latency)
+    if settings.llm_backend == "replay":
+        return (
+            ReplayChatClient(FixtureStore(settings.fixture_dir, "llm/gpt"), latency),
+            ReplayChatClient(FixtureStore(settings.fixture_dir, "llm/deepseek"), latency),
+        )
+
+    for name, key in (("OPENAI_API_KEY", settings.openai_api_key), ("DEEPSEEK_API_KEY", settings.deepseek_api_key)):
+        if not key:
+            logger.warning(f"⚠️ 未配置{name}，对应提供商的调用将会失败")
+
+    # DeepSeek使用OpenAI兼容的API
+    openai_client = _openai_client(settings.openai_api_key, settings, settings.openai_base_url)
+    deepseek_client = _openai_client(settings.deepseek_api_key, settings, settings.deepseek_base_url)
+    if settings.llm_backend == "record":
+        return (
+            RecordingChatClient(openai_client, FixtureStore(settings.fixture_dir, "llm/gpt")),
+            RecordingChatClient(deepseek_client, FixtureStore(settings.fixture_dir, "llm/deepseek")),
+        )
+    return openai_client, deepseek_client
+
+
+@lru_cache()
+def get_llm_clients() -> Tuple[Any, Any]:
+    """
+    获取进程内共享的大模型客户端（带缓存）
+    每次请求新建客户端会重复建立连接池，并发流式调用时可能出现连接挂起
+
+    Returns:
+        Tuple[Any, Any]: (OpenAI客户端, DeepSeek客户端)
+    """
+    return create_llm_clients(get_settings())
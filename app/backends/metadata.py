@@ -0,0 +1,215 @@
+"""
+元数据后端
+RerankerService通过统一接口获取arXiv论文和GitHub仓库的原始元数据：HTTP API、录制/回放和合成数据
+"""
+
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Protocol
+from xml.sax.saxutils import escape
+
+import aiohttp
+
+from app.utils.config import Settings
+from app.utils.exceptions import APIException
+from .canned import stable_fraction
+from .fixtures import FixtureStore
+from .latency import LatencyModel
+
+
+class MetadataBackend(Protocol):
+    """
+    元数据后端接口
+    fetch_arxiv返回arXiv API的Atom XML，fetch_github返回GitHub仓库API的JSON
+    """
+
+    name: str
+
+    async def fetch_arxiv(self, arxiv_id: str) -> str:
+        ...
+
+    async def fetch_github(self, repo_path: str) -> Dict[str, Any]:
+        ...
+
+    async def close(self) -> None:
+        ...
+
+
+class HttpMetadataBackend:
+    """通过HTTP调用arXiv和GitHub API，会话按需创建并在close时释放"""
+
+    name = "http"
+
+    def __init__(self):
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.github_api_base = "https://api.github.com"
+        self.arxiv_api_base = "http://export.arxiv.org/api/query"
+
+    def _ensure_session(self) -> aiohttp.ClientSession:
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=30),
+                headers={
+                    "User-Agent": "AwesomeAgent/1.0 (Academic Research Tool)"
+                }
+            )
+        return self.session
+
+    async def fetch_arxiv(self, arxiv_id: str) -> str:
+        api_url = f"{self.arxiv_api_base}?id_list={arxiv_id}"
+        async with self._ensure_session().get(api_url) as response:
+            self._raise_for_status(response, "arXiv")
+            return await response.text()
+
+    async def fetch_github(self, repo_path: str) -> Dict[str, Any]:
+        api_url = f"{self.github_api_base}/repos/{repo_path}"
+        async with self._ensure_session().get(api_url) as response:
+            self._raise_for_status(response, "GitHub")
+            return await response.json()
+
+    async def close(self) -> None:
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    @staticmethod
+    def _raise_for_status(response: aiohttp.ClientResponse, api_name: str) -> None:
+        """
+        非200响应转换为APIException，携带状态码和Retry-After供重试策略判断
+        GitHub配额耗尽时返回403和X-RateLimit-Reset，按429处理
+        """
+        if response.status == 200:
+            return
+
+        status = response.status
+        retry_after = response.headers.get("Retry-After")
+        if status == 403 and response.headers.get("X-RateLimit-Remaining") == "0":
+            status = 429
+            reset_at = response.headers.get("X-RateLimit-Reset")
+            if retry_after is None and reset_at and reset_at.isdigit():
+                retry_after = max(0, int(reset_at) - int(datetime.now(timezone.utc).timestamp()))
+
+        raise APIException(
+            f"{api_name} API请求失败: {response.status}",
+            status_code=status,
+            response_data={"retry_after": retry_after}
+        )
+
+
+class RecordingMetadataBackend:
+    """录制后端：调用真实API并保存原始响应"""
+
+    def __init__(self, inner: MetadataBackend, store: FixtureStore):
+        self.inner = inner
+        self.store = store
+        self.name = f"record:{inner.name}"
+
+    async def fetch_arxiv(self, arxiv_id: str) -> str:
+        start = time.monotonic()
+        xml_content = await self.inner.fetch_arxiv(arxiv_id)
+        self.store.save({"arxiv": arxiv_id}, xml_content, time.monotonic() - start)
+        return xml_content
+
+    async def fetch_github(self, repo_path: str) -> Dict[str, Any]:
+        start = time.monotonic()
+        repo_data = await self.inner.fetch_github(repo_path)
+        self.store.save({"github": repo_path}, repo_data, time.monotonic() - start)
+        return repo_data
+
+    async def close(self) -> None:
+        await self.inner.close()
+
+
+class ReplayMetadataBackend:
+    """回放后端：返回录制的原始响应，未录制的请求按404处理"""
+
+    name = "replay"
+
+    def __init__(self, store: FixtureStore, latency: LatencyModel):
+        self.store = store
+        self.latency = latency
+
+    async def _replay(self, request: Dict[str, str]) -> Any:
+        fixture = self.store.load(request)
+        if fixture is None:
+            raise APIException(f"没有录制的元数据响应: {request}", status_code=404)
+        await self.latency.wait(fixture.get("latency"))
+        return fixture["response"]
+
+    async def fetch_arxiv(self, arxiv_id: str) -> str:
+        return await self._replay({"arxiv": arxiv_id})
+
+    async def fetch_github(self, repo_path: str) -> Dict[str, Any]:
+        return await self._replay({"github": repo_path})
+
+    async def close(self) -> None:
+        pass
+
+
+class SyntheticMetadataBackend:
+    """合成后端：根据ID确定性地生成格式与真实API一致的元数据"""
+
+    name = "synthetic"
+
+    def __init__(self, latency: LatencyModel):
+        self.latency = latency
+
+    async def fetch_arxiv(self, arxiv_id: str) -> str:
+        await self.latency.wait()
+        fraction = stable_fraction(arxiv_id)
+        published = f"20{18 + int(fraction * 7)}-{1 + int(fraction * 120) % 12:02d}-15T00:00:00Z"
+        authors = "".join(
+            f"<author><name>Author {i + 1}</name></author>" for i in range(1 + int(fraction * 5))
+        )
+        comment = "<arxiv:comment>Accepted at NeurIPS</arxiv:comment>" if fraction > 0.5 else ""
+        return (
+            '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:arxiv="http://arxiv.org/schemas/atom">'
+            f"<entry><id>http://arxiv.org/abs/{escape(arxiv_id)}</id>"
+            f"<title>Synthetic paper {escape(arxiv_id)}</title>"
+            f"<published>{published}</published><updated>{published}</updated>"
+            f"<summary>Synthetic abstract for {escape(arxiv_id)}.</summary>{authors}"
+            '<category term="cs.LG"/><category term="cs.CL"/>'
+            f"{comment}</entry></feed>"
+        )
+
+    async def fetch_github(self, repo_path: str) -> Dict[str, Any]:
+        await self.latency.wait()
+        fraction = stable_fraction(repo_path)
+        return {
+            "full_name": repo_path,
+            "description": f"Synthetic repository {repo_path}",
+            "stargazers_count": int(fraction ** 2 * 50000),
+            "forks_count": int(fraction ** 2 * 8000),
+            "language": "Python",
+            "created_at": f"20{15 + int(fraction * 8)}-03-01T00:00:00Z",
+            "updated_at": "2024-06-01T00:00:00Z",
+            "topics": ["machine-learning"],
+            "has_issues": True,
+            "has_wiki": fraction > 0.3,
+            "has_pages": fraction > 0.6,
+            "size": int(fraction * 100000),
+        }
+
+    async def close(self) -> None:
+        pass
+
+
+def create_metadata_backend(settings: Settings) -> MetadataBackend:
+    """
+    根据配置创建元数据后端
+
+    Args:
+        settings: 应用配置
+
+    Returns:
+        MetadataBackend: 元数据后端
+    """
+    latency = LatencyModel.parse(settings.backend_latency)
+    store = FixtureStore(settings.fixture_dir, "metadata")
+    if settings.metadata_backend == "synthetic":
+        return SyntheticMetadataBackend(latency)
+    if settings.metadata_backend == "replay":
+        return ReplayMetadataBackend(store, latency)
+    if settings.metadata_backend == "record":
+        return RecordingMetadataBackend(HttpMetadataBackend(), store)
+    return HttpMetadataBackend()
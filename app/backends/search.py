@@ -0,0 +1,137 @@
+"""
+搜索后端
+SearchService通过统一接口调用搜索后端：Tavily、录制/回放和合成数据
+"""
+
+import asyncio
+import re
+import time
+from typing import Any, Dict, Optional, Protocol
+
+from tavily import TavilyClient
+
+from app.utils.config import Settings
+from app.utils.exceptions import APIException, ConfigException
+from .canned import stable_fraction
+from .fixtures import FixtureStore
+from .latency import LatencyModel
+
+
+class SearchBackend(Protocol):
+    """
+    搜索后端接口
+    返回与Tavily一致的响应结构：{"results": [{"title", "url", "content", "score", "published_date"}]}
+    """
+
+    name: str
+
+    async def search(self, **params: Any) -> Dict[str, Any]:
+        ...
+
+
+class TavilySearchBackend:
+    """Tavily搜索后端（同步客户端在线程中执行，不阻塞事件循环）"""
+
+    name = "tavily"
+
+    def __init__(self, api_key: Optional[str]):
+        # 未配置密钥时仍可创建，离线索引模式下不会发起调用
+        self.client = TavilyClient(api_key=api_key) if api_key else None
+
+    async def search(self, **params: Any) -> Dict[str, Any]:
+        if self.client is None:
+            raise ConfigException("使用Tavily搜索后端需要配置TAVILY_API_KEY")
+        return await asyncio.to_thread(self.client.search, **params)
+
+
+class RecordingSearchBackend:
+    """录制后端：调用真实后端并把请求和响应保存到录制目录"""
+
+    def __init__(self, inner: SearchBackend, store: FixtureStore):
+        self.inner = inner
+        self.store = store
+        self.name = f"record:{inner.name}"
+
+    async def search(self, **params: Any) -> Dict[str, Any]:
+        start = time.monotonic()
+        response = await self.inner.search(**params)
+        self.store.save(params, response, time.monotonic() - start)
+        return response
+
+
+class ReplaySearchBackend:
+    """回放后端：按请求内容读取录制的响应，并按延迟模型等待"""
+
+    name = "replay"
+
+    def __init__(self, store: FixtureStore, latency: LatencyModel):
+        self.store = store
+        self.latency = latency
+
+    async def search(self, **params: Any) -> Dict[str, Any]:
+        fixture = self.store.load(params)
+        if fixture is None:
+            raise APIException(f"没有录制的搜索响应: {params.get('query')}", status_code=404)
+        await self.latency.wait(fixture.get("latency"))
+        return fixture["response"]
+
+
+class SyntheticSearchBackend:
+    """合成后端：根据查询确定性地生成学术站点的搜索结果"""
+
+    name = "synthetic"
+
+    DEFAULT_DOMAINS = ["arxiv.org", "github.com", "huggingface.co"]
+
+    def __init__(self, latency: LatencyModel):
+        self.latency = latency
+
+    async def search(self, **params: Any) -> Dict[str, Any]:
+        await self.latency.wait()
+        query = params.get("query", "")
+        max_results = int(params.get("max_results", 5))
+        domains = params.get("include_domains") or self.DEFAULT_DOMAINS
+        slug = re.sub(r"[^a-z0-9]+", "-", query.lower()).strip("-")[:40] or "topic"
+        return {"results": [self._make_result(query, slug, domains[i % len(domains)], i) for i in range(max_results)]}
+
+    @staticmethod
+    def _make_result(query: str, slug: str, domain: str, index: int) -> Dict[str, Any]:
+        fraction = stable_fraction(f"{query}#{index}")
+        if domain == "arxiv.org":
+            url = f"https://arxiv.org/abs/24{1 + int(fraction * 120) % 12:02d}.{int(fraction * 1e5):05d}"
+            title = f"{query.title()}: A Study ({index + 1})"
+        elif domain == "github.com":
+            url = f"https://github.com/synthetic-{index}/{slug}"
+            title = f"{slug} - reference implementation"
+        else:
+            url = f"https://{domain}/synthetic/{slug}-{index}"
+            title = f"{query} ({domain})"
+        return {
+            "title": title,
+            "url": url,
+            "content": f"{query}. Synthetic result {index + 1} covering {query} methods, code and benchmarks. " * 3,
+            "score": round(max(0.05, 0.95 - index * 0.05 - fraction * 0.1), 3),
+            "published_date": f"2024-{1 + int(fraction * 12) % 12:02d}-01",
+        }
+
+
+def create_search_backend(settings: Settings) -> SearchBackend:
+    """
+    根据配置创建搜索后端
+
+    Args:
+        settings: 应用配置
+
+    Returns:
+        SearchBackend: 搜索后端
+    """
+    latency = LatencyModel.parse(settings.backend_latency)
+    store = FixtureStore(settings.fixture_dir, "search")
+    if settings.search_backend == "synthetic":
+        return SyntheticSearchBackend(latency)
+    if settings.search_backend == "replay":
+        return ReplaySearchBackend(store, latency)
+    tavily = TavilySearchBackend(settings.tavily_api_key)
+    if settings.search_backend == "record":
+        return RecordingSearchBackend(tavily, store)
+    return tavily
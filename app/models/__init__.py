@@ -6,6 +6,8 @@
 from .request_models import GenerateAwesomeListRequest
 from .response_models import GenerateAwesomeListResponse, HealthCheckResponse, ErrorResponse
 from .search_models import SearchResult, SearchResults, ExtendedTopic
+from .llm_models import KeywordsOutput, TopicExpansionOutput, ResultScore, ScoringOutput, SearchWebCall
+from .result_record import ResultRecord, ResultSet, canonicalize_url
 
 __all__ = [
     "GenerateAwesomeListRequest",
@@ -15,4 +17,12 @@ __all__ = [
     "SearchResult",
     "SearchResults",
     "ExtendedTopic",
+    "KeywordsOutput",
+    "TopicExpansionOutput",
+    "ResultScore",
+    "ScoringOutput",
+    "SearchWebCall",
+    "ResultRecord",
+    "ResultSet",
+    "canonicalize_url",
 ] 
\ No newline at end of file
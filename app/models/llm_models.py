@@ -0,0 +1,115 @@
+"""
+LLM结构化输出数据模型
+定义要求大模型以JSON或工具调用返回的数据结构，用于校验模型输出
+"""
+
+from typing import List, Literal
+from pydantic import BaseModel, Field
+
+
+SearchType = Literal[
+    "arxiv_papers",
+    "github_repos",
+    "research_code",
+    "academic_datasets",
+    "conference_papers",
+    "huggingface_models",
+]
+
+
+class KeywordsOutput(BaseModel):
+    """
+    关键词提取结果
+    """
+
+    keywords: List[str] = Field(
+        ...,
+        description="按重要性排序的关键词列表",
+        example=["Vue.js", "组件化", "响应式"]
+    )
+
+
+class TopicExpansionOutput(BaseModel):
+    """
+    主题扩展结果
+    """
+
+    extended_keywords: List[str] = Field(
+        ...,
+        description="覆盖主题不同方面的扩展关键词",
+        example=["Vue.js", "Vue 3", "Composition API"]
+    )
+
+    related_concepts: List[str] = Field(
+        default_factory=list,
+        description="与主题相关的技术术语或概念",
+        example=["虚拟DOM", "响应式系统"]
+    )
+
+    search_queries: List[str] = Field(
+        default_factory=list,
+        description="能够找到高质量资源的搜索查询",
+        example=["Vue.js 官方文档", "Vue.js 组件库"]
+    )
+
+
+class ResultScore(BaseModel):
+    """
+    单个搜索结果的大模型评分
+    """
+
+    result_index: int = Field(
+        ...,
+        description="结果序号（从1开始）",
+        ge=1,
+        example=1
+    )
+
+    relevance_score: float = Field(..., description="相关性评分", ge=0, le=1, example=0.85)
+    authority_score: float = Field(..., description="权威性评分", ge=0, le=1, example=0.9)
+    quality_score: float = Field(..., description="质量评分", ge=0, le=1, example=0.8)
+    utility_score: float = Field(..., description="实用性评分", ge=0, le=1, example=0.88)
+
+    reasoning: str = Field(
+        default="无详细说明",
+        description="评分理由",
+        example="GitHub高星项目，实现完整"
+    )
+
+
+class ScoringOutput(BaseModel):
+    """
+    一批搜索结果的大模型评分
+    """
+
+    scores: List[ResultScore] = Field(
+        ...,
+        description="每个结果的评分"
+    )
+
+
+class SearchWebCall(BaseModel):
+    """
+    search_web工具调用参数
+    """
+
+    query: str = Field(
+        ...,
+        description="搜索查询关键词",
+        min_length=1,
+        example="vision transformer"
+    )
+
+    search_type: SearchType = Field(
+        ...,
+        description="搜索类型",
+        example="arxiv_papers"
+    )
+
+    max_results: int = Field(
+        default=5,
+        description="最大结果数量",
+        ge=1,
+        le=20,
+        example=5
+    )
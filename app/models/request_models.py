@@ -49,6 +49,20 @@ class GenerateAwesomeListRequest(BaseModel):
         pattern="^(rule_based|llm_based)$",
         example="rule_based"
     )
+    
+    force_refresh: bool = Field(
+        default=False,
+        alias="forceRefresh",
+        description="是否跳过历史复用，强制重新生成",
+        example=False
+    )
+    
+    lane: str = Field(
+        default="interactive",
+        description="外部调用的调度通道 (interactive: 用户请求, background: 批量生成，配额不足时让位于用户请求)",
+        pattern="^(interactive|background)$",
+        example="interactive"
+    )
 
     class Config:
         """Pydantic配置"""
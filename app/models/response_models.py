@@ -43,6 +43,24 @@ class GenerateAwesomeListResponse(BaseModel):
         description="实际使用的大语言模型",
         example="gpt-4-turbo"
     )
+    
+    history_id: Optional[int] = Field(
+        default=None,
+        description="对应的生成历史ID",
+        example=42
+    )
+    
+    reused: bool = Field(
+        default=False,
+        description="是否直接复用了时效窗口内的生成历史",
+        example=False
+    )
+    
+    degradations: List[str] = Field(
+        default_factory=list,
+        description="服务过载时应用的降级措施 (rule_based_scoring, skip_keyword_llm, reduced_search, preempted_calls)",
+        example=[]
+    )
 
     class Config:
         """Pydantic配置"""
@@ -0,0 +1,157 @@
+"""
+内部搜索结果记录
+流水线内部使用的轻量结果表示，只在序列化响应时才转换为pydantic模型
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from .search_models import SearchResult, SearchResults
+
+
+def canonicalize_url(url: str) -> Optional[str]:
+    """
+    规范化URL：小写协议和域名，去掉片段和路径末尾的斜杠
+
+    Args:
+        url: 原始URL
+
+    Returns:
+        Optional[str]: 规范化后的URL，不是有效的http(s)地址时返回None
+    """
+    # 只做字符串切分而不调用urlsplit：结果构建是热路径，每个结果都会规范化一次
+    scheme, separator, rest = url.strip().partition("://")
+    scheme = scheme.lower()
+    if not separator or scheme not in ("http", "https"):
+        return None
+
+    rest = rest.split("#", 1)[0]
+    host_end = len(rest)
+    for delimiter in "/?":
+        index = rest.find(delimiter)
+        if index != -1 and index < host_end:
+            host_end = index
+    host = rest[:host_end].lower()
+    if not host:
+        return None
+
+    path, question_mark, query = rest[host_end:].partition("?")
+    path = path.rstrip("/") or "/"
+    return f"{scheme}://{host}{path}{question_mark}{query}"
+
+
+@dataclass(eq=False)
+class ResultRecord:
+    """
+    单个搜索结果的内部记录
+
+    URL在创建时规范化为字符串，标题和内容预先转为小写，
+    features用于缓存按查询计算的特征（如相关性），避免重复计算
+    """
+    __slots__ = (
+        "title", "url", "content", "score", "source", "published_date",
+        "title_lower", "content_lower", "features",
+    )
+
+    title: str
+    url: str
+    content: str
+    score: float
+    source: str
+    published_date: Optional[str]
+    title_lower: str
+    content_lower: str
+    features: Dict[Any, Any]
+
+    @classmethod
+    def create(
+        cls,
+        title: str,
+        url: str,
+        content: str,
+        score: float,
+        source: str,
+        published_date: Optional[str] = None
+    ) -> "ResultRecord":
+        """
+        创建记录，校验规则与SearchResult一致（有效的http(s) URL，评分在0-1之间）
+
+        Raises:
+            ValueError: URL无效或评分越界
+        """
+        canonical_url = canonicalize_url(url)
+        if canonical_url is None:
+            raise ValueError(f"无效的URL: {url!r}")
+        score = float(score)
+        if not 0 <= score <= 1:
+            raise ValueError(f"评分超出范围: {score}")
+        title = title or ""
+        content = content or ""
+        return cls(
+            title, canonical_url, content, score, source, published_date,
+            title.lower(), content.lower(), {}
+        )
+
+    @classmethod
+    def from_search_result(cls, result: SearchResult) -> "ResultRecord":
+        """从API模型创建记录"""
+        return cls.create(
+            title=result.title,
+            url=str(result.url),
+            content=result.content,
+            score=result.score,
+            source=result.source,
+            published_date=result.published_date
+        )
+
+    @property
+    def text_lower(self) -> str:
+        """小写的标题和内容"""
+        return f"{self.title_lower} {self.content_lower}"
+
+    def with_score(self, score: float) -> "ResultRecord":
+        """返回评分替换后的新记录（共享已缓存的文本和特征）"""
+        return ResultRecord(
+            self.title, self.url, self.content, min(1.0, max(0.0, score)), self.source,
+            self.published_date, self.title_lower, self.content_lower, self.features
+        )
+
+    def with_source(self, source: str) -> "ResultRecord":
+        """返回来源替换后的新记录（同一记录可能同时被本地索引和预热存储引用，不能原地修改）"""
+        return ResultRecord(
+            self.title, self.url, self.content, self.score, source,
+            self.published_date, self.title_lower, self.content_lower, self.features
+        )
+
+    def to_search_result(self) -> SearchResult:
+        """转换为API响应使用的pydantic模型"""
+        return SearchResult(
+            title=self.title,
+            url=self.url,
+            content=self.content,
+            score=self.score,
+            source=self.source,
+            published_date=self.published_date
+        )
+
+
+@dataclass
+class ResultSet:
+    """
+    一组搜索结果的内部表示，对应API层的SearchResults
+    """
+    query: str
+    results: List[ResultRecord]
+    total_count: int
+    search_time: float
+    filters_applied: Dict[str, Any] = field(default_factory=dict)
+
+    def to_search_results(self) -> SearchResults:
+        """转换为API响应使用的pydantic模型"""
+        return SearchResults(
+            query=self.query,
+            results=[record.to_search_result() for record in self.results],
+            total_count=self.total_count,
+            search_time=self.search_time,
+            filters_applied=self.filters_applied
+        )
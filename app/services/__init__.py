@@ -8,6 +8,14 @@ from .llm_service import LLMService
 from .awesome_list_service import AwesomeListService
 from .intelligent_search_service import IntelligentSearchService
 from .reranker_service import RerankerService
+from .llm_router import LLMRouter, get_llm_router
+from .local_index import LocalIndex, get_local_index
+from .history_store import HistoryStore, HistoryEntry, get_history_store
+from .topic_canonicalizer import TopicCanonicalizer, CanonicalTopic, get_topic_canonicalizer, topic_key, request_key
+from .response_cache import ResponseCache, get_response_cache
+from .warm_store import WarmStore, PartialOutputs, get_warm_store, warming, is_warming, collect_outputs
+from .cache_warmer import CacheWarmer, WarmJob, get_cache_warmer
+from .admission import AdmissionController, get_admission_controller, current_degradations, is_degraded
 
 __all__ = [
     "SearchService",
@@ -15,4 +23,31 @@ __all__ = [
     "AwesomeListService",
     "IntelligentSearchService",
     "RerankerService",
+    "LLMRouter",
+    "get_llm_router",
+    "LocalIndex",
+    "get_local_index",
+    "HistoryStore",
+    "HistoryEntry",
+    "get_history_store",
+    "TopicCanonicalizer",
+    "CanonicalTopic",
+    "get_topic_canonicalizer",
+    "topic_key",
+    "request_key",
+    "ResponseCache",
+    "get_response_cache",
+    "WarmStore",
+    "get_warm_store",
+    "warming",
+    "is_warming",
+    "PartialOutputs",
+    "collect_outputs",
+    "CacheWarmer",
+    "WarmJob",
+    "get_cache_warmer",
+    "AdmissionController",
+    "get_admission_controller",
+    "current_degradations",
+    "is_degraded",
 ] 
\ No newline at end of file
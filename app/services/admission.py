@@ -0,0 +1,169 @@
+"""
+准入控制模块
+在生成流水线前统计执行中和排队中的生成任务：
+负载超过软阈值时自动降级（大模型评分改为规则评分、跳过关键词提取的大模型调用、减少搜索调用），
+执行槽位和等待队列都已占满（或排队超时）时快速拒绝，由接口返回503和Retry-After
+"""
+
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, FrozenSet, List, Tuple
+
+from app.utils import get_settings, get_metrics, LoggerMixin, OverloadedException
+
+
+# 降级措施（通过响应的 degradations 字段和 X-Degraded 响应头返回）
+RULE_BASED_SCORING = "rule_based_scoring"   # 大模型评分改为规则评分
+SKIP_KEYWORD_LLM = "skip_keyword_llm"       # 跳过从生成内容中提取关键词的大模型调用
+REDUCED_SEARCH = "reduced_search"           # 减少搜索调用次数
+PREEMPTED_CALLS = "preempted_calls"         # 后台或预热任务的部分外部调用被用户请求抢占
+
+# 当前生成任务应用的降级措施，流水线各阶段据此调整
+_degradations: ContextVar[FrozenSet[str]] = ContextVar("degradations", default=frozenset())
+
+
+def is_degraded(degradation: str) -> bool:
+    """当前生成任务是否应用了指定的降级措施"""
+    return degradation in _degradations.get()
+
+
+def current_degradations() -> List[str]:
+    """当前生成任务应用的降级措施"""
+    return sorted(_degradations.get())
+
+
+class AdmissionController(LoggerMixin):
+    """
+    生成任务的准入控制器
+
+    - 负载（执行中 + 排队中）>= soft_limit: 大模型评分改为规则评分，跳过关键词提取的大模型调用
+    - 负载 >= search_limit: 另外减少搜索调用
+    - 执行槽位已满且等待队列已满，或排队超过 queue_timeout 秒: 拒绝（OverloadedException）
+    """
+
+    # 建议重试间隔的上下限（秒）
+    MIN_RETRY_AFTER = 1
+    MAX_RETRY_AFTER = 120
+    # 生成耗时滑动平均的平滑系数
+    DURATION_ALPHA = 0.2
+
+    def __init__(
+        self,
+        max_inflight: int,
+        max_queue: int,
+        queue_timeout: float,
+        soft_limit: int,
+        search_limit: int
+    ):
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.soft_limit = soft_limit
+        self.search_limit = search_limit
+        self.metrics = get_metrics()
+        self.inflight = 0
+        self.queued = 0
+        self._slots = asyncio.Semaphore(max_inflight)
+        self._avg_duration = 10.0
+
+    @property
+    def load(self) -> int:
+        return self.inflight + self.queued
+
+    def degradations_for(self, load: int) -> Tuple[str, ...]:
+        """给定负载下应用的降级措施"""
+        degradations: Tuple[str, ...] = ()
+        if load >= self.soft_limit:
+            degradations += (RULE_BASED_SCORING, SKIP_KEYWORD_LLM)
+        if load >= self.search_limit:
+            degradations += (REDUCED_SEARCH,)
+        return degradations
+
+    def retry_after(self) -> int:
+        """按平均生成耗时估计排队任务全部完成所需的时间（秒）"""
+        estimate = self._avg_duration * (self.queued + 1) / max(1, self.max_inflight)
+        return int(min(self.MAX_RETRY_AFTER, max(self.MIN_RETRY_AFTER, math.ceil(estimate))))
+
+    def _reject(self, reason: str) -> OverloadedException:
+        retry_after = self.retry_after()
+        self.metrics.increment("admission_total", outcome="rejected", reason=reason)
+        self.logger.warning(
+            f"🚫 服务过载，拒绝生成请求（{reason}，执行中 {self.inflight}，排队 {self.queued}），"
+            f"建议 {retry_after} 秒后重试"
+        )
+        return OverloadedException(
+            "服务繁忙，请稍后重试",
+            retry_after=retry_after,
+            details={"reason": reason, "inflight": self.inflight, "queued": self.queued}
+        )
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[Tuple[str, ...]]:
+        """
+        申请执行一个生成任务，上下文内为该任务应用的降级措施
+
+        Raises:
+            OverloadedException: 等待队列已满或排队超时
+        """
+        if self.inflight >= self.max_inflight and self.queued >= self.max_queue:
+            raise self._reject("queue_full")
+
+        degradations = self.degradations_for(self.load)
+        self.queued += 1
+        wait_start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise self._reject("queue_timeout")
+        finally:
+            self.queued -= 1
+        self.metrics.observe("admission_queue_seconds", time.perf_counter() - wait_start)
+        self.metrics.increment("admission_total", outcome="degraded" if degradations else "admitted")
+
+        self.inflight += 1
+        token = _degradations.set(frozenset(degradations))
+        start = time.perf_counter()
+        try:
+            yield degradations
+        finally:
+            _degradations.reset(token)
+            elapsed = time.perf_counter() - start
+            self._avg_duration += self.DURATION_ALPHA * (elapsed - self._avg_duration)
+            self.inflight -= 1
+            self._slots.release()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """当前负载和阈值"""
+        return {
+            "inflight": self.inflight,
+            "queued": self.queued,
+            "max_inflight": self.max_inflight,
+            "max_queue": self.max_queue,
+            "soft_limit": self.soft_limit,
+            "search_limit": self.search_limit,
+            "degradations": list(self.degradations_for(self.load)),
+            "avg_duration": round(self._avg_duration, 3),
+            "retry_after": self.retry_after(),
+        }
+
+
+@lru_cache()
+def get_admission_controller() -> AdmissionController:
+    """
+    获取进程内共享的准入控制器（带缓存）
+
+    Returns:
+        AdmissionController: 准入控制器实例
+    """
+    settings = get_settings()
+    return AdmissionController(
+        max_inflight=settings.admission_max_inflight,
+        max_queue=settings.admission_max_queue,
+        queue_timeout=settings.admission_queue_timeout,
+        soft_limit=settings.admission_soft_limit,
+        search_limit=settings.admission_search_limit,
+    )
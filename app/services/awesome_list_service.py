@@ -4,20 +4,28 @@ Awesome List 核心服务模块
 """
 
 import asyncio
-from typing import List, Dict, Any, Optional, Tuple
+import time
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from datetime import datetime
 
 from app.models import (
     GenerateAwesomeListRequest,
     GenerateAwesomeListResponse,
-    SearchResults,
+    ResultSet,
     ExtendedTopic
 )
 from app.services.search_service import SearchService
 from app.services.llm_service import LLMService
 from app.services.intelligent_search_service import IntelligentSearchService
 from app.services.reranker_service import RerankerService
-from app.utils import get_settings, get_logger, AwesomeAgentException, LoggerMixin
+from app.services.history_store import HistoryEntry, get_history_store
+from app.services.topic_canonicalizer import get_topic_canonicalizer, request_key
+from app.services.warm_store import PartialOutputs, collect_outputs, get_warm_store, is_warming
+from app.services.admission import (
+    current_degradations, is_degraded, PREEMPTED_CALLS, RULE_BASED_SCORING, SKIP_KEYWORD_LLM
+)
+from app.utils import get_settings, get_logger, get_metrics, preempted_calls, AwesomeAgentException, LoggerMixin
 
 
 class AwesomeListService(LoggerMixin):
@@ -32,6 +40,58 @@ class AwesomeListService(LoggerMixin):
         self.llm_service = LLMService()
         self.intelligent_search_service = IntelligentSearchService()
         self.reranker_service = RerankerService()
+        self.metrics = get_metrics()
+        # 本次请求各阶段的耗时（秒），随生成历史一起保存
+        self.stage_timings: Dict[str, float] = {}
+    
+    @contextmanager
+    def _stage(self, pipeline: str, stage: str) -> Iterator[None]:
+        """统计流水线阶段耗时，同时写入指标和本次请求的阶段耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stage_timings[stage] = round(elapsed, 4)
+            self.metrics.observe("pipeline_stage_seconds", elapsed, pipeline=pipeline, stage=stage)
+    
+    async def generate(
+        self,
+        request: GenerateAwesomeListRequest,
+        pipeline: str
+    ) -> GenerateAwesomeListResponse:
+        """
+        按生成模式（basic / intelligent）执行流水线
+        
+        任务被取消（如客户端断开连接）时，流水线中未完成的搜索、元数据获取和大模型调用随之取消，
+        已完成的搜索结果和元数据写入预热存储，重试时不必再次调用外部服务；
+        后台或预热任务有外部调用被抢占时，响应的 degradations 包含 preempted_calls
+        """
+        method = self.generate_awesome_list if pipeline == "basic" else self.generate_awesome_list_intelligent
+        with collect_outputs() as outputs:
+            try:
+                response = await method(request)
+                if preempted_calls() and not response.reused:
+                    response.degradations.append(PREEMPTED_CALLS)
+                return response
+            except asyncio.CancelledError:
+                self.metrics.increment("pipeline_cancelled_total", pipeline=pipeline)
+                self.logger.info(f"🛑 生成任务已取消 [{pipeline}] {request.topic}")
+                await self._save_partial_outputs(outputs)
+                raise
+    
+    async def _save_partial_outputs(self, outputs: PartialOutputs) -> None:
+        """保存被取消的任务已完成的外部调用结果"""
+        if not outputs or not self.settings.warm_enabled:
+            return
+        try:
+            await get_warm_store().save_outputs_async(outputs)
+            self.metrics.increment("partial_outputs_saved_total", len(outputs))
+            self.logger.info(
+                f"💾 已保存被取消任务的 {len(outputs.searches)} 个搜索结果和 {len(outputs.metadata)} 个元数据"
+            )
+        except Exception as e:
+            self.logger.warning(f"⚠️ 保存被取消任务的部分结果失败: {e}")
     
     async def generate_awesome_list(
         self, 
@@ -50,40 +110,46 @@ class AwesomeListService(LoggerMixin):
         start_time = datetime.now()
         self.logger.info(f"🚀 开始传统搜索模式，主题: {request.topic}")
         
+        reused = await self._reuse_history(request, "basic", start_time)
+        if reused is not None:
+            return reused
+        
         try:
             # 步骤1：直接搜索用户输入的关键词
             self.logger.info("📍 步骤1/3: 直接搜索用户关键词")
-            search_results = await self.search_service.search_topic(
-                topic=request.topic,
-                max_results=request.max_results,
-                search_depth="basic",
-                academic_only=True
-            )
+            with self._stage("basic", "search"):
+                search_results = await self.search_service.search_topic(
+                    topic=request.topic,
+                    max_results=request.max_results,
+                    search_depth="basic",
+                    academic_only=True
+                )
             self.logger.info(f"✅ 搜索完成，找到 {len(search_results.results)} 个结果")
 
             # 步骤2：基于规则的重排序优化（传统搜索默认使用规则评估）
-            scoring_method = request.scoring_method or "rule_based"
+            scoring_method = self._scoring_method(request, "rule_based")
             self.logger.info(f"📍 步骤2/3: 应用重排序优化 (评分方法: {scoring_method})")
-            search_results = await self.reranker_service.rerank_search_results(
-                search_results=search_results,
-                query=request.topic,
-                target_count=request.max_results,
-                scoring_method=scoring_method
-            )
+            with self._stage("basic", "rerank"):
+                search_results = await self.reranker_service.rerank_search_results(
+                    search_results=search_results,
+                    query=request.topic,
+                    target_count=request.max_results,
+                    scoring_method=scoring_method
+                )
             
             # 步骤3：LLM整理成Awesome List
             self.logger.info("📍 步骤3/3: LLM整理搜索结果")
-            awesome_list_content = await self.llm_service.generate_awesome_list(
-                topic=request.topic,
-                search_results=search_results,
-                language=request.language,
-                model=request.model
-            )
+            with self._stage("basic", "generate"):
+                awesome_list_content = await self.llm_service.generate_awesome_list(
+                    topic=request.topic,
+                    search_results=search_results,
+                    language=request.language,
+                    model=request.model
+                )
             
-            # 从生成内容中提取关键词
-            keywords = await self.llm_service.extract_keywords(
-                text=awesome_list_content,
-                max_keywords=8
+            # 从生成内容中提取关键词（过载降级时直接使用主题）
+            keywords = await self._extract_keywords(
+                "basic", awesome_list_content, max_keywords=8, fallback=[request.topic]
             )
             
             # 计算处理时间
@@ -98,13 +164,15 @@ class AwesomeListService(LoggerMixin):
                 f"评分方法: {scoring_method}"
             )
             
-            return GenerateAwesomeListResponse(
+            response = GenerateAwesomeListResponse(
                 awesome_list=awesome_list_content,
                 keywords=keywords,
                 total_results=search_results.total_count,
                 processing_time=processing_time,
                 model_used=model_used
             )
+            response.history_id = await self._record_history(request, "basic", response, search_results)
+            return response
             
         except Exception as e:
             self.logger.error(f"❌ 传统搜索模式失败: {e}", exc_info=True)
@@ -117,6 +185,7 @@ class AwesomeListService(LoggerMixin):
         """
         智能生成Awesome List（智能搜索模式）
         流程：LLM扩展主题 → Function Calling搜索各个扩展主题 → 基于LLM重排序 → 整理成list
+        合并规划模式下主题扩展和搜索计划由同一次LLM调用给出
         
         Args:
             request: 生成请求
@@ -127,53 +196,77 @@ class AwesomeListService(LoggerMixin):
         start_time = datetime.now()
         self.logger.info(f"🤖 开始智能搜索模式，主题: {request.topic}")
         
+        reused = await self._reuse_history(request, "intelligent", start_time)
+        if reused is not None:
+            return reused
+        
+        # 智能搜索默认使用LLM评估；规则评分随搜索结果到达逐批进行，
+        # 大模型评分需要整体分批，在搜索完成后统一提交
+        scoring_method = self._scoring_method(request, "llm_based")
+        reranker = self.reranker_service.incremental(request.topic, request.max_results, scoring_method)
+        on_results = reranker.submit if scoring_method == "rule_based" else None
+        
         try:
-            # 步骤1：LLM扩展主题
-            self.logger.info("📍 步骤1/4: LLM分析并扩展主题")
-            extended_topic = await self.llm_service.expand_topic(
-                topic=request.topic,
-                language=request.language
-            )
-            
-            # 步骤2：使用Function Calling搜索各个扩展主题
-            self.logger.info("📍 步骤2/4: Function Calling搜索扩展主题")
-            search_results = await self.intelligent_search_service.intelligent_search_with_topics(
-                original_topic=request.topic,
-                extended_topic=extended_topic,
-                language=request.language,
-                model=request.model,
-                max_results=request.max_results
-            )
+            if self.settings.intelligent_planning_mode == "combined":
+                # 步骤1-2：同一次LLM调用扩展主题并制定搜索计划，搜索调用随流式输出立即执行
+                self.logger.info("📍 步骤1-2/4: LLM一次性扩展主题并制定搜索计划，边规划边搜索")
+                with self._stage("intelligent", "plan_search"):
+                    extended_topic, search_results = await self.intelligent_search_service.plan_and_search(
+                        topic=request.topic,
+                        language=request.language,
+                        model=request.model,
+                        max_results=request.max_results,
+                        on_results=on_results
+                    )
+            else:
+                # 步骤1：LLM扩展主题
+                self.logger.info("📍 步骤1/4: LLM分析并扩展主题")
+                with self._stage("intelligent", "expand"):
+                    extended_topic = await self.llm_service.expand_topic(
+                        topic=request.topic,
+                        language=request.language
+                    )
+                
+                # 步骤2：使用Function Calling搜索各个扩展主题
+                self.logger.info("📍 步骤2/4: Function Calling搜索扩展主题")
+                with self._stage("intelligent", "search"):
+                    search_results = await self.intelligent_search_service.intelligent_search_with_topics(
+                        original_topic=request.topic,
+                        extended_topic=extended_topic,
+                        language=request.language,
+                        model=request.model,
+                        max_results=request.max_results,
+                        on_results=on_results
+                    )
             self.logger.info(f"✅ 智能搜索完成，找到 {len(search_results.results)} 个结果")
+            await self._learn_topic_synonyms(request.topic, extended_topic)
 
-            # 步骤3：基于LLM的智能重排序优化（智能搜索默认使用LLM评估）
-            scoring_method = request.scoring_method or "llm_based"
+            # 步骤3：智能重排序优化（已完成的评分直接复用，超时未完成的使用原始分数）
             self.logger.info(f"📍 步骤3/4: 应用智能重排序优化 (评分方法: {scoring_method})")
-            search_results = await self.reranker_service.rerank_search_results(
-                search_results=search_results,
-                query=request.topic,
-                target_count=request.max_results,
-                scoring_method=scoring_method
-            )
+            with self._stage("intelligent", "rerank"):
+                search_results = await reranker.ranked_results(
+                    search_results,
+                    timeout=self.settings.rerank_timeout
+                )
             
             # 步骤4：LLM整理成Awesome List
             self.logger.info("📍 步骤4/4: LLM整理搜索结果")
-            awesome_list_content = await self.llm_service.generate_awesome_list(
-                topic=request.topic,
-                search_results=search_results,
-                language=request.language,
-                model=request.model
-            )
+            with self._stage("intelligent", "generate"):
+                awesome_list_content = await self.llm_service.generate_awesome_list(
+                    topic=request.topic,
+                    search_results=search_results,
+                    language=request.language,
+                    model=request.model
+                )
             
             # 使用扩展主题的丰富关键词信息
             all_keywords = set()
             all_keywords.update(extended_topic.extended_keywords)
             all_keywords.update(extended_topic.related_concepts)
             
-            # 从生成内容中补充关键词
-            content_keywords = await self.llm_service.extract_keywords(
-                text=awesome_list_content,
-                max_keywords=3
+            # 从生成内容中补充关键词（过载降级时只使用扩展主题的关键词）
+            content_keywords = await self._extract_keywords(
+                "intelligent", awesome_list_content, max_keywords=3, fallback=[]
             )
             all_keywords.update(content_keywords)
             
@@ -192,18 +285,135 @@ class AwesomeListService(LoggerMixin):
                 f"评分方法: {scoring_method}"
             )
             
-            return GenerateAwesomeListResponse(
+            response = GenerateAwesomeListResponse(
                 awesome_list=awesome_list_content,
                 keywords=keywords,
                 total_results=search_results.total_count,
                 processing_time=processing_time,
                 model_used=model_used
             )
+            response.history_id = await self._record_history(request, "intelligent", response, search_results)
+            return response
             
+        except asyncio.CancelledError:
+            await reranker.close()
+            raise
         except Exception as e:
             self.logger.error(f"❌ 智能搜索模式失败: {e}", exc_info=True)
+            await reranker.close()
             raise AwesomeAgentException(f"智能生成Awesome List失败: {str(e)}")
     
+    async def _reuse_history(
+        self,
+        request: GenerateAwesomeListRequest,
+        pipeline: str,
+        start_time: datetime
+    ) -> Optional[GenerateAwesomeListResponse]:
+        """
+        时效窗口内存在相同规范化请求的历史时直接返回该结果（缓存预热生成的历史按预热数据有效期判断）
+        
+        Returns:
+            Optional[GenerateAwesomeListResponse]: 复用的响应，没有可复用的历史时返回None
+        """
+        window = self.settings.history_reuse_window
+        warm_window = self.settings.warm_ttl if self.settings.warm_enabled else window
+        if not self.settings.history_enabled or request.force_refresh or max(window, warm_window) <= 0:
+            return None
+        
+        try:
+            entry = await get_history_store().find_recent_async(
+                request_key(request, pipeline), window, warm_window
+            )
+        except Exception as e:
+            self.logger.warning(f"⚠️ 查询生成历史失败，继续正常生成: {e}")
+            return None
+        if entry is None:
+            return None
+        
+        self.metrics.increment("history_reuse_total", pipeline=pipeline, source=entry["source"])
+        self.logger.info(
+            f"♻️ 复用 {time.time() - entry['created_at']:.0f} 秒前的生成历史 #{entry['id']}，主题: {request.topic}"
+        )
+        return GenerateAwesomeListResponse(
+            awesome_list=entry["awesome_list"],
+            keywords=entry["keywords"],
+            total_results=entry["total_results"],
+            processing_time=(datetime.now() - start_time).total_seconds(),
+            model_used=entry["model_used"],
+            history_id=entry["id"],
+            reused=True
+        )
+    
+    def _scoring_method(self, request: GenerateAwesomeListRequest, default: str) -> str:
+        """确定重排序评分方法，过载降级时大模型评分改为规则评分"""
+        scoring_method = request.scoring_method or default
+        if scoring_method == "llm_based" and is_degraded(RULE_BASED_SCORING):
+            self.logger.info("⚖️ 服务负载较高，大模型评分降级为规则评分")
+            return "rule_based"
+        return scoring_method
+    
+    async def _extract_keywords(
+        self,
+        pipeline: str,
+        text: str,
+        max_keywords: int,
+        fallback: List[str]
+    ) -> List[str]:
+        """从生成内容中提取关键词，过载降级时跳过大模型调用并返回fallback"""
+        if is_degraded(SKIP_KEYWORD_LLM):
+            return fallback
+        with self._stage(pipeline, "keywords"):
+            return await self.llm_service.extract_keywords(text=text, max_keywords=max_keywords)
+    
+    async def _learn_topic_synonyms(self, topic: str, extended_topic: ExtendedTopic) -> None:
+        """用主题扩展结果更新主题同义词，失败时只记录日志"""
+        try:
+            await asyncio.to_thread(get_topic_canonicalizer().learn, topic, extended_topic.extended_keywords)
+        except Exception as e:
+            self.logger.warning(f"⚠️ 更新主题同义词失败: {e}")
+    
+    async def _record_history(
+        self,
+        request: GenerateAwesomeListRequest,
+        pipeline: str,
+        response: GenerateAwesomeListResponse,
+        search_results: ResultSet
+    ) -> Optional[int]:
+        """保存生成历史，失败时只记录日志，不影响本次响应"""
+        if not self.settings.history_enabled:
+            return None
+        
+        entry = HistoryEntry(
+            pipeline=pipeline,
+            topic=request.topic,
+            model=request.model,
+            language=request.language,
+            max_results=request.max_results,
+            scoring_method=request.scoring_method,
+            awesome_list=response.awesome_list,
+            keywords=response.keywords,
+            result_urls=[result.url for result in search_results.results],
+            total_results=response.total_results,
+            processing_time=response.processing_time,
+            model_used=response.model_used,
+            stage_timings=dict(self.stage_timings),
+            source=self._history_source()
+        )
+        try:
+            return await get_history_store().add_async(request_key(request, pipeline), entry)
+        except Exception as e:
+            self.logger.warning(f"⚠️ 保存生成历史失败: {e}")
+            return None
+    
+    @staticmethod
+    def _history_source() -> str:
+        """生成历史的来源：降级生成（包括有外部调用被抢占，不复用）、预热生成或普通请求"""
+        if current_degradations() or preempted_calls():
+            return "degraded"
+        if is_warming():
+            return "warmup"
+        return "request"
+    
     def _get_model_display_name(self, model: str) -> str:
         """
         获取模型的显示名称
@@ -220,7 +430,7 @@ class AwesomeListService(LoggerMixin):
         default_model = self.settings.default_llm_model.lower()
         return model_names.get(default_model, "GPT-4-Turbo")
     
-    async def get_search_preview(self, topic: str, max_results: int = 5) -> SearchResults:
+    async def get_search_preview(self, topic: str, max_results: int = 5) -> ResultSet:
         """
         获取搜索预览（用于调试或预览功能）
         
@@ -229,7 +439,7 @@ class AwesomeListService(LoggerMixin):
             max_results: 最大结果数
             
         Returns:
-            SearchResults: 搜索结果
+            ResultSet: 搜索结果
         """
         self.logger.info(f"获取搜索预览: {topic}")
         
@@ -0,0 +1,346 @@
+"""
+缓存预热模块
+在业务低峰时段、在各外部服务的调用预算内，定期为配置的主题和请求日志中的热门主题运行生成流水线，
+使搜索结果、GitHub/arXiv元数据（预热存储）和完整的Awesome List（生成历史）保持可用
+
+既可随应用在生命周期内运行（WARM_SCHEDULER_ENABLED=true），也可作为独立进程运行（见 warm_worker 模块）
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from app.models import GenerateAwesomeListRequest
+from app.services.awesome_list_service import AwesomeListService
+from app.services.history_store import get_history_store
+from app.services.response_cache import ResponseCache
+from app.services.topic_canonicalizer import request_key
+from app.services.warm_store import get_warm_store, warming
+from app.services.admission import PREEMPTED_CALLS
+from app.utils import get_settings, get_metrics, request_deadline, scheduling_lane, ConfigException, LoggerMixin
+from app.utils.scheduler import WARMUP
+from app.utils.config import Settings
+
+
+# 统计外部调用次数的指标（由retry_async按服务记录）
+CALL_COUNTER = "external_call_attempts_total"
+CALL_OUTCOMES = ("success", "error")
+
+
+def parse_hours(spec: str) -> List[Tuple[int, int]]:
+    """
+    解析低峰时段，如 "0-6" 或 "22-24,0-6"（本地时间，左闭右开），空字符串表示任意时段
+
+    Raises:
+        ConfigException: 格式无效
+    """
+    ranges = []
+    for part in filter(None, (item.strip() for item in spec.split(","))):
+        try:
+            start, end = (int(value) for value in part.split("-"))
+        except ValueError:
+            raise ConfigException(f"无效的预热时段: {part}")
+        if not (0 <= start <= 24 and 0 <= end <= 24):
+            raise ConfigException(f"无效的预热时段: {part}")
+        ranges.append((start, end))
+    return ranges
+
+
+def parse_budget(spec: str) -> Dict[str, int]:
+    """
+    解析各外部服务每小时的调用预算，如 "tavily=200,gpt=100,github=500"
+
+    Raises:
+        ConfigException: 格式无效
+    """
+    budget = {}
+    for part in filter(None, (item.strip() for item in spec.split(","))):
+        provider, _, limit = part.partition("=")
+        try:
+            budget[provider.strip()] = int(limit)
+        except ValueError:
+            raise ConfigException(f"无效的预热调用预算: {part}")
+    return budget
+
+
+class ProviderBudget:
+    """
+    预热任务的外部调用预算
+    按一小时滑动窗口统计预热期间各服务的调用次数（与用户请求同时进行的调用也会计入，偏保守）
+    """
+
+    WINDOW = 3600.0
+
+    def __init__(self, limits: Dict[str, int]):
+        self.limits = limits
+        self._usage: Dict[str, Deque[Tuple[float, float]]] = {provider: deque() for provider in limits}
+
+    def _calls(self, provider: str) -> float:
+        metrics = get_metrics()
+        return sum(metrics.get_counter(CALL_COUNTER, outcome=outcome, provider=provider) for outcome in CALL_OUTCOMES)
+
+    def used(self, provider: str) -> float:
+        """窗口内已使用的调用次数"""
+        usage = self._usage[provider]
+        cutoff = time.monotonic() - self.WINDOW
+        while usage and usage[0][0] < cutoff:
+            usage.popleft()
+        return sum(count for _, count in usage)
+
+    def exhausted(self) -> Optional[str]:
+        """返回预算已用完的服务，都有剩余时返回None"""
+        for provider, limit in self.limits.items():
+            if self.used(provider) >= limit:
+                return provider
+        return None
+
+    @contextmanager
+    def measure(self) -> Iterator[None]:
+        """统计代码块执行期间各服务的调用次数"""
+        before = {provider: self._calls(provider) for provider in self.limits}
+        try:
+            yield
+        finally:
+            now = time.monotonic()
+            for provider in self.limits:
+                calls = self._calls(provider) - before[provider]
+                if calls > 0:
+                    self._usage[provider].append((now, calls))
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        return {
+            provider: {"limit": limit, "used": self.used(provider)}
+            for provider, limit in self.limits.items()
+        }
+
+
+@dataclass
+class WarmJob:
+    """一个预热任务"""
+    request: GenerateAwesomeListRequest
+    pipeline: str
+    key: str
+    priority: float  # 统计窗口内的请求次数
+    origin: str  # configured: 配置的主题；log: 请求日志中的热门主题
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "topic": self.request.topic,
+            "pipeline": self.pipeline,
+            "key": self.key,
+            "priority": self.priority,
+            "origin": self.origin,
+        }
+
+
+class CacheWarmer(LoggerMixin):
+    """
+    缓存预热调度器
+    每轮按优先级（配置的主题优先，其余按请求日志中的请求次数）依次重新生成仍未预热或已接近过期的请求，
+    离开低峰时段或任一服务的调用预算用完时结束本轮
+    """
+
+    def __init__(self, settings: Optional[Settings] = None, response_cache: Optional[ResponseCache] = None):
+        self.settings = settings or get_settings()
+        self.response_cache = response_cache
+        self.metrics = get_metrics()
+        self.hours = parse_hours(self.settings.warm_hours)
+        self.budget = ProviderBudget(parse_budget(self.settings.warm_budget))
+        self.last_run: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def is_off_peak(self, now: Optional[datetime] = None) -> bool:
+        """当前是否在低峰时段"""
+        if not self.hours:
+            return True
+        hour = (now or datetime.now()).hour
+        return any(
+            start <= hour < end if start <= end else hour >= start or hour < end
+            for start, end in self.hours
+        )
+
+    def configured_topics(self) -> List[str]:
+        """配置的预热主题（WARM_TOPICS 和 WARM_TOPICS_FILE，文件中每行一个，#开头为注释）"""
+        topics = [topic.strip() for topic in self.settings.warm_topics.split(",")]
+        if self.settings.warm_topics_file:
+            with open(self.settings.warm_topics_file, "r", encoding="utf-8") as f:
+                topics.extend(line.strip() for line in f if not line.lstrip().startswith("#"))
+        return list(dict.fromkeys(topic for topic in topics if topic))
+
+    def plan(self) -> List[WarmJob]:
+        """
+        生成本轮的预热计划
+        同一规范请求键只预热一次，最近 WARM_REFRESH_AFTER 秒内已生成过的请求跳过
+
+        Returns:
+            List[WarmJob]: 按优先级降序的预热任务（配置的主题在前）
+        """
+        jobs: Dict[str, WarmJob] = {}
+        pipelines = [pipeline.strip() for pipeline in self.settings.warm_pipelines.split(",") if pipeline.strip()]
+        for topic in self.configured_topics():
+            for pipeline in pipelines:
+                request = GenerateAwesomeListRequest(topic=topic)
+                key = request_key(request, pipeline)
+                jobs[key] = WarmJob(request, pipeline, key, 0.0, "configured")
+
+        since = time.time() - self.settings.warm_log_window
+        for item in get_warm_store().top_requests(since, self.settings.warm_top_n):
+            if item["count"] < self.settings.warm_min_requests:
+                break
+            request = GenerateAwesomeListRequest(**item["request"])
+            # 重新计算请求键：记录日志后可能学到了新的主题同义词
+            key = request_key(request, item["pipeline"])
+            if key in jobs:
+                jobs[key].priority += item["count"]
+            else:
+                jobs[key] = WarmJob(request, item["pipeline"], key, float(item["count"]), "log")
+
+        refresh_after = self.settings.warm_refresh_after
+        history = get_history_store() if self.settings.history_enabled else None
+        planned = [
+            job for job in jobs.values()
+            if history is None or history.find_recent(job.key, refresh_after, refresh_after) is None
+        ]
+        planned.sort(key=lambda job: (job.origin == "configured", job.priority), reverse=True)
+        return planned[:self.settings.warm_max_jobs]
+
+    async def run_once(self, force: bool = False) -> Dict[str, Any]:
+        """
+        执行一轮预热
+
+        Args:
+            force: 忽略低峰时段限制（调用预算仍然生效）
+
+        Returns:
+            Dict[str, Any]: 本轮统计
+        """
+        summary: Dict[str, Any] = {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "planned": 0,
+            "warmed": 0,
+            "failed": 0,
+            "stopped": None,
+        }
+        if not force and not self.is_off_peak():
+            summary["stopped"] = "peak_hours"
+            self.last_run = summary
+            return summary
+
+        store = get_warm_store()
+        await asyncio.to_thread(
+            store.prune, time.time() - max(self.settings.warm_log_window, self.settings.warm_ttl)
+        )
+        jobs = await asyncio.to_thread(self.plan)
+        summary["planned"] = len(jobs)
+        self.logger.info(f"🔥 开始缓存预热: {len(jobs)} 个任务")
+
+        for job in jobs:
+            if not force and not self.is_off_peak():
+                summary["stopped"] = "peak_hours"
+                break
+            provider = self.budget.exhausted()
+            if provider is not None:
+                summary["stopped"] = f"budget:{provider}"
+                break
+            try:
+                warmed = await self._warm(job)
+            except Exception as e:
+                summary["failed"] += 1
+                self.metrics.increment("warm_jobs_total", outcome="error", origin=job.origin)
+                self.logger.warning(f"⚠️ 预热失败 [{job.pipeline}] {job.request.topic}: {e}")
+                continue
+            if not warmed:
+                # 用户请求正在占用外部服务配额，让出配额，下一轮再继续
+                self.metrics.increment("warm_jobs_total", outcome="preempted", origin=job.origin)
+                summary["stopped"] = "preempted"
+                break
+            summary["warmed"] += 1
+            self.metrics.increment("warm_jobs_total", outcome="success", origin=job.origin)
+
+        summary["budget"] = self.budget.snapshot()
+        self.last_run = summary
+        self.logger.info(
+            f"🔥 缓存预热结束: 成功 {summary['warmed']}，失败 {summary['failed']}，"
+            f"提前结束原因: {summary['stopped'] or '无'}"
+        )
+        return summary
+
+    async def _warm(self, job: WarmJob) -> bool:
+        """
+        在预热通道中运行一次生成流水线，外部调用结果写入预热存储，生成结果写入生成历史（和进程内的结果缓存）
+
+        Returns:
+            bool: 是否预热成功；有外部调用被用户请求抢占时结果不完整，不写入结果缓存（生成历史中也不会复用）
+        """
+        request = job.request.model_copy(update={"force_refresh": True})
+        with warming(), scheduling_lane(WARMUP) as lane, self.budget.measure():
+            try:
+                with request_deadline(self.settings.pipeline_deadline):
+                    response = await AwesomeListService().generate(request, job.pipeline)
+            except Exception:
+                # 生成失败由被抢占的调用导致时按抢占处理
+                if not lane.preempted:
+                    raise
+                response = None
+        if response is None or PREEMPTED_CALLS in response.degradations:
+            self.logger.info(f"⏏️ 预热 [{job.pipeline}] {job.request.topic} 的外部调用被用户请求抢占，结束本轮")
+            return False
+        if self.response_cache is not None:
+            self.response_cache.put(job.key, response)
+        self.logger.info(f"🔥 已预热 [{job.pipeline}] {job.request.topic}（{response.total_results} 个结果）")
+        return True
+
+    async def run_forever(self) -> None:
+        """每隔 WARM_INTERVAL 秒执行一轮"""
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                self.logger.error(f"❌ 缓存预热出错: {e}", exc_info=True)
+            await asyncio.sleep(self.settings.warm_interval)
+
+    def start(self) -> None:
+        """在当前事件循环中启动后台调度"""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self) -> None:
+        """停止后台调度"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """调度器状态"""
+        return {
+            "running": self._task is not None,
+            "off_peak": self.is_off_peak(),
+            "hours": self.settings.warm_hours,
+            "interval": self.settings.warm_interval,
+            "budget": self.budget.snapshot(),
+            "last_run": self.last_run,
+        }
+
+
+@lru_cache()
+def get_cache_warmer() -> CacheWarmer:
+    """
+    获取随应用运行的缓存预热调度器（带缓存），预热结果同时写入进程内的结果缓存
+
+    Returns:
+        CacheWarmer: 缓存预热调度器实例
+    """
+    from app.services.response_cache import get_response_cache
+
+    settings = get_settings()
+    return CacheWarmer(settings, get_response_cache() if settings.response_cache_enabled else None)
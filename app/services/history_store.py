@@ -0,0 +1,224 @@
+"""
+生成历史存储模块
+把每次生成的Awesome List（主题、参数、Markdown、关键词、结果URL和耗时）保存到SQLite，
+提供按时间列出、全文检索和按ID读取，并可在时效窗口内直接复用相同请求的历史结果
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from app.services.local_index import tokenize
+from app.services.topic_canonicalizer import topic_key
+from app.utils import get_settings, LoggerMixin
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    request_key TEXT NOT NULL,
+    pipeline TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    normalized_topic TEXT NOT NULL,
+    model TEXT,
+    language TEXT,
+    max_results INTEGER,
+    scoring_method TEXT,
+    awesome_list TEXT NOT NULL,
+    keywords TEXT NOT NULL,
+    result_urls TEXT NOT NULL,
+    total_results INTEGER NOT NULL,
+    processing_time REAL NOT NULL,
+    stage_timings TEXT NOT NULL,
+    model_used TEXT,
+    source TEXT NOT NULL DEFAULT 'request',
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_request_key ON history (request_key, created_at);
+CREATE INDEX IF NOT EXISTS history_created_at ON history (created_at);
+CREATE INDEX IF NOT EXISTS history_topic ON history (normalized_topic, created_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5 (topic, keywords, awesome_list);
+"""
+
+# 全文检索各列的BM25权重（主题 > 关键词 > 正文）
+FTS_WEIGHTS = (5.0, 3.0, 1.0)
+
+# 列表接口返回的字段（不含Markdown正文）
+SUMMARY_COLUMNS = (
+    "id, pipeline, topic, model, language, max_results, scoring_method, "
+    "keywords, total_results, processing_time, model_used, source, created_at"
+)
+
+
+def _fts_text(text: str) -> str:
+    """按本地索引的分词规则预先切分文本，使中文也能按二字组检索"""
+    return " ".join(tokenize(text))
+
+
+@dataclass
+class HistoryEntry:
+    """一条生成历史"""
+    pipeline: str
+    topic: str
+    model: Optional[str]
+    language: Optional[str]
+    max_results: Optional[int]
+    scoring_method: Optional[str]
+    awesome_list: str
+    keywords: List[str]
+    result_urls: List[str]
+    total_results: int
+    processing_time: float
+    model_used: Optional[str]
+    stage_timings: Dict[str, float] = field(default_factory=dict)
+    source: str = "request"  # request: 用户请求生成；warmup: 缓存预热生成；degraded: 过载降级生成
+    created_at: float = field(default_factory=time.time)
+    id: Optional[int] = None
+
+
+def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    data = dict(row)
+    for column in ("keywords", "result_urls", "stage_timings"):
+        if column in data:
+            data[column] = json.loads(data[column])
+    return data
+
+
+class HistoryStore(LoggerMixin):
+    """
+    SQLite生成历史存储
+    同一连接由线程锁保护，异步接口在线程池中执行，不阻塞事件循环
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(SCHEMA)
+        columns = {row["name"] for row in self._connection.execute("PRAGMA table_info(history)")}
+        if "source" not in columns:
+            # 兼容增加来源列之前创建的数据库
+            self._connection.execute("ALTER TABLE history ADD COLUMN source TEXT NOT NULL DEFAULT 'request'")
+
+    def add(self, key: str, entry: HistoryEntry) -> int:
+        """写入一条历史，返回其ID"""
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "INSERT INTO history (request_key, pipeline, topic, normalized_topic, model, language, "
+                "max_results, scoring_method, awesome_list, keywords, result_urls, total_results, "
+                "processing_time, stage_timings, model_used, source, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key, entry.pipeline, entry.topic, topic_key(entry.topic), entry.model,
+                    entry.language, entry.max_results, entry.scoring_method, entry.awesome_list,
+                    json.dumps(entry.keywords, ensure_ascii=False),
+                    json.dumps(entry.result_urls, ensure_ascii=False),
+                    entry.total_results, entry.processing_time,
+                    json.dumps(entry.stage_timings), entry.model_used, entry.source, entry.created_at,
+                )
+            )
+            entry.id = cursor.lastrowid
+            self._connection.execute(
+                "INSERT INTO history_fts (rowid, topic, keywords, awesome_list) VALUES (?, ?, ?, ?)",
+                (
+                    entry.id, _fts_text(entry.topic), _fts_text(" ".join(entry.keywords)),
+                    _fts_text(entry.awesome_list),
+                )
+            )
+        return entry.id
+
+    def find_recent(self, key: str, max_age: float, warm_max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        查找max_age秒内相同请求键的最新历史，预热生成的历史按warm_max_age（未指定时同max_age）判断，
+        过载降级生成的历史不复用
+        """
+        now = time.time()
+        warm_max_age = max_age if warm_max_age is None else warm_max_age
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT * FROM history WHERE request_key = ? AND source != 'degraded' "
+                "AND (created_at >= ? OR (source = 'warmup' AND created_at >= ?)) "
+                "ORDER BY created_at DESC LIMIT 1",
+                (key, now - max_age, now - warm_max_age)
+            ).fetchone()
+        return _row_to_dict(row) if row else None
+
+    def get(self, entry_id: int) -> Optional[Dict[str, Any]]:
+        """按ID读取完整历史"""
+        with self._lock:
+            row = self._connection.execute("SELECT * FROM history WHERE id = ?", (entry_id,)).fetchone()
+        if row is None:
+            return None
+        data = _row_to_dict(row)
+        data.pop("request_key", None)
+        data.pop("normalized_topic", None)
+        return data
+
+    def list_recent(self, limit: int = 20, offset: int = 0, topic: Optional[str] = None) -> List[Dict[str, Any]]:
+        """按时间倒序列出历史摘要，可按主题过滤（规范键相同即匹配，如 "Vue.js" 与 "vuejs"）"""
+        query = f"SELECT {SUMMARY_COLUMNS} FROM history"
+        params: List[Any] = []
+        if topic:
+            query += " WHERE normalized_topic = ?"
+            params.append(topic_key(topic))
+        query += " ORDER BY created_at DESC LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+        with self._lock:
+            rows = self._connection.execute(query, params).fetchall()
+        return [_row_to_dict(row) for row in rows]
+
+    def search(self, text: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """全文检索主题、关键词和正文，按BM25相关度排序"""
+        terms = list(dict.fromkeys(tokenize(text)))
+        if not terms:
+            return []
+        match = " ".join(f'"{term}"' for term in terms)
+        columns = ", ".join(f"h.{column.strip()}" for column in SUMMARY_COLUMNS.split(","))
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT {columns}, bm25(history_fts, ?, ?, ?) AS rank "
+                "FROM history_fts JOIN history h ON h.id = history_fts.rowid "
+                "WHERE history_fts MATCH ? ORDER BY rank LIMIT ?",
+                (*FTS_WEIGHTS, match, limit)
+            ).fetchall()
+        results = []
+        for row in rows:
+            data = _row_to_dict(row)
+            data["relevance"] = round(-data.pop("rank"), 4)
+            results.append(data)
+        return results
+
+    async def add_async(self, key: str, entry: HistoryEntry) -> int:
+        return await asyncio.to_thread(self.add, key, entry)
+
+    async def find_recent_async(
+        self, key: str, max_age: float, warm_max_age: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.find_recent, key, max_age, warm_max_age)
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+@lru_cache()
+def get_history_store() -> HistoryStore:
+    """
+    获取进程内共享的生成历史存储（带缓存）
+
+    Returns:
+        HistoryStore: 生成历史存储实例
+    """
+    return HistoryStore(get_settings().history_path)
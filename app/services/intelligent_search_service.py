@@ -4,14 +4,25 @@
 """
 
 import asyncio
-import json
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, Callable, List, Dict, Any, Optional, Tuple
 from datetime import datetime
 
-from app.models import SearchResults, SearchResult
+from app.models import ResultRecord, ResultSet, SearchWebCall, ExtendedTopic, TopicExpansionOutput
 from app.services.search_service import SearchService
 from app.services.llm_service import LLMService
-from app.utils import get_settings, LoggerMixin, SearchException
+from app.services.admission import is_degraded, REDUCED_SEARCH
+from app.utils import get_settings, LoggerMixin, LogPayload, SearchException
+
+
+# 单次请求的最大搜索调用次数
+MAX_SEARCH_CALLS = 8
+# 过载降级时的最大搜索调用次数
+REDUCED_SEARCH_CALLS = 3
+
+
+def search_call_limit() -> int:
+    """当前生成任务的最大搜索调用次数"""
+    return REDUCED_SEARCH_CALLS if is_degraded(REDUCED_SEARCH) else MAX_SEARCH_CALLS
 
 
 class IntelligentSearchService(LoggerMixin):
@@ -55,13 +66,44 @@ class IntelligentSearchService(LoggerMixin):
                 }
             }
         ]
+        
+        # 合并规划模式使用的主题扩展工具
+        self.topic_expansion_tool = {
+            "type": "function",
+            "function": {
+                "name": "record_topic_expansion",
+                "description": "记录主题扩展结果：扩展关键词、相关概念和推荐搜索查询",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "extended_keywords": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "覆盖主题不同方面的扩展关键词"
+                        },
+                        "related_concepts": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "与主题相关的技术术语或概念"
+                        },
+                        "search_queries": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "能够找到高质量资源的搜索查询"
+                        }
+                    },
+                    "required": ["extended_keywords", "related_concepts", "search_queries"]
+                }
+            }
+        }
     
     async def intelligent_search(
         self, 
         topic: str, 
         language: str = "zh",
-        model: str = None
-    ) -> SearchResults:
+        model: str = None,
+        on_results: Optional[Callable[[List[ResultRecord]], None]] = None
+    ) -> ResultSet:
         """
         智能搜索，让大模型自主决定搜索策略
         
@@ -69,52 +111,41 @@ class IntelligentSearchService(LoggerMixin):
             topic: 搜索主题
             language: 语言
             model: 指定的模型
+            on_results: 每个搜索完成时接收其结果的回调
             
         Returns:
-            SearchResults: 聚合的搜索结果
+            ResultSet: 聚合的搜索结果
         """
         start_time = datetime.now()
         self.logger.info(f"开始智能搜索: {topic}")
         
         try:
-            # 第一步：让大模型分析主题并决定搜索策略
-            search_plan = await self._generate_search_plan(topic, language, model)
-            
-            # 第二步：执行搜索计划
-            all_results = []
-            search_tasks = []
-            
-            for search_call in search_plan:
-                task = self._execute_search_call(search_call)
-                search_tasks.append(task)
-            
-            # 并行执行所有搜索任务
-            search_results_list = await asyncio.gather(*search_tasks, return_exceptions=True)
-            
-            # 合并搜索结果
-            for results in search_results_list:
-                if isinstance(results, SearchResults):
-                    all_results.extend(results.results)
-                elif isinstance(results, Exception):
-                    self.logger.warning(f"搜索任务失败: {results}")
-                    continue
+            if self.settings.llm_stream_tool_calls:
+                # 流式规划：每个搜索调用的参数一到齐就立即开始搜索
+                search_tasks = await self._stream_search_plan(topic, language, model)
+            else:
+                # 第一步：让大模型分析主题并决定搜索策略
+                search_plan = await self._generate_search_plan(topic, language, model)
+                
+                # 第二步：执行搜索计划
+                search_tasks = [self._execute_search_call(search_call) for search_call in search_plan]
             
-            # 去重和排序
-            unique_results = self.search_service._deduplicate_results(all_results)
-            sorted_results = self.search_service._sort_results_by_relevance(unique_results, topic)
+            # 并行执行所有搜索任务，合并、去重和排序
+            sorted_results = await self._collect_search_results(search_tasks, topic, on_results)
             
             search_time = (datetime.now() - start_time).total_seconds()
             
             self.logger.info(f"智能搜索完成，找到 {len(sorted_results)} 个结果，耗时: {search_time:.2f}s")
             
-            return SearchResults(
+            return ResultSet(
                 query=topic,
                 results=sorted_results,
                 total_count=len(sorted_results),
                 search_time=search_time,
                 filters_applied={
                     "intelligent_search": True,
-                    "search_calls": len(search_plan),
+                    "search_calls": len(search_tasks),
+                    "streamed_planning": self.settings.llm_stream_tool_calls,
                     "model_used": model or self.settings.default_llm_model
                 }
             )
@@ -138,7 +169,151 @@ class IntelligentSearchService(LoggerMixin):
         used_model = model or self.settings.default_llm_model
         self.logger.info(f"🤖 使用模型: {used_model}")
         
-        # 构建提示词
+        prompt = self._build_search_plan_prompt(topic, language)
+        
+        try:
+            # 强制工具调用并校验参数，无效调用会携带错误信息重新请求一次
+            tool_calls = await self.llm_service._call_llm_tool_calls(
+                model=used_model,
+                prompt=prompt,
+                tools=self.search_tools,
+                argument_models={"search_web": SearchWebCall},
+                max_tokens=1000,
+                temperature=0.7,
+                hedge=self.settings.llm_hedge_enabled
+            )
+            
+            search_calls = [arguments.model_dump() for _, arguments in tool_calls][:search_call_limit()]
+            self.logger.info(f"大模型制定了 {len(search_calls)} 个搜索计划")
+            self.logger.debug("工具调用参数: %s", LogPayload(search_calls))
+            
+            return search_calls
+            
+        except Exception as e:
+            self.logger.error(f"生成搜索计划失败: {e}")
+            # 降级到默认搜索策略
+            return self._get_fallback_search_plan(topic)
+    
+    async def _stream_search_plan(
+        self,
+        topic: str,
+        language: str,
+        model: str = None
+    ) -> List["asyncio.Task[ResultSet]"]:
+        """
+        流式生成搜索计划，每个search_web调用到达时立即启动搜索任务
+        
+        Returns:
+            List[asyncio.Task]: 已启动的搜索任务，模型未给出有效调用时为默认策略的任务
+        """
+        used_model = model or self.settings.default_llm_model
+        self.logger.info(f"🤖 流式制定搜索策略: {topic} (模型: {used_model})")
+        
+        _, search_tasks = await self._stream_and_dispatch(
+            model=used_model,
+            prompt=self._build_search_plan_prompt(topic, language),
+            tools=self.search_tools,
+            argument_models={"search_web": SearchWebCall},
+            max_tokens=1000
+        )
+        
+        if not search_tasks:
+            search_tasks = [
+                asyncio.create_task(self._execute_search_call(search_call))
+                for search_call in self._get_fallback_search_plan(topic)
+            ]
+        return search_tasks
+    
+    async def _stream_and_dispatch(
+        self,
+        model: str,
+        prompt: str,
+        tools: List[Dict[str, Any]],
+        argument_models: Dict[str, Any],
+        max_tokens: int
+    ) -> Tuple[List[Tuple[str, Any]], List["asyncio.Task[ResultSet]"]]:
+        """
+        消费流式工具调用，search_web调用一到达就创建搜索任务，不等待模型输出完整计划
+        
+        流中途失败时保留已经启动的搜索任务；规划被取消时同时取消已经启动的搜索任务
+        
+        Returns:
+            Tuple[List[Tuple[str, Any]], List[asyncio.Task]]: 收到的全部工具调用和已启动的搜索任务
+        """
+        tool_calls: List[Tuple[str, Any]] = []
+        search_tasks: List[asyncio.Task] = []
+        
+        try:
+            async for name, arguments in self.llm_service.stream_tool_calls(
+                model=model,
+                prompt=prompt,
+                tools=tools,
+                argument_models=argument_models,
+                max_tokens=max_tokens,
+                temperature=0.7
+            ):
+                tool_calls.append((name, arguments))
+                if name != "search_web" or len(search_tasks) >= search_call_limit():
+                    continue
+                self.logger.info(f"🚀 搜索调用已就绪，立即执行: {arguments.query} ({arguments.search_type})")
+                search_tasks.append(asyncio.create_task(self._execute_search_call(arguments.model_dump())))
+        except asyncio.CancelledError:
+            await self._cancel_searches(search_tasks)
+            raise
+        except Exception as e:
+            self.logger.error(f"❌ 流式规划失败（已启动 {len(search_tasks)} 个搜索）: {e}")
+        
+        return tool_calls, search_tasks
+    
+    async def _iter_completed_searches(self, search_tasks: List[Any]) -> AsyncIterator[ResultSet]:
+        """
+        按完成顺序产出各搜索任务的结果，失败的任务记录后跳过
+        """
+        for next_done in asyncio.as_completed(search_tasks):
+            try:
+                yield await next_done
+            except Exception as e:
+                self.logger.warning(f"⚠️ 搜索任务失败: {e}")
+    
+    async def _cancel_searches(self, search_tasks: List["asyncio.Future[ResultSet]"]) -> None:
+        """取消尚未完成的搜索任务并等待其退出"""
+        pending = [task for task in search_tasks if not task.done()]
+        if not pending:
+            return
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        self.logger.info(f"🛑 已取消 {len(pending)} 个未完成的搜索任务")
+    
+    async def _collect_search_results(
+        self,
+        search_tasks: List[Any],
+        topic: str,
+        on_results: Optional[Callable[[List[ResultRecord]], None]] = None
+    ) -> List[ResultRecord]:
+        """
+        汇总各搜索任务的结果，去重后按相关性排序
+        
+        每个搜索一完成就把结果交给on_results（如元数据预取），
+        不必等待最慢的搜索；汇总被取消时未完成的搜索任务一并取消
+        """
+        search_tasks = [asyncio.ensure_future(task) for task in search_tasks]
+        all_results = []
+        try:
+            async for results in self._iter_completed_searches(search_tasks):
+                all_results.extend(results.results)
+                if on_results and results.results:
+                    on_results(results.results)
+        finally:
+            await self._cancel_searches(search_tasks)
+        
+        unique_results = self.search_service._deduplicate_results(all_results)
+        return self.search_service._sort_results_by_relevance(unique_results, topic)
+    
+    def _build_search_plan_prompt(self, topic: str, language: str) -> str:
+        """
+        构建让大模型自主制定搜索计划的提示词
+        """
         if language == "zh":
             prompt = f"""
 你是一个智能搜索助手。用户想要了解关于"{topic}"的相关资源。
@@ -179,90 +354,193 @@ Available search types:
 
 Now please start searching immediately:
 """
+        return prompt
+    
+    async def plan_topic_and_searches(
+        self,
+        topic: str,
+        language: str = "zh",
+        model: str = None
+    ) -> Tuple[ExtendedTopic, Optional[List[Dict[str, Any]]]]:
+        """
+        一次LLM调用同时完成主题扩展和搜索计划
+        通过Function Calling返回record_topic_expansion和多个search_web调用
+        
+        Args:
+            topic: 原始主题
+            language: 语言
+            model: 指定的模型
+            
+        Returns:
+            Tuple[ExtendedTopic, Optional[List[Dict[str, Any]]]]: 扩展主题和搜索计划，
+            模型未给出搜索调用时搜索计划为None，由调用方基于扩展主题生成
+        """
+        used_model = model or self.settings.default_llm_model
+        self.logger.info(f"🧭 一次性扩展主题并制定搜索计划: {topic} (模型: {used_model})")
+        
+        prompt = self._build_combined_plan_prompt(topic, language)
         
         try:
-            response = await self.llm_service._call_llm(
+            tool_calls = await self.llm_service._call_llm_tool_calls(
                 model=used_model,
                 prompt=prompt,
-                max_tokens=1000,
+                tools=[self.topic_expansion_tool] + self.search_tools,
+                argument_models={
+                    "record_topic_expansion": TopicExpansionOutput,
+                    "search_web": SearchWebCall
+                },
+                max_tokens=1200,
                 temperature=0.7,
-                tools=self.search_tools,
-                tool_choice="auto"
+                hedge=self.settings.llm_hedge_enabled,
+                required_tools=["record_topic_expansion"]
             )
-            
-            self.logger.info(f"LLM完整响应: {response}")
-            
-            # 解析工具调用
-            search_calls = self._parse_tool_calls(response)
-            
-            self.logger.info(f"大模型制定了 {len(search_calls)} 个搜索计划")
-            
-            # 如果没有工具调用，记录详细信息
-            if len(search_calls) == 0:
-                self.logger.warning(f"大模型没有调用搜索工具，响应内容: {response[:500]}")
-                self.logger.info("将使用降级搜索策略")
-                return self._get_fallback_search_plan(topic)
-            
-            return search_calls
-            
         except Exception as e:
-            self.logger.error(f"生成搜索计划失败: {e}")
-            # 降级到默认搜索策略
-            return self._get_fallback_search_plan(topic)
+            self.logger.error(f"❌ 合并规划失败: {e}")
+            return self.llm_service._fallback_extended_topic(topic), None
+        
+        expansion = next(arguments for name, arguments in tool_calls if name == "record_topic_expansion")
+        extended_topic = self.llm_service._build_extended_topic(expansion, topic)
+        search_plan = [
+            {"function": "search_web", "arguments": arguments.model_dump()}
+            for name, arguments in tool_calls
+            if name == "search_web"
+        ][:search_call_limit()]
+        
+        self.logger.info(
+            f"✅ 合并规划完成: 关键词 {len(extended_topic.extended_keywords)} 个，"
+            f"概念 {len(extended_topic.related_concepts)} 个，搜索计划 {len(search_plan)} 个"
+        )
+        return extended_topic, search_plan or None
     
-    def _parse_tool_calls(self, response: str) -> List[Dict[str, Any]]:
+    async def plan_and_search(
+        self,
+        topic: str,
+        language: str = "zh",
+        model: str = None,
+        max_results: int = 20,
+        on_results: Optional[Callable[[List[ResultRecord]], None]] = None
+    ) -> Tuple[ExtendedTopic, ResultSet]:
         """
-        解析LLM的工具调用响应
+        合并规划并执行搜索
+        开启流式工具调用时，模型每输出一个search_web调用就立即开始搜索，
+        规划和搜索在时间上重叠；否则先完成规划再并行搜索
+        
+        Args:
+            topic: 原始主题
+            language: 语言
+            model: 指定的模型
+            max_results: 最大结果数
+            on_results: 每个搜索完成时接收其结果的回调
+            
+        Returns:
+            Tuple[ExtendedTopic, ResultSet]: 扩展主题和聚合的搜索结果
         """
+        if not self.settings.llm_stream_tool_calls:
+            extended_topic, search_plan = await self.plan_topic_and_searches(topic, language, model)
+            search_results = await self.intelligent_search_with_topics(
+                original_topic=topic,
+                extended_topic=extended_topic,
+                language=language,
+                model=model,
+                max_results=max_results,
+                search_plan=search_plan,
+                on_results=on_results
+            )
+            return extended_topic, search_results
+        
+        start_time = datetime.now()
+        used_model = model or self.settings.default_llm_model
+        self.logger.info(f"🧭 流式扩展主题并制定搜索计划: {topic} (模型: {used_model})")
+        
         try:
-            self.logger.debug(f"解析工具调用响应: {response}")
-            
-            # 尝试解析JSON格式的工具调用
-            if response.strip().startswith("{"):
-                data = json.loads(response)
-                if "tool_calls" in data:
-                    search_calls = []
-                    for tool_call in data["tool_calls"]:
-                        if tool_call.get("function", {}).get("name") == "search_web":
-                            args_str = tool_call["function"]["arguments"]
-                            # 参数可能已经是字符串形式
-                            if isinstance(args_str, str):
-                                args = json.loads(args_str)
-                            else:
-                                args = args_str
-                            search_calls.append(args)
-                    return search_calls
-            
-            # 尝试查找文本中的工具调用模式
-            # 有时LLM可能会生成自然语言描述而不是严格的JSON
-            import re
-            
-            # 寻找search_web调用的模式
-            patterns = [
-                r'search_web\s*\(\s*query["\']?\s*:\s*["\']([^"\']+)["\']',
-                r'query["\']?\s*:\s*["\']([^"\']+)["\']',
-                r'搜索[：:]\s*["\']?([^"\']+)["\']?'
-            ]
+            tool_calls, search_tasks = await self._stream_and_dispatch(
+                model=used_model,
+                prompt=self._build_combined_plan_prompt(topic, language),
+                tools=[self.topic_expansion_tool] + self.search_tools,
+                argument_models={
+                    "record_topic_expansion": TopicExpansionOutput,
+                    "search_web": SearchWebCall
+                },
+                max_tokens=1200
+            )
             
-            search_calls = []
-            for pattern in patterns:
-                matches = re.findall(pattern, response, re.IGNORECASE)
-                for match in matches:
-                    search_calls.append({
-                        "query": match.strip(),
-                        "search_type": "arxiv_papers",  # 默认类型
-                        "max_results": 3
-                    })
+            expansion = next(
+                (arguments for name, arguments in tool_calls if name == "record_topic_expansion"),
+                None
+            )
+            if expansion is not None:
+                extended_topic = self.llm_service._build_extended_topic(expansion, topic)
+            else:
+                self.logger.warning("⚠️ 流式规划未返回主题扩展，使用默认扩展")
+                extended_topic = self.llm_service._fallback_extended_topic(topic)
+            
+            # 模型没有给出搜索调用时基于扩展主题生成计划
+            if not search_tasks:
+                search_tasks = [
+                    asyncio.create_task(self._execute_search_call(search_call))
+                    for search_call in self._generate_search_plan_from_topics(topic, extended_topic, language, model)
+                ]
+            
+            sorted_results = await self._collect_search_results(search_tasks, topic, on_results)
+            final_results = sorted_results[:max_results]
+            search_time = (datetime.now() - start_time).total_seconds()
             
-            if search_calls:
-                self.logger.info(f"通过正则表达式解析出 {len(search_calls)} 个搜索调用")
-                return search_calls[:5]  # 限制数量
+            self.logger.info(f"🎉 流式规划搜索完成，找到 {len(final_results)} 个结果，耗时: {search_time:.2f}s")
             
-            return []
+            return extended_topic, ResultSet(
+                query=topic,
+                results=final_results,
+                total_count=len(final_results),
+                search_time=search_time,
+                filters_applied={
+                    "intelligent_search_with_topics": True,
+                    "streamed_planning": True,
+                    "search_calls": len(search_tasks),
+                    "model_used": used_model,
+                    "extended_keywords": len(extended_topic.extended_keywords),
+                    "related_concepts": len(extended_topic.related_concepts)
+                }
+            )
             
         except Exception as e:
-            self.logger.warning(f"解析工具调用失败: {e}")
-            return []
+            self.logger.error(f"❌ 流式规划搜索失败: {e}", exc_info=True)
+            raise SearchException(f"智能搜索失败: {str(e)}")
+    
+    def _build_combined_plan_prompt(self, topic: str, language: str) -> str:
+        """
+        构建合并规划（主题扩展 + 搜索计划）的提示词
+        """
+        if language == "zh":
+            prompt = f"""
+你是一个学术研究助手。用户想要了解关于"{topic}"的相关资源。
+
+请在一次回复中完成两件事：
+1. 调用一次record_topic_expansion工具，给出扩展关键词、相关概念和推荐搜索查询（每类3-5个）
+2. 调用3-6次search_web工具，覆盖该主题的不同角度和搜索类型
+
+可用的搜索类型：
+- arxiv_papers: 搜索arXiv学术论文
+- github_repos: 搜索GitHub代码库
+- huggingface_models: 搜索Hugging Face模型
+- research_code: 搜索研究代码
+- academic_datasets: 搜索学术数据集
+"""
+        else:
+            prompt = f"""
+You are an academic research assistant. The user wants to learn about "{topic}".
+
+Please do both of the following in a single response:
+1. Call the record_topic_expansion tool once with extended keywords, related concepts and recommended search queries (3-5 each)
+2. Call the search_web tool 3-6 times, covering different angles and search types
+
+Available search types:
+- arxiv_papers: Search arXiv academic papers
+- github_repos: Search GitHub repositories
+- huggingface_models: Search Hugging Face models
+- research_code: Search research code
+- academic_datasets: Search academic datasets
+"""
+        return prompt
     
     def _get_fallback_search_plan(self, topic: str) -> List[Dict[str, Any]]:
         """
@@ -291,14 +569,14 @@ Now please start searching immediately:
                 "search_type": "huggingface_models",
                 "max_results": 2
             }
-        ]
+        ][:search_call_limit()]
     
-    async def _execute_search_call(self, search_call: Dict[str, Any]) -> SearchResults:
+    async def _execute_search_call(self, search_call: Dict[str, Any]) -> ResultSet:
         """
         执行单个搜索调用
         """
-        # 正确获取查询参数：从arguments中获取
-        arguments = search_call.get("arguments", {})
+        # 查询参数可能包装在arguments中（扩展主题计划），也可能直接是参数（Function Calling计划）
+        arguments = search_call.get("arguments", search_call)
         query = arguments.get("query", "")
         search_type = arguments.get("search_type", "general")
         max_results = arguments.get("max_results", 5)
@@ -306,7 +584,7 @@ Now please start searching immediately:
         # 验证查询不为空
         if not query or not query.strip():
             self.logger.warning(f"⚠️ 搜索查询为空，跳过执行: {search_call}")
-            return SearchResults(
+            return ResultSet(
                 query="",
                 results=[],
                 total_count=0,
@@ -315,7 +593,7 @@ Now please start searching immediately:
             )
         
         clean_query = query.strip()
-        self.logger.debug(f"执行搜索: {clean_query} (类型: {search_type})")
+        self.logger.debug("执行搜索: %s (类型: %s)", clean_query, search_type)
         
         try:
             # 根据学术搜索类型调整搜索参数
@@ -352,15 +630,16 @@ Now please start searching immediately:
             )
             
             # 添加搜索类型标记
-            for result in results.results:
-                result.source = f"{result.source}_{search_type}"
+            results.results = [
+                result.with_source(f"{result.source}_{search_type}") for result in results.results
+            ]
             
             return results
             
         except Exception as e:
             self.logger.error(f"执行搜索调用失败: {e}")
             # 返回空结果而不是抛出异常
-            return SearchResults(
+            return ResultSet(
                 query=clean_query,
                 results=[],
                 total_count=0,
@@ -374,8 +653,10 @@ Now please start searching immediately:
         extended_topic,  # ExtendedTopic对象
         language: str = "zh",
         model: str = None,
-        max_results: int = 20
-    ) -> SearchResults:
+        max_results: int = 20,
+        search_plan: Optional[List[Dict[str, Any]]] = None,
+        on_results: Optional[Callable[[List[ResultRecord]], None]] = None
+    ) -> ResultSet:
         """
         根据扩展主题进行智能搜索
         
@@ -385,44 +666,28 @@ Now please start searching immediately:
             language: 语言
             model: 指定的模型
             max_results: 最大结果数
+            search_plan: 已制定的搜索计划（合并规划模式），为空时基于扩展主题生成
+            on_results: 每个搜索完成时接收其结果的回调
             
         Returns:
-            SearchResults: 聚合的搜索结果
+            ResultSet: 聚合的搜索结果
         """
         start_time = datetime.now()
         self.logger.info(f"🔍 开始基于扩展主题的智能搜索")
         
         try:
             # 构建搜索计划：使用扩展的关键词和相关概念
-            search_plan = self._generate_search_plan_from_topics(
-                original_topic, 
-                extended_topic, 
-                language, 
-                model
-            )
-            
-            # 执行搜索计划
-            all_results = []
-            search_tasks = []
-            
-            for search_call in search_plan:
-                task = self._execute_search_call(search_call)
-                search_tasks.append(task)
-            
-            # 并行执行所有搜索任务
-            search_results_list = await asyncio.gather(*search_tasks, return_exceptions=True)
-            
-            # 合并搜索结果
-            for results in search_results_list:
-                if isinstance(results, SearchResults):
-                    all_results.extend(results.results)
-                elif isinstance(results, Exception):
-                    self.logger.warning(f"⚠️ 搜索任务失败: {results}")
-                    continue
-            
-            # 去重和排序
-            unique_results = self.search_service._deduplicate_results(all_results)
-            sorted_results = self.search_service._sort_results_by_relevance(unique_results, original_topic)
+            if not search_plan:
+                search_plan = self._generate_search_plan_from_topics(
+                    original_topic, 
+                    extended_topic, 
+                    language, 
+                    model
+                )
+            
+            # 并行执行搜索计划，按完成顺序合并，去重和排序
+            search_tasks = [self._execute_search_call(search_call) for search_call in search_plan]
+            sorted_results = await self._collect_search_results(search_tasks, original_topic, on_results)
             
             # 限制结果数量
             final_results = sorted_results[:max_results]
@@ -431,7 +696,7 @@ Now please start searching immediately:
             
             self.logger.info(f"🎉 基于扩展主题的智能搜索完成，找到 {len(final_results)} 个结果，耗时: {search_time:.2f}s")
             
-            return SearchResults(
+            return ResultSet(
                 query=original_topic,
                 results=final_results,
                 total_count=len(final_results),
@@ -460,8 +725,6 @@ Now please start searching immediately:
         基于扩展主题生成搜索计划
         """
         self.logger.info(f"📝 基于扩展主题制定搜索计划")
-        self.logger.info(f"🔑 扩展关键词: {extended_topic.extended_keywords}")
-        self.logger.info(f"💡 相关概念: {extended_topic.related_concepts}")
         
         search_calls = []
         
@@ -472,8 +735,7 @@ Now please start searching immediately:
         valid_keywords = [kw.strip() for kw in extended_topic.extended_keywords if kw and kw.strip()]
         valid_concepts = [concept.strip() for concept in extended_topic.related_concepts if concept and concept.strip()]
         
-        self.logger.info(f"✅ 有效关键词: {valid_keywords}")
-        self.logger.info(f"✅ 有效概念: {valid_concepts}")
+        self.logger.debug("✅ 有效关键词: %s，有效概念: %s", LogPayload(valid_keywords), LogPayload(valid_concepts))
         
         all_search_terms.extend(valid_keywords[:3])  # 最多3个关键词
         all_search_terms.extend(valid_concepts[:2])   # 最多2个概念
@@ -493,7 +755,7 @@ Now please start searching immediately:
                 continue
                 
             clean_search_term = search_term.strip()
-            self.logger.debug(f"🔍 为搜索词 '{clean_search_term}' 创建搜索计划")
+            self.logger.debug("🔍 为搜索词 '%s' 创建搜索计划", clean_search_term)
             
             # 每个搜索词使用2种搜索类型
             for j, search_type in enumerate(search_types[:2]):
@@ -507,10 +769,10 @@ Now please start searching immediately:
                 })
                 
                 # 限制总搜索次数
-                if len(search_calls) >= 8:
+                if len(search_calls) >= search_call_limit():
                     break
             
-            if len(search_calls) >= 8:
+            if len(search_calls) >= search_call_limit():
                 break
         
         self.logger.info(f"📊 制定了 {len(search_calls)} 个搜索计划")
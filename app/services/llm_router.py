@@ -0,0 +1,205 @@
+"""
+LLM路由模块
+跟踪各提供商的滚动延迟、错误率和限流状态，为LLM调用选择提供商并支持故障转移
+"""
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Deque, Dict, List, Optional
+
+import openai
+
+from app.utils import get_settings, LoggerMixin
+
+
+# 逻辑模型名到实际模型名的映射
+PROVIDER_MODELS = {
+    "gpt": "gpt-4-turbo-preview",   # GPT-4 Turbo，Function Calling能力更强
+    "deepseek": "deepseek-chat",
+}
+
+# 自动路由的逻辑模型名：由路由器选择当前最快的健康提供商
+AUTO_MODEL = "auto"
+
+# 连续失败达到该次数后进入冷却期
+FAILURE_THRESHOLD = 3
+FAILURE_COOLDOWN = 30.0
+# 未返回Retry-After时的默认限流等待时间（秒）
+DEFAULT_RATE_LIMIT_WAIT = 10.0
+# 滚动错误率超过该值（且样本足够）时同样进入冷却期
+MAX_ERROR_RATE = 0.5
+MIN_ERROR_SAMPLES = 4
+
+
+@dataclass
+class ProviderStats:
+    """单个提供商的滚动统计"""
+    name: str
+    window: int = 20
+    latencies: Deque[float] = field(default_factory=deque)
+    outcomes: Deque[bool] = field(default_factory=deque)
+    consecutive_failures: int = 0
+    rate_limited_until: float = 0.0
+    cooldown_until: float = 0.0
+
+    def record(self, success: bool, latency: Optional[float] = None) -> None:
+        """记录一次调用结果"""
+        self.outcomes.append(success)
+        if len(self.outcomes) > self.window:
+            self.outcomes.popleft()
+        if latency is not None:
+            self.latencies.append(latency)
+            if len(self.latencies) > self.window:
+                self.latencies.popleft()
+
+    @property
+    def error_rate(self) -> float:
+        """滚动错误率"""
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """滚动延迟分位数，无样本时返回None"""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(percentile * (len(ordered) - 1))))
+        return ordered[index]
+
+    def is_healthy(self, now: float) -> bool:
+        """是否可用：未被限流且不在冷却期（冷却期结束后重新参与路由探测）"""
+        return now >= self.rate_limited_until and now >= self.cooldown_until
+
+    def to_dict(self, now: float) -> Dict[str, object]:
+        """转换为字典格式"""
+        return {
+            "healthy": self.is_healthy(now),
+            "p50_latency": self.latency_percentile(0.5),
+            "p95_latency": self.latency_percentile(0.95),
+            "error_rate": round(self.error_rate, 3),
+            "samples": len(self.outcomes),
+            "rate_limited_for": max(0.0, round(self.rate_limited_until - now, 1)),
+        }
+
+
+def is_failover_error(error: BaseException) -> bool:
+    """
+    判断错误是否应触发故障转移（超时、连接错误、限流和5xx）
+    """
+    if isinstance(error, (asyncio.TimeoutError, openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.RateLimitError):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code >= 500
+    return False
+
+
+def parse_retry_after(error: BaseException) -> Optional[float]:
+    """从限流错误的响应头中解析Retry-After秒数"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMRouter(LoggerMixin):
+    """
+    LLM提供商路由器
+    进程内共享，按健康状况和延迟对提供商排序
+    """
+
+    def __init__(self, providers: List[str], window: int = 20):
+        self.stats: Dict[str, ProviderStats] = {
+            name: ProviderStats(name=name, window=window) for name in providers
+        }
+
+    def route(self, model: str, failover: bool = True) -> List[str]:
+        """
+        返回按优先级排序的候选提供商列表
+
+        Args:
+            model: 逻辑模型名 (gpt/deepseek/auto)
+            failover: 是否附带其他提供商作为故障转移候选
+
+        Returns:
+            List[str]: 候选提供商，未知模型返回空列表
+        """
+        model = (model or "").lower()
+        ranked = self._rank()
+        if model == AUTO_MODEL:
+            return ranked if failover else ranked[:1]
+        if model not in self.stats:
+            return []
+        if not failover:
+            return [model]
+        return [model] + [name for name in ranked if name != model]
+
+    def _rank(self) -> List[str]:
+        """健康的提供商在前，其次按p50延迟升序（无样本的提供商优先探测）"""
+        now = time.monotonic()
+
+        def sort_key(name: str):
+            stats = self.stats[name]
+            latency = stats.latency_percentile(0.5)
+            return (not stats.is_healthy(now), latency if latency is not None else 0.0)
+
+        return sorted(self.stats, key=sort_key)
+
+    def record_success(self, provider: str, latency: float) -> None:
+        """记录成功调用"""
+        stats = self.stats[provider]
+        stats.record(True, latency)
+        stats.consecutive_failures = 0
+
+    def record_failure(self, provider: str, error: BaseException, latency: Optional[float] = None) -> None:
+        """记录失败调用，并根据错误类型更新限流和冷却状态"""
+        stats = self.stats[provider]
+        stats.record(False, latency)
+        stats.consecutive_failures += 1
+        now = time.monotonic()
+
+        if isinstance(error, openai.RateLimitError):
+            wait = parse_retry_after(error) or DEFAULT_RATE_LIMIT_WAIT
+            stats.rate_limited_until = now + wait
+            self.logger.warning(f"⏳ {provider} 触发限流，{wait:.1f}s 内不再优先路由")
+        elif stats.consecutive_failures >= FAILURE_THRESHOLD or (
+            len(stats.outcomes) >= MIN_ERROR_SAMPLES and stats.error_rate >= MAX_ERROR_RATE
+        ):
+            stats.cooldown_until = now + FAILURE_COOLDOWN
+            self.logger.warning(
+                f"🧊 {provider} 连续失败 {stats.consecutive_failures} 次，错误率 {stats.error_rate:.0%}，"
+                f"进入 {FAILURE_COOLDOWN:.0f}s 冷却期"
+            )
+
+    def hedge_delay(self, provider: str, default: float) -> float:
+        """对冲请求的等待时间：优先使用该提供商的p95延迟"""
+        stats = self.stats[provider]
+        if len(stats.latencies) >= 5:
+            return stats.latency_percentile(0.95)
+        return default
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        """获取所有提供商的当前状态"""
+        now = time.monotonic()
+        return {name: stats.to_dict(now) for name, stats in self.stats.items()}
+
+
+@lru_cache()
+def get_llm_router() -> LLMRouter:
+    """
+    获取进程内共享的LLM路由器（带缓存）
+
+    Returns:
+        LLMRouter: 路由器实例
+    """
+    return LLMRouter(list(PROVIDER_MODELS), window=get_settings().llm_router_window)
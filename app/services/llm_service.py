@@ -4,14 +4,91 @@
 """
 
 import asyncio
-from typing import List, Dict, Any, Optional, Union
+import json
+import time
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple, Type, TypeVar, Union
 from datetime import datetime
 
-import openai
 import httpx
+from pydantic import BaseModel, ValidationError
 
-from app.models import ExtendedTopic, SearchResults
-from app.utils import get_settings, get_logger, LLMException, APIException, LoggerMixin
+from app.backends import get_llm_clients
+from app.models import ExtendedTopic, ResultSet, KeywordsOutput, TopicExpansionOutput
+from app.utils import get_settings, get_logger, get_metrics, LLMException, APIException, LoggerMixin, LogPayload, PromptPacker, retry_async
+from app.services.llm_router import AUTO_MODEL, PROVIDER_MODELS, get_llm_router, is_failover_error
+
+
+StructuredModel = TypeVar("StructuredModel", bound=BaseModel)
+
+
+class ToolCallAssembler:
+    """
+    流式工具调用拼接器
+    增量拼接流式响应中的tool_calls片段，某个调用的参数一旦完整就立即返回
+    """
+
+    def __init__(self):
+        self._calls: Dict[int, Dict[str, str]] = {}
+        self._emitted: set = set()
+
+    def feed(self, chunk) -> List[Tuple[str, str]]:
+        """
+        处理一个流式chunk
+
+        Returns:
+            List[Tuple[str, str]]: 本次变为完整的 (工具名, 参数JSON) 列表
+        """
+        completed: List[Tuple[str, str]] = []
+        if not chunk.choices:
+            return completed
+
+        for part in chunk.choices[0].delta.tool_calls or []:
+            # 出现更大的序号说明之前的调用已经输出完毕
+            for index in list(self._calls):
+                if index < part.index:
+                    completed.extend(self._complete(index))
+
+            call = self._calls.setdefault(part.index, {"name": "", "arguments": ""})
+            if part.function:
+                call["name"] += part.function.name or ""
+                call["arguments"] += part.function.arguments or ""
+
+            if call["arguments"].rstrip().endswith("}") and self._is_complete_json(call["arguments"]):
+                completed.extend(self._complete(part.index))
+        return completed
+
+    def flush(self) -> List[Tuple[str, str]]:
+        """流结束时返回所有尚未返回的调用"""
+        completed: List[Tuple[str, str]] = []
+        for index in sorted(self._calls):
+            completed.extend(self._complete(index))
+        return completed
+
+    def _complete(self, index: int) -> List[Tuple[str, str]]:
+        call = self._calls[index]
+        if index in self._emitted or not call["name"]:
+            return []
+        self._emitted.add(index)
+        return [(call["name"], call["arguments"])]
+
+    @staticmethod
+    def _is_complete_json(text: str) -> bool:
+        try:
+            json.loads(text)
+            return True
+        except ValueError:
+            return False
+
+
+# 结构化输出校验失败时的重新请求次数
+STRUCTURED_REASK_LIMIT = 1
+
+
+async def _close_stream(stream: Any) -> None:
+    """关闭流式响应（OpenAI的AsyncStream或录制/回放后端的异步生成器）"""
+    close = getattr(stream, "close", None) or getattr(stream, "aclose", None)
+    if close is not None:
+        await close()
 
 
 class LLMService(LoggerMixin):
@@ -23,18 +100,30 @@ class LLMService(LoggerMixin):
     def __init__(self):
         self.settings = get_settings()
 
-        # 初始化OpenAI客户端
-        self.openai_client = openai.AsyncOpenAI(
-            api_key=self.settings.openai_api_key,
-            timeout=self.settings.request_timeout
-        )
+        # 进程内共享的OpenAI和DeepSeek客户端（复用连接池，按配置可替换为录制回放或合成后端）
+        self.openai_client, self.deepseek_client = get_llm_clients()
 
-        # DeepSeek使用OpenAI兼容的API
-        self.deepseek_client = openai.AsyncOpenAI(
-            api_key=self.settings.deepseek_api_key,
-            base_url="https://api.deepseek.com/v1",
-            timeout=self.settings.request_timeout
-        )
+        # 进程内共享的提供商路由器
+        self.router = get_llm_router()
+
+    @property
+    def auxiliary_model(self) -> str:
+        """
+        辅助调用（关键词、评分、主题扩展）使用的模型
+        启用路由时交给路由器选择当前最快的健康提供商
+        """
+        if self.settings.llm_router_enabled:
+            return AUTO_MODEL
+        return self.settings.default_llm_model
+
+    def resolve_model(self, model: str) -> str:
+        """
+        逻辑模型当前实际会调用的提供商（auto时为路由器的首选提供商），用于按目标模型统计token
+        """
+        if (model or "").lower() == AUTO_MODEL:
+            providers = self.router.route(AUTO_MODEL, failover=False)
+            return providers[0] if providers else self.settings.default_llm_model
+        return model
 
     async def expand_topic(self, topic: str, language: str = "zh") -> ExtendedTopic:
         """
@@ -52,45 +141,48 @@ class LLMService(LoggerMixin):
         try:
             prompt = self._build_topic_expansion_prompt(topic, language)
 
-            # 使用默认模型进行主题扩展
-            response = await self._call_llm(
-                model=self.settings.default_llm_model,
+            # 主题扩展位于流水线最前端，交给路由器选择并按配置启用对冲
+            response = await self._call_llm_structured(
+                model=self.auxiliary_model,
                 prompt=prompt,
+                response_model=TopicExpansionOutput,
                 max_tokens=500,
-                temperature=0.7
+                temperature=0.7,
+                hedge=self.settings.llm_hedge_enabled
             )
 
-            # 记录LLM原始响应
-            self.logger.info(f"📝 主题扩展原始响应:\n{response}")
+            expanded_topic = self._build_extended_topic(response, topic)
 
-            # 解析响应
-            expanded_topic = self._parse_topic_expansion_response(
-                response, topic)
-
-            # 详细记录扩展结果
-            self.logger.info(f"✅ 主题扩展完成!")
-            self.logger.info(f"🔑 扩展关键词 ({len(expanded_topic.extended_keywords)}个): {expanded_topic.extended_keywords}")
-            self.logger.info(f"💡 相关概念 ({len(expanded_topic.related_concepts)}个): {expanded_topic.related_concepts}")
-            self.logger.info(f"🔍 搜索查询 ({len(expanded_topic.search_queries)}个): {expanded_topic.search_queries}")
+            # 扩展结果的具体内容只在DEBUG级别记录
+            self.logger.info(
+                f"✅ 主题扩展完成: 关键词 {len(expanded_topic.extended_keywords)} 个，"
+                f"概念 {len(expanded_topic.related_concepts)} 个，搜索查询 {len(expanded_topic.search_queries)} 个"
+            )
+            self.logger.debug("🔑 主题扩展结果: %s", LogPayload(expanded_topic.model_dump()))
             
             return expanded_topic
 
         except Exception as e:
             self.logger.error(f"❌ 主题扩展失败: {e}", exc_info=True)
-            # 返回默认的扩展结果，但记录详细信息
-            fallback_topic = ExtendedTopic(
-                original_topic=topic,
-                extended_keywords=[topic],
-                related_concepts=[],
-                search_queries=[topic, f"{topic} tutorial", f"awesome {topic}"]
-            )
-            self.logger.warning(f"🔄 使用默认扩展结果: {fallback_topic.extended_keywords}")
-            return fallback_topic
+            return self._fallback_extended_topic(topic)
+
+    def _fallback_extended_topic(self, topic: str) -> ExtendedTopic:
+        """
+        主题扩展失败时使用的默认扩展结果
+        """
+        fallback_topic = ExtendedTopic(
+            original_topic=topic,
+            extended_keywords=[topic],
+            related_concepts=[],
+            search_queries=[topic, f"{topic} tutorial", f"awesome {topic}"]
+        )
+        self.logger.warning(f"🔄 使用默认扩展结果: {fallback_topic.extended_keywords}")
+        return fallback_topic
 
     async def generate_awesome_list(
         self,
         topic: str,
-        search_results: SearchResults,
+        search_results: ResultSet,
         language: str = "zh",
         model: str = None
     ) -> str:
@@ -109,11 +201,11 @@ class LLMService(LoggerMixin):
         self.logger.info(f"开始生成Awesome List: {topic}")
 
         try:
-            prompt = self._build_awesome_list_prompt(
-                topic, search_results, language)
-
             used_model = model or self.settings.default_llm_model
 
+            prompt = self._build_awesome_list_prompt(
+                topic, search_results, language, used_model)
+
             response = await self._call_llm(
                 model=used_model,
                 prompt=prompt,
@@ -144,72 +236,23 @@ class LLMService(LoggerMixin):
         """
         try:
             prompt = f"""
-请从以下文本中提取最重要的 {max_keywords} 个关键词，返回JSON格式：
+请从以下文本中提取最重要的 {max_keywords} 个关键词，以JSON对象返回，keywords字段为关键词列表。
 
 文本：
-{text[:1000]}  # 限制文本长度
-
-请返回格式：
-{{"keywords": ["关键词1", "关键词2", ...]}}
+{text[:1000]}
 """
 
-            response = await self._call_llm(
-                model=self.settings.default_llm_model,
+            response = await self._call_llm_structured(
+                model=self.auxiliary_model,
                 prompt=prompt,
+                response_model=KeywordsOutput,
                 max_tokens=200,
                 temperature=0.1
             )
 
-            # 智能解析关键词
-            import json
-            import re
-            
-            self.logger.debug(f"关键词提取原始响应: {response}")
-            
-            try:
-                # 尝试直接解析 JSON
-                parsed = json.loads(response)
-                keywords = parsed.get("keywords", [])
-                self.logger.info(f"成功解析JSON格式关键词: {keywords}")
-                return keywords[:max_keywords]
-            except json.JSONDecodeError:
-                self.logger.debug("JSON解析失败，尝试提取JSON内容")
-                
-                # 尝试提取 JSON 代码块
-                json_match = re.search(r'```json\s*(\{.*?\})\s*```', response, re.DOTALL)
-                if json_match:
-                    try:
-                        parsed = json.loads(json_match.group(1))
-                        keywords = parsed.get("keywords", [])
-                        self.logger.info(f"从代码块中解析关键词: {keywords}")
-                        return keywords[:max_keywords]
-                    except json.JSONDecodeError:
-                        pass
-                
-                # 尝试寻找数组格式
-                array_match = re.search(r'\["([^"]+)"(?:,\s*"([^"]+)")*\]', response)
-                if array_match:
-                    # 从正则匹配中提取所有关键词
-                    keywords = re.findall(r'"([^"]+)"', array_match.group(0))
-                    self.logger.info(f"从数组格式中解析关键词: {keywords}")
-                    return keywords[:max_keywords]
-                
-                # 最后的兜底方案：简单的文本分割，过滤掉JSON格式标记
-                lines = response.split('\n')
-                keywords = []
-                for line in lines:
-                    line = line.strip()
-                    # 过滤掉JSON格式标记
-                    if line and not line.startswith('{') and not line.startswith('}') and \
-                       not line.startswith('```') and not line.startswith('"keywords"') and \
-                       not line == '[' and not line == ']':
-                        # 清理引号和逗号
-                        clean_word = line.strip('",\'').strip()
-                        if clean_word and len(clean_word) > 1:
-                            keywords.append(clean_word)
-                
-                self.logger.warning(f"使用文本分割提取关键词: {keywords}")
-                return keywords[:max_keywords]
+            keywords = [kw.strip() for kw in response.keywords if kw and kw.strip()]
+            self.logger.info(f"成功提取关键词: {keywords[:max_keywords]}")
+            return keywords[:max_keywords]
 
         except Exception as e:
             self.logger.warning(f"关键词提取失败: {e}")
@@ -222,66 +265,387 @@ class LLMService(LoggerMixin):
         max_tokens: int = 1000,
         temperature: float = 0.7,
         tools: Optional[List[Dict[str, Any]]] = None,
-        tool_choice: str = "auto"
+        tool_choice: str = "auto",
+        hedge: bool = False,
+        messages: Optional[List[Dict[str, Any]]] = None,
+        response_format: Optional[Dict[str, Any]] = None
     ) -> str:
         """
         调用指定的大语言模型
+        超时、限流或5xx错误时自动故障转移到其他提供商
 
         Args:
-            model: 模型名称 (gpt/deepseek)
+            model: 模型名称 (gpt/deepseek/auto)，auto由路由器选择当前最快的健康提供商
             prompt: 提示词
             max_tokens: 最大令牌数
             temperature: 温度参数
             tools: 工具定义列表（Function Calling）
             tool_choice: 工具选择策略
+            hedge: 是否启用对冲请求（主提供商超过p95延迟未返回时并发请求备选提供商）
+            messages: 完整的对话消息列表，提供时忽略prompt
+            response_format: 响应格式（如JSON模式 {"type": "json_object"}）
 
         Returns:
             str: 模型响应
         """
+        # 记录模型调用信息
+        tools_info = f"，工具数量: {len(tools) if tools else 0}" if tools else ""
+        self.logger.info(
+            f"🔧 调用LLM: {model.upper()}{tools_info}，温度: {temperature}")
+        # 构建请求参数
+        request_params = {
+            "messages": messages or [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+
+        # 添加工具定义（如果提供）
+        if tools:
+            request_params["tools"] = tools
+            request_params["tool_choice"] = tool_choice
+        if response_format:
+            request_params["response_format"] = response_format
+
+        providers = self.router.route(model, failover=self.settings.llm_failover_enabled)
+        if not providers:
+            self.logger.error(f"LLM调用失败 ({model}): 不支持的模型")
+            raise APIException(f"LLM API调用失败: 不支持的模型: {model}")
+
+        last_error: Optional[Exception] = None
+        i = 0
+        while i < len(providers):
+            provider = providers[i]
+            # 对冲请求同时消耗主备两个提供商
+            hedged = hedge and i + 1 < len(providers)
+            step = 2 if hedged else 1
+            try:
+                if hedged:
+                    return await self._call_with_hedge(provider, providers[i + 1], request_params)
+                return await self._call_provider(provider, request_params)
+            except Exception as e:
+                last_error = e
+                if not is_failover_error(e):
+                    break
+                if i + step < len(providers):
+                    self.logger.warning(f"🔀 {provider} 调用失败 ({e})，故障转移到 {providers[i + step]}")
+            i += step
+
+        self.logger.error(f"LLM调用失败 ({model}): {last_error}")
+        raise APIException(f"LLM API调用失败: {str(last_error)}")
+
+    async def _call_llm_structured(
+        self,
+        model: str,
+        prompt: str,
+        response_model: Type[StructuredModel],
+        max_tokens: int = 1000,
+        temperature: float = 0.3,
+        hedge: bool = False
+    ) -> StructuredModel:
+        """
+        以JSON模式调用大模型并用pydantic模型校验输出
+        校验失败时携带错误信息重新请求一次，仍失败则抛出LLMException
+
+        Args:
+            model: 模型名称 (gpt/deepseek/auto)
+            prompt: 提示词
+            response_model: 期望的输出模型
+            max_tokens: 最大令牌数
+            temperature: 温度参数
+            hedge: 是否启用对冲请求
+
+        Returns:
+            StructuredModel: 校验通过的输出
+        """
+        schema = json.dumps(response_model.model_json_schema(), ensure_ascii=False)
+        messages = [
+            {"role": "system", "content": f"只返回符合以下JSON Schema的JSON对象，不要输出任何其他内容：\n{schema}"},
+            {"role": "user", "content": prompt}
+        ]
+
+        for attempt in range(1 + STRUCTURED_REASK_LIMIT):
+            content = await self._call_llm(
+                model=model,
+                prompt=prompt,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                hedge=hedge,
+                messages=messages,
+                response_format={"type": "json_object"}
+            )
+            try:
+                return response_model.model_validate_json(content)
+            except ValidationError as e:
+                if attempt == STRUCTURED_REASK_LIMIT:
+                    raise LLMException(
+                        f"{response_model.__name__} 结构化输出校验失败: {e}",
+                        details={"errors": e.errors(include_url=False)}
+                    )
+                self.logger.warning(f"⚠️ {response_model.__name__} 输出校验失败，携带错误信息重新请求: {e.error_count()} 个错误")
+                messages = messages + [
+                    {"role": "assistant", "content": content},
+                    {"role": "user", "content": f"上一次输出未通过校验：\n{e}\n请修正后只返回符合Schema的JSON对象。"}
+                ]
+
+    async def _call_llm_tool_calls(
+        self,
+        model: str,
+        prompt: str,
+        tools: List[Dict[str, Any]],
+        argument_models: Dict[str, Type[BaseModel]],
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        hedge: bool = False,
+        required_tools: Optional[List[str]] = None
+    ) -> List[Tuple[str, BaseModel]]:
+        """
+        强制大模型调用工具并用pydantic模型校验每个工具调用的参数
+        没有工具调用、缺少必需工具或参数校验失败时携带错误信息重新请求一次
+
+        Args:
+            model: 模型名称 (gpt/deepseek/auto)
+            prompt: 提示词
+            tools: 工具定义列表
+            argument_models: 工具名到参数模型的映射
+            max_tokens: 最大令牌数
+            temperature: 温度参数
+            hedge: 是否启用对冲请求
+            required_tools: 必须至少调用一次的工具名
+
+        Returns:
+            List[Tuple[str, BaseModel]]: (工具名, 校验通过的参数) 列表
+        """
+        messages = [{"role": "user", "content": prompt}]
+
+        for attempt in range(1 + STRUCTURED_REASK_LIMIT):
+            content = await self._call_llm(
+                model=model,
+                prompt=prompt,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                tools=tools,
+                tool_choice="required",
+                hedge=hedge,
+                messages=messages
+            )
+
+            calls: List[Tuple[str, BaseModel]] = []
+            errors: List[str] = []
+            for tool_call in self._extract_tool_calls(content):
+                name = tool_call["function"]["name"]
+                if name not in argument_models:
+                    errors.append(f"未知工具: {name}")
+                    continue
+                try:
+                    calls.append((name, argument_models[name].model_validate_json(tool_call["function"]["arguments"])))
+                except ValidationError as e:
+                    errors.append(f"{name} 参数无效: {e}")
+
+            if not errors and not calls:
+                errors.append("没有调用任何工具")
+            called = {name for name, _ in calls}
+            for name in required_tools or []:
+                if name not in called:
+                    errors.append(f"缺少必需的工具调用: {name}")
+            if not errors:
+                return calls
+            if attempt == STRUCTURED_REASK_LIMIT:
+                if calls and called.issuperset(required_tools or []):
+                    self.logger.warning(f"⚠️ 丢弃 {len(errors)} 个无效工具调用，保留 {len(calls)} 个")
+                    return calls
+                raise LLMException(f"工具调用校验失败: {'; '.join(errors)}")
+
+            self.logger.warning(f"⚠️ 工具调用校验失败，携带错误信息重新请求: {'; '.join(errors)}")
+            messages = messages + [
+                {"role": "user", "content": "上一次的工具调用未通过校验：\n" + "\n".join(errors) + "\n请使用正确的参数重新调用工具。"}
+            ]
+
+    async def stream_tool_calls(
+        self,
+        model: str,
+        prompt: str,
+        tools: List[Dict[str, Any]],
+        argument_models: Dict[str, Type[BaseModel]],
+        max_tokens: int = 1000,
+        temperature: float = 0.7
+    ) -> AsyncIterator[Tuple[str, BaseModel]]:
+        """
+        流式调用大模型，每个工具调用的参数完整并校验通过后立即产出
+        调用方可以在模型输出剩余计划的同时开始执行已到达的工具调用
+
+        Args:
+            model: 模型名称 (gpt/deepseek/auto)
+            prompt: 提示词
+            tools: 工具定义列表
+            argument_models: 工具名到参数模型的映射
+            max_tokens: 最大令牌数
+            temperature: 温度参数
+
+        Yields:
+            Tuple[str, BaseModel]: (工具名, 校验通过的参数)
+        """
+        request_params = {
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "tools": tools,
+            "tool_choice": "required",
+            "stream": True,
+            "stream_options": {"include_usage": True}
+        }
+        provider, stream = await self._open_stream(model, request_params)
+
+        start = time.monotonic()
+        assembler = ToolCallAssembler()
         try:
-            # 记录模型调用信息
-            tools_info = f"，工具数量: {len(tools) if tools else 0}" if tools else ""
-            self.logger.info(
-                f"🔧 调用LLM: {model.upper()}{tools_info}，温度: {temperature}")
-            # 构建请求参数
-            messages = [{"role": "user", "content": prompt}]
-            request_params = {
-                "messages": messages,
-                "max_tokens": max_tokens,
-                "temperature": temperature
-            }
-
-            # 添加工具定义（如果提供）
-            if tools:
-                request_params["tools"] = tools
-                request_params["tool_choice"] = tool_choice
-
-            if model.lower() == "gpt":
-                # 使用GPT-4 Turbo，Function Calling能力更强
-                actual_model = "gpt-4-turbo-preview"
-                self.logger.info(
-                    f"📡 实际调用模型: {actual_model} (支持强化Function Calling)")
-                response = await self.openai_client.chat.completions.create(
-                    model=actual_model,
+            async for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    self._record_usage(provider, chunk.usage)
+                for name, arguments in assembler.feed(chunk):
+                    validated = self._validate_tool_call(name, arguments, argument_models)
+                    if validated is not None:
+                        yield name, validated
+            for name, arguments in assembler.flush():
+                validated = self._validate_tool_call(name, arguments, argument_models)
+                if validated is not None:
+                    yield name, validated
+        except asyncio.CancelledError:
+            # 调用方被取消时立即关闭连接，不再接收剩余输出
+            await _close_stream(stream)
+            raise
+        except Exception as e:
+            self.router.record_failure(provider, e, time.monotonic() - start)
+            raise
+        self.router.record_success(provider, time.monotonic() - start)
+
+    async def _open_stream(self, model: str, request_params: Dict[str, Any]) -> Tuple[str, Any]:
+        """
+        打开流式响应，建立连接失败时按路由顺序故障转移
+        """
+        self.logger.info(f"🔧 流式调用LLM: {model.upper()}，工具数量: {len(request_params.get('tools', []))}")
+        providers = self.router.route(model, failover=self.settings.llm_failover_enabled)
+        if not providers:
+            raise APIException(f"LLM API调用失败: 不支持的模型: {model}")
+
+        last_error: Optional[Exception] = None
+        for provider in providers:
+            client = self.openai_client if provider == "gpt" else self.deepseek_client
+
+            async def attempt():
+                return await client.chat.completions.create(
+                    model=PROVIDER_MODELS[provider],
                     **request_params
                 )
-                return self._process_llm_response(response)
 
-            elif model.lower() == "deepseek":
-                actual_model = "deepseek-chat"
-                self.logger.debug(f"📡 实际调用模型: {actual_model}")
-                response = await self.deepseek_client.chat.completions.create(
+            try:
+                return provider, await retry_async(attempt, provider=provider, idempotent=False)
+            except Exception as e:
+                self.router.record_failure(provider, e)
+                last_error = e
+                if not is_failover_error(e):
+                    break
+                self.logger.warning(f"🔀 {provider} 流式调用失败 ({e})，尝试下一个提供商")
+
+        raise APIException(f"LLM API调用失败: {str(last_error)}")
+
+    def _validate_tool_call(
+        self,
+        name: str,
+        arguments: str,
+        argument_models: Dict[str, Type[BaseModel]]
+    ) -> Optional[BaseModel]:
+        """校验单个工具调用的参数，无效时记录并返回None"""
+        if name not in argument_models:
+            self.logger.warning(f"⚠️ 忽略未知工具调用: {name}")
+            return None
+        try:
+            return argument_models[name].model_validate_json(arguments)
+        except ValidationError as e:
+            self.logger.warning(f"⚠️ 忽略参数无效的工具调用 {name}: {e.error_count()} 个错误")
+            return None
+
+    @staticmethod
+    def _extract_tool_calls(content: str) -> List[Dict[str, Any]]:
+        """从_process_llm_response序列化的响应中取出工具调用列表"""
+        try:
+            data = json.loads(content)
+        except (TypeError, ValueError):
+            return []
+        if not isinstance(data, dict):
+            return []
+        return data.get("tool_calls", [])
+
+    async def _call_provider(self, provider: str, request_params: Dict[str, Any]) -> str:
+        """
+        调用单个提供商，并将延迟和结果记录到路由器
+        """
+        actual_model = PROVIDER_MODELS[provider]
+        client = self.openai_client if provider == "gpt" else self.deepseek_client
+        self.logger.debug("📡 实际调用模型: %s", actual_model)
+
+        async def attempt():
+            start = time.monotonic()
+            try:
+                response = await client.chat.completions.create(
                     model=actual_model,
                     **request_params
                 )
-                return self._process_llm_response(response)
-
+            except Exception as e:
+                self.router.record_failure(provider, e, time.monotonic() - start)
+                raise
+            self.router.record_success(provider, time.monotonic() - start)
+            return response
+
+        # 生成调用按非幂等处理：超时和5xx交给路由器故障转移，避免同一提供商重复计费
+        response = await retry_async(attempt, provider=provider, idempotent=False)
+        if getattr(response, "usage", None):
+            self._record_usage(provider, response.usage)
+        return self._process_llm_response(response)
+
+    @staticmethod
+    def _record_usage(provider: str, usage: Any) -> None:
+        """把响应中的token用量计入指标"""
+        metrics = get_metrics()
+        metrics.increment("llm_tokens_total", usage.prompt_tokens or 0, provider=provider, kind="prompt")
+        metrics.increment("llm_tokens_total", usage.completion_tokens or 0, provider=provider, kind="completion")
+
+    async def _call_with_hedge(
+        self,
+        primary: str,
+        backup: str,
+        request_params: Dict[str, Any]
+    ) -> str:
+        """
+        对冲请求：主提供商在对冲延迟内未返回时并发请求备选提供商，取先成功的结果；
+        主提供商在对冲延迟内就失败（如快速返回的503、429）时立即请求备选提供商
+        """
+        delay = self.router.hedge_delay(primary, self.settings.llm_hedge_delay)
+        primary_task = asyncio.create_task(self._call_provider(primary, request_params))
+        pending = {primary_task}
+        last_error: Optional[BaseException] = None
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done:
+                last_error = primary_task.exception()
+                if last_error is None:
+                    return primary_task.result()
+                if not is_failover_error(last_error):
+                    raise last_error
+                self.logger.warning(f"🔀 {primary} 调用失败 ({last_error})，立即请求 {backup}")
+                pending = set()
             else:
-                raise LLMException(f"不支持的模型: {model}")
-
-        except Exception as e:
-            self.logger.error(f"LLM调用失败 ({model}): {e}")
-            raise APIException(f"LLM API调用失败: {str(e)}")
+                self.logger.info(f"⚡ {primary} 超过 {delay:.1f}s 未返回，发起对冲请求到 {backup}")
+            pending.add(asyncio.create_task(self._call_provider(backup, request_params)))
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
 
     def _process_llm_response(self, response) -> str:
         """
@@ -290,14 +654,9 @@ class LLMService(LoggerMixin):
         choice = response.choices[0]
         message = choice.message
 
-        # 如果是普通文本响应
-        if message.content:
-            return message.content
-
-        # 如果是工具调用响应
+        # 如果是工具调用响应（优先于伴随的文本内容）
         if hasattr(message, 'tool_calls') and message.tool_calls:
             # 返回工具调用信息的JSON字符串
-            import json
             tool_calls = []
             for tool_call in message.tool_calls:
                 tool_calls.append({
@@ -309,6 +668,10 @@ class LLMService(LoggerMixin):
                 })
             return json.dumps({"tool_calls": tool_calls})
 
+        # 如果是普通文本响应
+        if message.content:
+            return message.content
+
         return ""
 
     def _build_topic_expansion_prompt(self, topic: str, language: str) -> str:
@@ -321,22 +684,10 @@ class LLMService(LoggerMixin):
 
 主题：{topic}
 
-请按以下格式返回：
-
-扩展关键词：
-- 关键词1
-- 关键词2
-- 关键词3
-
-相关概念：
-- 概念1
-- 概念2
-- 概念3
-
-推荐搜索查询：
-- 查询1
-- 查询2
-- 查询3
+请返回JSON对象，包含以下字段：
+- extended_keywords: 扩展关键词列表
+- related_concepts: 相关概念列表
+- search_queries: 推荐搜索查询列表
 
 要求：
 1. 关键词应该涵盖主题的不同方面
@@ -350,22 +701,10 @@ You are a topic research expert. Please help me expand the following topic by ge
 
 Topic: {topic}
 
-Please return in the following format:
-
-Extended Keywords:
-- keyword1
-- keyword2
-- keyword3
-
-Related Concepts:
-- concept1
-- concept2
-- concept3
-
-Recommended Search Queries:
-- query1
-- query2
-- query3
+Please return a JSON object with the following fields:
+- extended_keywords: list of extended keywords
+- related_concepts: list of related concepts
+- search_queries: list of recommended search queries
 
 Requirements:
 1. Keywords should cover different aspects of the topic
@@ -377,17 +716,26 @@ Requirements:
     def _build_awesome_list_prompt(
         self,
         topic: str,
-        search_results: SearchResults,
-        language: str
+        search_results: ResultSet,
+        language: str,
+        model: Optional[str] = None
     ) -> str:
         """
         构建生成Awesome List的提示词
+        搜索结果按目标模型的输入token预算打包，排名靠前的结果保留更长的摘要
         """
-        # 准备搜索结果摘要
-        results_summary = []
-        for i, result in enumerate(search_results.results[:10], 1):  # 限制结果数量
-            results_summary.append(
-                f"{i}. [{result.title}]({result.url}) - {result.source} - {result.content[:200]}..."
+        packer = PromptPacker(model or self.settings.default_llm_model)
+        results_summary = packer.pack_results(
+            search_results.results,
+            budget_tokens=self.settings.generation_prompt_token_budget,
+            format_item=lambda i, result, snippet: (
+                f"{i}. [{result.title}]({result.url}) - {result.source} - {snippet}"
+            )
+        )
+
+        if len(results_summary) < len(search_results.results):
+            self.logger.info(
+                f"提示词token预算限制: 保留 {len(results_summary)}/{len(search_results.results)} 个搜索结果"
             )
 
         results_text = "\n".join(results_summary)
@@ -455,95 +803,30 @@ Format example:
 Please ensure the generated content is accurate, useful, and well-structured.
 """
 
-    def _parse_topic_expansion_response(self, response: str, original_topic: str) -> ExtendedTopic:
+    def _build_extended_topic(self, response: TopicExpansionOutput, original_topic: str) -> ExtendedTopic:
         """
-        解析主题扩展响应
+        将校验通过的主题扩展输出整理为ExtendedTopic
         """
-        try:
-            self.logger.info(f"🔍 开始解析主题扩展响应...")
-            lines = response.strip().split('\n')
-
-            extended_keywords = []
-            related_concepts = []
-            search_queries = []
-
-            current_section = None
-
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-
-                if "扩展关键词" in line or "Extended Keywords" in line:
-                    current_section = "keywords"
-                    self.logger.debug(f"📝 进入扩展关键词部分")
-                elif "相关概念" in line or "Related Concepts" in line:
-                    current_section = "concepts"
-                    self.logger.debug(f"📝 进入相关概念部分")
-                elif "搜索查询" in line or "Search Queries" in line or "推荐搜索查询" in line or "Recommended Search Queries" in line:
-                    current_section = "queries"
-                    self.logger.debug(f"📝 进入搜索查询部分")
-                elif line.startswith('- '):
-                    item = line[2:].strip()
-                    # 过滤掉空字符串
-                    if not item:
-                        self.logger.debug(f"⚠️ 跳过空项目")
-                        continue
-                        
-                    if current_section == "keywords":
-                        extended_keywords.append(item)
-                        self.logger.debug(f"🔑 添加关键词: {item}")
-                    elif current_section == "concepts":
-                        related_concepts.append(item)
-                        self.logger.debug(f"💡 添加概念: {item}")
-                    elif current_section == "queries":
-                        search_queries.append(item)
-                        self.logger.debug(f"🔍 添加查询: {item}")
-
-            # 过滤掉所有空字符串
-            extended_keywords = [kw for kw in extended_keywords if kw and kw.strip()]
-            related_concepts = [concept for concept in related_concepts if concept and concept.strip()]
-            search_queries = [query for query in search_queries if query and query.strip()]
-
-            # 记录解析统计
-            self.logger.info(f"📊 解析统计 - 关键词:{len(extended_keywords)}, 概念:{len(related_concepts)}, 查询:{len(search_queries)}")
-
-            # 确保包含原始主题
-            if original_topic and original_topic not in extended_keywords:
-                extended_keywords.insert(0, original_topic)
-                self.logger.debug(f"🔄 添加原始主题到关键词: {original_topic}")
-
-            # 如果解析失败，提供默认值
-            if not extended_keywords:
-                extended_keywords = [original_topic] if original_topic else ["general topic"]
-                self.logger.warning(f"⚠️ 未解析到关键词，使用默认值: {extended_keywords}")
-            if not search_queries:
-                search_queries = [original_topic, f"{original_topic} tutorial"] if original_topic else ["general search"]
-                self.logger.warning(f"⚠️ 未解析到查询，使用默认值: {search_queries}")
-
-            result = ExtendedTopic(
-                original_topic=original_topic,
-                extended_keywords=extended_keywords,
-                related_concepts=related_concepts,
-                search_queries=search_queries
-            )
-            
-            self.logger.info(f"✅ 主题扩展响应解析完成")
-            self.logger.info(f"🎯 最终关键词: {result.extended_keywords}")
-            self.logger.info(f"🎯 最终概念: {result.related_concepts}")
-            
-            return result
-
-        except Exception as e:
-            self.logger.error(f"❌ 解析主题扩展响应失败: {e}", exc_info=True)
-            fallback_result = ExtendedTopic(
-                original_topic=original_topic,
-                extended_keywords=[original_topic] if original_topic else ["fallback topic"],
-                related_concepts=[],
-                search_queries=[original_topic, f"{original_topic} tutorial", f"awesome {original_topic}"] if original_topic else ["fallback search"]
-            )
-            self.logger.warning(f"🔄 使用解析失败时的默认结果: {fallback_result.extended_keywords}")
-            return fallback_result
+        # 过滤掉所有空字符串
+        extended_keywords = [kw.strip() for kw in response.extended_keywords if kw and kw.strip()]
+        related_concepts = [concept.strip() for concept in response.related_concepts if concept and concept.strip()]
+        search_queries = [query.strip() for query in response.search_queries if query and query.strip()]
+
+        # 确保包含原始主题
+        if original_topic and original_topic not in extended_keywords:
+            extended_keywords.insert(0, original_topic)
+            self.logger.debug("🔄 添加原始主题到关键词: %s", original_topic)
+
+        if not search_queries:
+            search_queries = [original_topic, f"{original_topic} tutorial"]
+            self.logger.warning(f"⚠️ 模型未给出搜索查询，使用默认值: {search_queries}")
+
+        return ExtendedTopic(
+            original_topic=original_topic,
+            extended_keywords=extended_keywords,
+            related_concepts=related_concepts,
+            search_queries=search_queries
+        )
 
     def _post_process_awesome_list(self, content: str, topic: str) -> str:
         """
@@ -0,0 +1,273 @@
+"""
+本地搜索索引模块
+保存所有检索到的搜索结果，基于BM25倒排索引为重复主题提供无需外部调用的毫秒级搜索
+"""
+
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.models import ResultRecord
+from app.utils import get_settings, LoggerMixin
+
+
+# 中日韩文字连续片段或英文/数字单词
+TOKEN_PATTERN = re.compile(
+    r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]+|[a-z0-9]+"
+)
+
+# 标题词频的加权倍数
+TITLE_BOOST = 2
+# BM25得分达到该值时归一化评分为0.5
+HALF_SCORE = 5.0
+# 日志行数超过文档数的该倍数时压缩索引文件
+COMPACT_RATIO = 2
+
+
+def tokenize(text: str) -> Iterator[str]:
+    """
+    分词：英文按单词切分，中日韩文字没有空格分隔，按相邻二字组切分（单字保留单字）
+
+    Args:
+        text: 原始文本
+
+    Yields:
+        str: 小写的词项
+    """
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group()
+        if token[0] < "\u3040":
+            yield token
+        elif len(token) == 1:
+            yield token
+        else:
+            for i in range(len(token) - 1):
+                yield token[i:i + 2]
+
+
+def _host_of(url: str) -> str:
+    return url.split("://", 1)[-1].split("/", 1)[0]
+
+
+@dataclass
+class IndexedDocument:
+    """索引中的一个文档"""
+    __slots__ = ("url", "title", "content", "source", "published_date", "host", "length", "terms")
+
+    url: str
+    title: str
+    content: str
+    source: str
+    published_date: Optional[str]
+    host: str
+    length: int
+    terms: Dict[str, int]
+
+    def to_dict(self) -> Dict[str, Optional[str]]:
+        """持久化格式"""
+        return {
+            "url": self.url,
+            "title": self.title,
+            "content": self.content,
+            "source": self.source,
+            "published_date": self.published_date,
+        }
+
+
+class LocalIndex(LoggerMixin):
+    """
+    本地BM25倒排索引
+    索引常驻内存，新文档追加写入磁盘上的JSONL文件，启动时回放恢复；
+    写文件时不持有索引锁，检索不会等待磁盘I/O
+    """
+
+    def __init__(self, path: Optional[str] = None, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        # 串行化文件写入（先于索引锁获取），保证追加和压缩按内存更新的顺序落盘
+        self._file_lock = threading.Lock()
+        self._documents: Dict[str, IndexedDocument] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._total_length = 0
+        self._log_lines = 0
+
+        if path and os.path.exists(path):
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def _load(self) -> None:
+        """回放索引文件"""
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                self._log_lines += 1
+                try:
+                    data = json.loads(line)
+                except ValueError:
+                    continue
+                self._index_document(
+                    data["url"], data.get("title", ""), data.get("content", ""),
+                    data.get("source", "website"), data.get("published_date")
+                )
+        self.logger.info(f"📚 本地索引已加载: {len(self._documents)} 个文档")
+
+    def add_results(self, records: List[ResultRecord]) -> int:
+        """
+        增量加入搜索结果，已存在且内容未变的URL会被跳过
+
+        Args:
+            records: 搜索结果
+
+        Returns:
+            int: 新增或更新的文档数
+        """
+        with self._file_lock:
+            with self._lock:
+                changed = []
+                for record in records:
+                    existing = self._documents.get(record.url)
+                    if existing and existing.title == record.title and existing.content == record.content:
+                        continue
+                    changed.append(self._index_document(
+                        record.url, record.title, record.content, record.source, record.published_date
+                    ))
+                if not changed or not self.path:
+                    return len(changed)
+                documents, mode = self._plan_write(changed)
+
+            self._write(documents, mode)
+            return len(changed)
+
+    def _index_document(
+        self,
+        url: str,
+        title: str,
+        content: str,
+        source: str,
+        published_date: Optional[str]
+    ) -> IndexedDocument:
+        """建立（或替换）单个文档的倒排记录"""
+        self._remove_document(url)
+
+        terms = Counter(tokenize(content))
+        for term in tokenize(title):
+            terms[term] += TITLE_BOOST
+
+        document = IndexedDocument(
+            url=url, title=title, content=content, source=source, published_date=published_date,
+            host=_host_of(url), length=sum(terms.values()), terms=dict(terms)
+        )
+        self._documents[url] = document
+        self._total_length += document.length
+        for term, frequency in document.terms.items():
+            self._postings.setdefault(term, {})[url] = frequency
+        return document
+
+    def _remove_document(self, url: str) -> None:
+        document = self._documents.pop(url, None)
+        if document is None:
+            return
+        self._total_length -= document.length
+        for term in document.terms:
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(url, None)
+                if not posting:
+                    del self._postings[term]
+
+    def _plan_write(self, documents: List[IndexedDocument]) -> Tuple[List[IndexedDocument], str]:
+        """决定追加写入还是整体重写（过期记录过多时），须持有索引锁"""
+        self._log_lines += len(documents)
+        if self._log_lines > COMPACT_RATIO * max(len(self._documents), 1):
+            documents = list(self._documents.values())
+            self._log_lines = len(documents)
+            return documents, "w"
+        return documents, "a"
+
+    def _write(self, documents: List[IndexedDocument], mode: str) -> None:
+        """写入索引文件（文档对象替换而不原地修改，写入时无需持有索引锁）"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(self.path, mode, encoding="utf-8") as f:
+            for document in documents:
+                f.write(json.dumps(document.to_dict(), ensure_ascii=False) + "\n")
+
+    def search(
+        self,
+        query: str,
+        max_results: int = 10,
+        include_domains: Optional[List[str]] = None,
+        exclude_domains: Optional[List[str]] = None
+    ) -> List[ResultRecord]:
+        """
+        BM25检索
+
+        Args:
+            query: 查询文本
+            max_results: 最大结果数
+            include_domains: 只返回这些域名下的结果
+            exclude_domains: 排除这些域名下的结果
+
+        Returns:
+            List[ResultRecord]: 按BM25得分降序的结果，评分归一化到0-1
+        """
+        with self._lock:
+            if not self._documents:
+                return []
+
+            document_count = len(self._documents)
+            average_length = self._total_length / document_count
+            scores: Dict[str, float] = {}
+
+            for term in set(tokenize(query)):
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (document_count - len(posting) + 0.5) / (len(posting) + 0.5))
+                for url, frequency in posting.items():
+                    length_norm = 1 - self.b + self.b * self._documents[url].length / average_length
+                    scores[url] = scores.get(url, 0.0) + idf * frequency * (self.k1 + 1) / (
+                        frequency + self.k1 * length_norm
+                    )
+
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            results = []
+            for url, score in ranked:
+                document = self._documents[url]
+                if include_domains and not any(document.host.endswith(d) for d in include_domains):
+                    continue
+                if exclude_domains and any(document.host.endswith(d) for d in exclude_domains):
+                    continue
+                results.append(ResultRecord.create(
+                    title=document.title,
+                    url=document.url,
+                    content=document.content,
+                    score=score / (score + HALF_SCORE),
+                    source=document.source,
+                    published_date=document.published_date
+                ))
+                if len(results) >= max_results:
+                    break
+            return results
+
+
+@lru_cache()
+def get_local_index() -> LocalIndex:
+    """
+    获取进程内共享的本地索引（带缓存）
+
+    Returns:
+        LocalIndex: 本地索引实例
+    """
+    return LocalIndex(get_settings().local_index_path)
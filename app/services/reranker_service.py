@@ -5,17 +5,32 @@ Reranker RAG 服务
 """
 
 import asyncio
+import heapq
+import itertools
 import re
 import xml.etree.ElementTree as ET
 from datetime import datetime, timezone
-from typing import List, Dict, Any, Optional, Tuple, Literal
+from typing import List, Dict, Any, Awaitable, Callable, Optional, Tuple, Literal
 from dataclasses import dataclass
-import aiohttp
-import json
 
-from app.models.search_models import SearchResult, SearchResults
+from app.backends import create_metadata_backend
+from app.models.result_record import ResultRecord, ResultSet
+from app.models.llm_models import ScoringOutput
+from app.utils.config import get_settings
 from app.utils.logger import LoggerMixin
+from app.utils.metrics import get_metrics
+from app.utils.retry import retry_async
+from app.utils.token_budget import get_token_counter, plan_batches
 from app.services.llm_service import LLMService
+from app.services.warm_store import get_warm_store, is_warming, record_metadata
+
+
+# 超过该长度（字符）的arXiv响应在线程池中解析，避免大文档阻塞事件循环
+ARXIV_INLINE_PARSE_LIMIT = 64 * 1024
+
+# 增量重排序在搜索完成前最多提前评分的结果数（目标数量的倍数），
+# 超出的结果等到截断后的最终结果确定后再评分，避免为不会保留的结果获取元数据
+EARLY_SCORING_FACTOR = 2
 
 
 @dataclass
@@ -81,7 +96,9 @@ class RerankerService(LoggerMixin):
     
     def __init__(self):
         super().__init__()
-        self.session: Optional[aiohttp.ClientSession] = None
+        self.settings = get_settings()
+        self.metadata_backend = create_metadata_backend(self.settings)
+        self._session_users = 0
         self.llm_service = LLMService()
         
         # 权重配置（规则评分）
@@ -100,32 +117,50 @@ class RerankerService(LoggerMixin):
             "utility": 0.20         # 实用性权重
         }
         
-        # API配置
-        self.github_api_base = "https://api.github.com"
-        self.arxiv_api_base = "http://export.arxiv.org/api/query"
+        # 大模型评分的token配置
+        self.scoring_snippet_tokens = 120        # 每个结果摘要的最大token数
+        self.scoring_output_tokens_per_item = 90  # 每个结果评分JSON的预计输出token数
+        self.scoring_max_tokens = 2000            # 单次评分调用的最大输出token数
         
     async def __aenter__(self):
         """异步上下文管理器入口"""
-        self.session = aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=30),
-            headers={
-                "User-Agent": "AwesomeAgent/1.0 (Academic Research Tool)"
-            }
-        )
+        self._session_users += 1
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """异步上下文管理器出口"""
-        if self.session:
-            await self.session.close()
+        self._session_users -= 1
+        if self._session_users == 0:
+            await self.close()
+    
+    async def close(self) -> None:
+        """释放元数据后端的HTTP会话（增量评分和重排序共用，使用时按需创建）"""
+        await self.metadata_backend.close()
+    
+    def incremental(
+        self,
+        query: str,
+        target_count: Optional[int] = None,
+        scoring_method: Literal["rule_based", "llm_based"] = "rule_based"
+    ) -> "IncrementalReranker":
+        """
+        创建增量重排序器，用于搜索结果分批到达的场景
+        
+        Args:
+            query: 查询词
+            target_count: 保留的结果数量（top-K）
+            scoring_method: 评分方法 ("rule_based" 或 "llm_based")
+        """
+        early_limit = target_count * EARLY_SCORING_FACTOR if target_count else None
+        return IncrementalReranker(self, query, target_count, scoring_method, early_limit)
     
     async def rerank_search_results(
         self,
-        search_results: SearchResults,
+        search_results: ResultSet,
         query: str,
         target_count: Optional[int] = None,
         scoring_method: Literal["rule_based", "llm_based"] = "rule_based"
-    ) -> SearchResults:
+    ) -> ResultSet:
         """
         对搜索结果进行重新排序
         
@@ -140,104 +175,113 @@ class RerankerService(LoggerMixin):
         
         try:
             async with self:
-                # 根据评分方法选择处理流程
-                if scoring_method == "llm_based":
-                    scores = await self._calculate_llm_scores_batch(search_results.results, query)
-                else:
-                    # 并行计算规则评分
-                    tasks = [
-                        self._calculate_reranking_score(result, query)
-                        for result in search_results.results
-                    ]
-                    scores = await asyncio.gather(*tasks, return_exceptions=True)
-                
-                # 处理结果
-                valid_results = []
-                for i, score in enumerate(scores):
-                    if isinstance(score, Exception):
-                        self.logger.warning(f"重排序第{i}个结果失败: {score}")
-                        # 根据评分方法使用相应的默认评分结构
-                        if scoring_method == "llm_based":
-                            score = LLMRerankingScore(
-                                total_score=search_results.results[i].score,
-                                relevance_score=search_results.results[i].score,
-                                authority_score=0.0,
-                                quality_score=0.0,
-                                utility_score=0.0,
-                                reasoning="评分失败，使用原始分数",
-                                details={"error": str(score)}
-                            )
-                        else:
-                            score = RerankingScore(
-                                total_score=search_results.results[i].score,
-                                relevance_score=search_results.results[i].score,
-                                authority_score=0.0,
-                                recency_score=0.0,
-                                completeness_score=0.0,
-                                details={"error": str(score)}
-                            )
-                    valid_results.append((search_results.results[i], score))
-                
-                # 按总分排序
-                valid_results.sort(key=lambda x: x[1].total_score, reverse=True)
+                scores = await self._score_results(search_results.results, query, scoring_method)
                 
-                # 限制结果数量
-                if target_count:
-                    valid_results = valid_results[:target_count]
+                # 只取前target_count个，无需对全部结果排序
+                scored = list(zip(search_results.results, scores))
+                count = target_count or len(scored)
+                ranked = heapq.nlargest(count, scored, key=lambda item: item[1].total_score)
                 
-                # 构建重排序结果
-                reranked_results = []
-                for result, score in valid_results:
-                    reranked_result = SearchResult(
-                        title=result.title,
-                        url=result.url,
-                        content=result.content,
-                        score=score.total_score,
-                        source=result.source,
-                        published_date=result.published_date
-                    )
-                    reranked_results.append(reranked_result)
-                
-                processing_time = (datetime.now() - start_time).total_seconds()
-                
-                self.logger.info(
-                    f"重排序完成，处理 {len(reranked_results)} 个结果，"
-                    f"耗时: {processing_time:.2f}秒"
-                )
-                
-                # 根据评分方法设置不同的过滤器信息
-                filters_applied = {
-                    **search_results.filters_applied,
-                    "reranked": True,
-                    "scoring_method": scoring_method
-                }
-                
-                if scoring_method == "llm_based":
-                    filters_applied["reranking_weights"] = self.llm_weights
-                else:
-                    filters_applied["reranking_weights"] = self.weights
-                
-                return SearchResults(
-                    query=search_results.query,
-                    results=reranked_results,
-                    total_count=len(reranked_results),
-                    search_time=search_results.search_time + processing_time,
-                    filters_applied=filters_applied
-                )
+                return self._build_reranked_results(search_results, ranked, scoring_method, start_time)
                 
         except Exception as e:
             self.logger.error(f"重排序过程中发生错误: {e}", exc_info=True)
             return search_results
     
+    async def _score_results(
+        self,
+        results: List[ResultRecord],
+        query: str,
+        scoring_method: str
+    ) -> List[Any]:
+        """
+        为一批结果评分，失败的结果使用原始分数作为默认评分
+        
+        Returns:
+            List[Any]: 与results一一对应的评分（RerankingScore或LLMRerankingScore）
+        """
+        if scoring_method == "llm_based":
+            scores = await self._calculate_llm_scores_batch(results, query)
+        else:
+            # 并行计算规则评分
+            tasks = [self._calculate_reranking_score(result, query) for result in results]
+            scores = await asyncio.gather(*tasks, return_exceptions=True)
+        
+        valid_scores = []
+        for i, score in enumerate(scores):
+            if isinstance(score, Exception):
+                self.logger.warning(f"重排序第{i}个结果失败: {score}")
+                score = self._fallback_score(results[i], scoring_method, str(score))
+            valid_scores.append(score)
+        return valid_scores
+    
+    def _fallback_score(self, result: ResultRecord, scoring_method: str, error: str) -> Any:
+        """根据评分方法构建使用原始分数的默认评分"""
+        if scoring_method == "llm_based":
+            return LLMRerankingScore(
+                total_score=result.score,
+                relevance_score=result.score,
+                authority_score=0.0,
+                quality_score=0.0,
+                utility_score=0.0,
+                reasoning="评分失败，使用原始分数",
+                details={"error": error}
+            )
+        return RerankingScore(
+            total_score=result.score,
+            relevance_score=result.score,
+            authority_score=0.0,
+            recency_score=0.0,
+            completeness_score=0.0,
+            details={"error": error}
+        )
+    
+    def _build_reranked_results(
+        self,
+        search_results: ResultSet,
+        ranked: List[Tuple[ResultRecord, Any]],
+        scoring_method: str,
+        start_time: datetime
+    ) -> ResultSet:
+        """根据已排序的 (结果, 评分) 列表构建重排序结果"""
+        reranked_results = [result.with_score(score.total_score) for result, score in ranked]
+        
+        processing_time = (datetime.now() - start_time).total_seconds()
+        
+        self.logger.info(
+            f"重排序完成，处理 {len(reranked_results)} 个结果，"
+            f"耗时: {processing_time:.2f}秒"
+        )
+        
+        # 根据评分方法设置不同的过滤器信息
+        filters_applied = {
+            **search_results.filters_applied,
+            "reranked": True,
+            "scoring_method": scoring_method
+        }
+        
+        if scoring_method == "llm_based":
+            filters_applied["reranking_weights"] = self.llm_weights
+        else:
+            filters_applied["reranking_weights"] = self.weights
+        
+        return ResultSet(
+            query=search_results.query,
+            results=reranked_results,
+            total_count=len(reranked_results),
+            search_time=search_results.search_time + processing_time,
+            filters_applied=filters_applied
+        )
+    
     async def _calculate_reranking_score(
         self,
-        result: SearchResult,
+        result: ResultRecord,
         query: str
     ) -> RerankingScore:
         """计算重排序得分"""
         try:
             # 根据来源获取元数据并计算得分
-            url_str = str(result.url)
+            url_str = result.url
             if "arxiv.org" in url_str:
                 metadata = await self._get_arxiv_metadata(url_str)
                 scores = await self._calculate_arxiv_scores(metadata, result, query)
@@ -282,15 +326,12 @@ class RerankerService(LoggerMixin):
             if not arxiv_id:
                 return None
             
-            api_url = f"{self.arxiv_api_base}?id_list={arxiv_id}"
-            
-            async with self.session.get(api_url) as response:
-                if response.status != 200:
-                    self.logger.warning(f"arXiv API请求失败: {response.status}")
-                    return None
-                
-                xml_content = await response.text()
-                return self._parse_arxiv_response(xml_content)
+            xml_content = await self._fetch_metadata(
+                "arxiv", arxiv_id, lambda: self.metadata_backend.fetch_arxiv(arxiv_id)
+            )
+            if len(xml_content) > ARXIV_INLINE_PARSE_LIMIT:
+                return await asyncio.to_thread(self._parse_arxiv_response, xml_content)
+            return self._parse_arxiv_response(xml_content)
                 
         except Exception as e:
             self.logger.warning(f"获取arXiv元数据失败 {arxiv_url}: {e}")
@@ -303,20 +344,39 @@ class RerankerService(LoggerMixin):
             if not repo_path:
                 return None
             
-            api_url = f"{self.github_api_base}/repos/{repo_path}"
-            
-            async with self.session.get(api_url) as response:
-                if response.status != 200:
-                    self.logger.warning(f"GitHub API请求失败: {response.status}")
-                    return None
-                
-                repo_data = await response.json()
-                return self._parse_github_response(repo_data)
+            repo_data = await self._fetch_metadata(
+                "github", repo_path, lambda: self.metadata_backend.fetch_github(repo_path)
+            )
+            return self._parse_github_response(repo_data)
                 
         except Exception as e:
             self.logger.warning(f"获取GitHub元数据失败 {github_url}: {e}")
             return None
     
+    async def _fetch_metadata(self, provider: str, item_id: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        获取元数据的原始响应
+        预热存储中有时直接使用，不发起外部调用；预热任务获取的元数据写入预热存储（其他任务的在任务被取消时写入）
+        """
+        warm_store = get_warm_store() if self.settings.warm_enabled else None
+        if warm_store is not None and not is_warming():
+            try:
+                payload = await warm_store.get_metadata_async(provider, item_id, self.settings.warm_ttl)
+            except Exception as e:
+                self.logger.warning(f"⚠️ 查询预热存储失败，继续实时获取元数据: {e}")
+                payload = None
+            get_metrics().increment("warm_store_queries_total", kind=provider, hit=payload is not None)
+            if payload is not None:
+                return payload
+        
+        payload = await retry_async(fetch, provider=provider)
+        if warm_store is not None:
+            if is_warming():
+                await warm_store.put_metadata_async(provider, item_id, payload)
+            else:
+                record_metadata(provider, item_id, payload)
+        return payload
+    
     def _extract_arxiv_id(self, url: str) -> Optional[str]:
         """从arXiv URL中提取论文ID"""
         patterns = [
@@ -425,7 +485,7 @@ class RerankerService(LoggerMixin):
     async def _calculate_arxiv_scores(
         self,
         metadata: Optional[ArxivMetadata],
-        result: SearchResult,
+        result: ResultRecord,
         query: str
     ) -> Dict[str, Any]:
         """计算arXiv论文得分"""
@@ -459,7 +519,7 @@ class RerankerService(LoggerMixin):
     async def _calculate_github_scores(
         self,
         metadata: Optional[GitHubMetadata],
-        result: SearchResult,
+        result: ResultRecord,
         query: str
     ) -> Dict[str, Any]:
         """计算GitHub仓库得分"""
@@ -492,13 +552,13 @@ class RerankerService(LoggerMixin):
     
     async def _calculate_basic_scores(
         self,
-        result: SearchResult,
+        result: ResultRecord,
         query: str
     ) -> Dict[str, Any]:
         """计算基础得分"""
         relevance_score = self._calculate_text_relevance(
             query,
-            f"{result.title} {result.content}",
+            result.text_lower,
             result.score
         )
         
@@ -673,7 +733,7 @@ class RerankerService(LoggerMixin):
 
     async def _calculate_llm_scores_batch(
         self,
-        results: List[SearchResult],
+        results: List[ResultRecord],
         query: str
     ) -> List[LLMRerankingScore]:
         """
@@ -689,22 +749,34 @@ class RerankerService(LoggerMixin):
         self.logger.info(f"开始使用大模型评分 {len(results)} 个搜索结果")
         
         try:
-            # 将结果分批处理，避免单次请求过大
-            batch_size = 5  # 每批最多5个结果
-            all_scores = []
-            
-            for i in range(0, len(results), batch_size):
-                batch = results[i:i + batch_size]
-                self.logger.info(f"处理第 {i//batch_size + 1} 批，包含 {len(batch)} 个结果")
-                
-                batch_scores = await self._score_results_batch_with_llm(batch, query)
-                all_scores.extend(batch_scores)
-                
-                # 避免API请求过于频繁
-                if i + batch_size < len(results):
-                    await asyncio.sleep(1)
+            # 按token预算动态分批，避免单次请求过大或输出被截断
+            settings = self.llm_service.settings
+            counter = get_token_counter(self.llm_service.resolve_model(self.llm_service.auxiliary_model))
+            snippets = [
+                counter.truncate(result.content, self.scoring_snippet_tokens)
+                for result in results
+            ]
+            item_tokens = [
+                counter.count(self._format_scoring_item(i, result, snippet))
+                for i, (result, snippet) in enumerate(zip(results, snippets), 1)
+            ]
+            batches = plan_batches(
+                item_tokens,
+                budget_tokens=settings.scoring_prompt_token_budget,
+                max_batch_size=settings.scoring_max_batch_size,
+                output_tokens_per_item=self.scoring_output_tokens_per_item,
+                max_output_tokens=self.scoring_max_tokens
+            )
+            self.logger.info(f"分 {len(batches)} 批并发评分，每批 {', '.join(str(len(b)) for b in batches)} 个结果")
             
-            return all_scores
+            # 各批并发调用，调用频率由外部调用调度器的配额和限流重试控制
+            batch_scores = await asyncio.gather(*(
+                self._score_results_batch_with_llm(
+                    [results[i] for i in indices], query, [snippets[i] for i in indices]
+                )
+                for indices in batches
+            ))
+            return [score for scores in batch_scores for score in scores]
             
         except Exception as e:
             self.logger.error(f"大模型批量评分失败: {e}")
@@ -724,25 +796,26 @@ class RerankerService(LoggerMixin):
     
     async def _score_results_batch_with_llm(
         self,
-        results: List[SearchResult],
-        query: str
+        results: List[ResultRecord],
+        query: str,
+        snippets: Optional[List[str]] = None
     ) -> List[LLMRerankingScore]:
         """
         使用大模型对一批搜索结果进行评分
         """
         try:
-            prompt = self._build_llm_scoring_prompt(results, query)
+            prompt = self._build_llm_scoring_prompt(results, query, snippets)
             
-            # 调用大模型进行评分，使用系统默认模型保持一致性
-            response = await self.llm_service._call_llm(
-                model=self.llm_service.settings.default_llm_model,
+            # 调用大模型进行评分，由路由器选择当前最快的健康提供商
+            response = await self.llm_service._call_llm_structured(
+                model=self.llm_service.auxiliary_model,
                 prompt=prompt,
-                max_tokens=2000,
+                response_model=ScoringOutput,
+                max_tokens=self.scoring_max_tokens,
                 temperature=0.1  # 低温度确保评分一致性
             )
             
-            # 解析响应
-            scores = self._parse_llm_scoring_response(response, results)
+            scores = self._build_llm_scores(response, results)
             
             return scores
             
@@ -762,27 +835,36 @@ class RerankerService(LoggerMixin):
                 for result in results
             ]
     
+    def _format_scoring_item(self, index: int, result: ResultRecord, snippet: str) -> str:
+        """渲染评分提示词中的单个结果"""
+        return f"""
+结果 {index}:
+标题: {result.title}
+来源: {result.source}
+链接: {result.url}
+内容摘要: {snippet}
+发布时间: {result.published_date or '未知'}
+原始评分: {result.score:.2f}
+"""
+    
     def _build_llm_scoring_prompt(
         self,
-        results: List[SearchResult],
-        query: str
+        results: List[ResultRecord],
+        query: str,
+        snippets: Optional[List[str]] = None
     ) -> str:
         """
         构建大模型评分的提示词
         """
+        if snippets is None:
+            counter = get_token_counter(self.llm_service.resolve_model(self.llm_service.auxiliary_model))
+            snippets = [counter.truncate(result.content, self.scoring_snippet_tokens) for result in results]
+        
         # 构建结果信息
-        results_info = []
-        for i, result in enumerate(results, 1):
-            result_text = f"""
-结果 {i}:
-标题: {result.title}
-来源: {result.source}
-链接: {result.url}
-内容摘要: {result.content[:500]}...
-发布时间: {result.published_date or '未知'}
-原始评分: {result.score:.2f}
-"""
-            results_info.append(result_text)
+        results_info = [
+            self._format_scoring_item(i, result, snippet)
+            for i, (result, snippet) in enumerate(zip(results, snippets), 1)
+        ]
         
         prompt = f"""
 你是一个专业的学术搜索结果评分专家。请为以下搜索结果进行多维度评分。
@@ -847,92 +929,235 @@ class RerankerService(LoggerMixin):
         
         return prompt
     
-    def _parse_llm_scoring_response(
+    def _build_llm_scores(
         self,
-        response: str,
-        results: List[SearchResult]
+        response: ScoringOutput,
+        results: List[ResultRecord]
     ) -> List[LLMRerankingScore]:
         """
-        解析大模型评分响应
+        将校验通过的大模型评分映射到对应的搜索结果
         """
-        try:
-            # 尝试解析JSON响应
-            import json
-            
-            # 提取JSON部分
-            response = response.strip()
-            if response.startswith("```json"):
-                response = response[7:]
-            if response.endswith("```"):
-                response = response[:-3]
-            
-            parsed_response = json.loads(response)
-            scores_data = parsed_response.get("scores", [])
-            
-            # 构建评分结果
-            llm_scores = []
-            
-            for i, result in enumerate(results):
-                # 查找对应的评分数据
-                score_data = None
-                for score in scores_data:
-                    if score.get("result_index") == i + 1:
-                        score_data = score
-                        break
-                
-                if score_data:
-                    # 计算加权总分
-                    total_score = (
-                        score_data.get("relevance_score", 0.5) * self.llm_weights["relevance"] +
-                        score_data.get("authority_score", 0.5) * self.llm_weights["authority"] +
-                        score_data.get("quality_score", 0.5) * self.llm_weights["quality"] +
-                        score_data.get("utility_score", 0.5) * self.llm_weights["utility"]
-                    )
-                    
-                    llm_score = LLMRerankingScore(
-                        total_score=total_score,
-                        relevance_score=score_data.get("relevance_score", 0.5),
-                        authority_score=score_data.get("authority_score", 0.5),
-                        quality_score=score_data.get("quality_score", 0.5),
-                        utility_score=score_data.get("utility_score", 0.5),
-                        reasoning=score_data.get("reasoning", "无详细说明"),
-                        details={
-                            "llm_model": self.llm_service.settings.default_llm_model,
-                            "weights_used": self.llm_weights
-                        }
-                    )
-                else:
-                    # 使用默认评分
-                    llm_score = LLMRerankingScore(
-                        total_score=result.score,
-                        relevance_score=result.score,
-                        authority_score=0.5,
-                        quality_score=0.5,
-                        utility_score=0.5,
-                        reasoning="LLM响应中未找到对应评分",
-                        details={"error": "missing_score_data"}
-                    )
-                
-                llm_scores.append(llm_score)
+        scores_by_index = {score.result_index: score for score in response.scores}
+        llm_scores = []
+        
+        for i, result in enumerate(results, 1):
+            score_data = scores_by_index.get(i)
             
-            return llm_scores
+            if score_data:
+                # 计算加权总分
+                total_score = (
+                    score_data.relevance_score * self.llm_weights["relevance"] +
+                    score_data.authority_score * self.llm_weights["authority"] +
+                    score_data.quality_score * self.llm_weights["quality"] +
+                    score_data.utility_score * self.llm_weights["utility"]
+                )
+                
+                llm_score = LLMRerankingScore(
+                    total_score=total_score,
+                    relevance_score=score_data.relevance_score,
+                    authority_score=score_data.authority_score,
+                    quality_score=score_data.quality_score,
+                    utility_score=score_data.utility_score,
+                    reasoning=score_data.reasoning,
+                    details={
+                        "llm_model": self.llm_service.settings.default_llm_model,
+                        "weights_used": self.llm_weights
+                    }
+                )
+            else:
+                # 使用默认评分
+                llm_score = LLMRerankingScore(
+                    total_score=result.score,
+                    relevance_score=result.score,
+                    authority_score=0.5,
+                    quality_score=0.5,
+                    utility_score=0.5,
+                    reasoning="LLM响应中未找到对应评分",
+                    details={"error": "missing_score_data"}
+                )
             
-        except json.JSONDecodeError as e:
-            self.logger.error(f"LLM响应JSON解析失败: {e}")
-            self.logger.debug(f"原始响应: {response}")
-        except Exception as e:
-            self.logger.error(f"LLM评分响应解析失败: {e}")
+            llm_scores.append(llm_score)
         
-        # 解析失败时返回默认评分
-        return [
-            LLMRerankingScore(
-                total_score=result.score,
-                relevance_score=result.score,
-                authority_score=0.5,
-                quality_score=0.5,
-                utility_score=0.5,
-                reasoning="LLM响应解析失败",
-                details={"error": "parse_failed"}
+        return llm_scores
+
+
+class IncrementalReranker(LoggerMixin):
+    """
+    增量重排序器
+    搜索结果分批到达时逐批评分（最多提前评分early_limit个），
+    搜索截断后只对最终保留的结果取top-K，或在截止时间到达时放弃未完成的批次
+    """
+    
+    def __init__(
+        self,
+        reranker_service: RerankerService,
+        query: str,
+        target_count: Optional[int] = None,
+        scoring_method: Literal["rule_based", "llm_based"] = "rule_based",
+        early_limit: Optional[int] = None
+    ):
+        self.reranker_service = reranker_service
+        self.query = query
+        self.target_count = target_count
+        self.scoring_method = scoring_method
+        self.early_limit = early_limit
+        
+        # URL到 (到达序号, 评分) 的映射：同分时按到达序号排序，先到达的结果排在前面
+        self._scores: Dict[str, Tuple[int, Any]] = {}
+        self._sequence = itertools.count()
+        self._seen_urls: set = set()
+        self._pending: Dict[asyncio.Task, List[ResultRecord]] = {}
+        self.start_time = datetime.now()
+        self.scored_count = 0
+        self.straggler_count = 0
+        self.deferred_count = 0
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+    
+    async def close(self) -> None:
+        """取消未完成的批次（等待其退出）并释放HTTP会话"""
+        tasks = list(self._pending)
+        self._pending.clear()
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        await self.reranker_service.close()
+    
+    def submit(self, results: List[ResultRecord]) -> None:
+        """
+        提交一批新到达的结果，立即在后台开始评分（重复URL会被忽略）
+        
+        提前评分的结果达到early_limit后不再接受新结果，
+        其中在截断后保留下来的结果由ranked_results补交
+        
+        Args:
+            results: 新到达的搜索结果
+        """
+        if self.early_limit is not None:
+            room = max(0, self.early_limit - len(self._seen_urls))
+            new_results = [result for result in results if result.url not in self._seen_urls]
+            self.deferred_count += max(0, len(new_results) - room)
+            results = new_results[:room]
+        self._submit(results)
+    
+    def _submit(self, results: List[ResultRecord]) -> None:
+        batch = []
+        for result in results:
+            url = result.url
+            if url not in self._seen_urls:
+                self._seen_urls.add(url)
+                batch.append(result)
+        if not batch:
+            return
+        
+        # 规则评分逐个结果独立进行，单个慢请求不会拖住整批；大模型评分按批调用
+        batches = [[result] for result in batch] if self.scoring_method == "rule_based" else [batch]
+        for scoring_batch in batches:
+            task = asyncio.create_task(
+                self.reranker_service._score_results(scoring_batch, self.query, self.scoring_method)
             )
-            for result in results
-        ] 
\ No newline at end of file
+            self._pending[task] = scoring_batch
+            task.add_done_callback(self._on_batch_scored)
+    
+    def _on_batch_scored(self, task: asyncio.Task) -> None:
+        """批次评分完成后合并进top-K堆"""
+        batch = self._pending.pop(task, None)
+        if batch is None or task.cancelled():
+            return
+        
+        error = task.exception()
+        if error is not None:
+            self.logger.warning(f"批次评分失败，使用原始分数: {error}")
+            scores = [self.reranker_service._fallback_score(r, self.scoring_method, str(error)) for r in batch]
+        else:
+            scores = task.result()
+        
+        for result, score in zip(batch, scores):
+            self._push(result, score)
+        self.scored_count += len(batch)
+    
+    def _push(self, result: ResultRecord, score: Any) -> None:
+        self._scores[result.url] = (next(self._sequence), score)
+    
+    @property
+    def pending_count(self) -> int:
+        """尚未完成评分的结果数量"""
+        return sum(len(batch) for batch in self._pending.values())
+    
+    def snapshot(self, results: List[ResultRecord]) -> List[Tuple[ResultRecord, Any]]:
+        """
+        results中已完成评分的结果的top-K排序快照（不等待未完成的批次）
+        
+        Args:
+            results: 候选结果（截断后的搜索结果），未在其中的已评分结果不参与排序
+            
+        Returns:
+            List[Tuple[ResultRecord, Any]]: 按总分降序的 (结果, 评分) 列表
+        """
+        scored = [(result, *self._scores[result.url]) for result in results if result.url in self._scores]
+        count = self.target_count if self.target_count is not None else len(scored)
+        # 排序键：总分降序，同分时到达序号升序
+        top = heapq.nlargest(count, scored, key=lambda entry: (entry[2].total_score, -entry[1]))
+        return [(result, score) for result, _, score in top]
+    
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待已提交的批次评分完成，超时后取消剩余批次
+        
+        超时未完成的结果按原始分数参与排序，不会丢失
+        
+        Args:
+            timeout: 最长等待秒数，None表示一直等待
+            
+        Returns:
+            bool: 是否全部评分完成
+        """
+        if self._pending:
+            await asyncio.wait(list(self._pending), timeout=timeout)
+        
+        stragglers = list(self._pending.items())
+        for task, batch in stragglers:
+            self._pending.pop(task, None)
+            task.cancel()
+            for result in batch:
+                self._push(result, self.reranker_service._fallback_score(result, self.scoring_method, "评分超时"))
+            self.straggler_count += len(batch)
+        
+        if stragglers:
+            self.logger.warning(f"⏱️ 重排序截止时间到达，{self.straggler_count} 个结果未完成评分，使用原始分数")
+        return not stragglers
+    
+    async def ranked_results(self, search_results: ResultSet, timeout: Optional[float] = None) -> ResultSet:
+        """
+        等待评分（最多timeout秒）后返回重排序结果
+        
+        只对search_results中的结果排序（提前评分但被截断的结果不会出现在结果中），
+        未经submit的结果会在此补交
+        
+        Args:
+            search_results: 搜索阶段的汇总结果
+            timeout: 最长等待秒数
+            
+        Returns:
+            ResultSet: 重排序后的top-K结果
+        """
+        async with self.reranker_service:
+            self._submit(search_results.results)
+            await self.wait(timeout)
+        
+        reranked = self.reranker_service._build_reranked_results(
+            search_results, self.snapshot(search_results.results), self.scoring_method, self.start_time
+        )
+        kept = {result.url for result in search_results.results}
+        reranked.filters_applied["incremental_rerank"] = {
+            "scored": self.scored_count,
+            "stragglers": self.straggler_count,
+            "deferred": self.deferred_count,
+            "discarded": sum(1 for url in self._scores if url not in kept)
+        }
+        return reranked
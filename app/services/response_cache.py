@@ -0,0 +1,199 @@
+"""
+生成结果缓存模块
+在 generate_awesome_list* 之前缓存完整的生成响应（stale-while-revalidate）：
+新鲜期内直接返回；过期但仍在可用期内时立即返回旧结果，同时在后台重新生成；
+同一请求键的并发生成和后台刷新只执行一次；等待同一生成的请求全部取消（如客户端断开连接）时取消该生成
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from app.models import GenerateAwesomeListResponse
+from app.utils import get_settings, get_metrics, scheduling_lane, LoggerMixin
+from app.utils.scheduler import BACKGROUND
+
+
+# 缓存状态（通过 X-Cache 响应头返回）
+HIT = "HIT"
+STALE = "STALE"
+MISS = "MISS"
+BYPASS = "BYPASS"
+
+# 生成函数：参数为是否为后台刷新（刷新时应跳过历史复用，确保得到新结果）
+Generator = Callable[[bool], Awaitable[GenerateAwesomeListResponse]]
+
+
+@dataclass
+class CacheEntry:
+    """缓存的生成响应"""
+    __slots__ = ("response", "created_at")
+
+    response: GenerateAwesomeListResponse
+    created_at: float
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+
+class ResponseCache(LoggerMixin):
+    """
+    进程内的生成响应缓存（LRU）
+
+    - 年龄 < fresh_ttl: HIT，直接返回
+    - fresh_ttl <= 年龄 < stale_ttl: STALE，直接返回并在后台刷新
+    - 其余情况: MISS，等待生成；并发的相同请求共享同一次生成，所有等待者都取消时取消生成（后台刷新不受影响）
+    """
+
+    def __init__(self, fresh_ttl: float, stale_ttl: float, max_entries: int):
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = max(stale_ttl, fresh_ttl)
+        self.max_entries = max_entries
+        self.metrics = get_metrics()
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._refreshing: Set[asyncio.Task] = set()
+        # 各生成任务的等待者数量
+        self._waiters: Dict[asyncio.Task, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_or_generate(
+        self,
+        key: str,
+        generate: Generator,
+        bypass: bool = False
+    ) -> Tuple[GenerateAwesomeListResponse, str, float]:
+        """
+        读取缓存或生成响应
+
+        Args:
+            key: 规范化的请求键
+            generate: 生成函数
+            bypass: 跳过缓存读取（强制重新生成），结果仍会写入缓存
+
+        Returns:
+            Tuple[GenerateAwesomeListResponse, str, float]: (响应, 缓存状态, 响应年龄秒数)
+        """
+        entry = None if bypass else self._entries.get(key)
+        if entry is not None:
+            age = entry.age
+            if age < self.fresh_ttl:
+                self._entries.move_to_end(key)
+                self._count(HIT)
+                return entry.response, HIT, age
+            if age < self.stale_ttl:
+                self._entries.move_to_end(key)
+                self._count(STALE)
+                self._refresh(key, generate)
+                return entry.response, STALE, age
+
+        status = BYPASS if bypass else MISS
+        self._count(status)
+        # 等待共享的生成任务；当前请求被取消时不影响其他等待者和缓存写入
+        task = self._start(key, generate, refresh=bypass)
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            response = await asyncio.shield(task)
+        finally:
+            self._release(key, task)
+        return response, status, 0.0
+
+    def _release(self, key: str, task: asyncio.Task) -> None:
+        """等待者离开，最后一个等待者被取消时取消仍在进行的生成（后台刷新除外）"""
+        waiters = self._waiters.pop(task) - 1
+        if waiters > 0:
+            self._waiters[task] = waiters
+            return
+        if task.done() or task in self._refreshing:
+            return
+        task.cancel()
+        # 立即移出进行中列表，之后的相同请求重新开始生成，不会加入正在取消的任务
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        self.metrics.increment("response_cache_cancelled_total")
+        self.logger.info(f"🛑 等待者已全部取消，取消生成: {key}")
+
+    def _start(self, key: str, generate: Generator, refresh: bool) -> asyncio.Task:
+        """启动（或加入已有的）生成任务"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._generate(key, generate, refresh))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._on_done(key, done))
+        return task
+
+    def _on_done(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # 标记异常已读取：所有等待者都已取消时避免“异常未被读取”的告警
+            task.exception()
+
+    async def _generate(self, key: str, generate: Generator, refresh: bool) -> GenerateAwesomeListResponse:
+        response = await generate(refresh)
+        # 复用自生成历史的响应不写入缓存，避免把旧结果当作新结果继续保存；过载降级的结果同样不缓存
+        if not response.reused and not response.degradations:
+            self._store(key, response)
+        return response
+
+    def _refresh(self, key: str, generate: Generator) -> None:
+        """后台刷新过期条目，同一键同时只有一个刷新；刷新的外部调用使用后台通道"""
+        if key in self._inflight:
+            return
+        with scheduling_lane(BACKGROUND):
+            task = self._start(key, generate, refresh=True)
+        self._refreshing.add(task)
+        task.add_done_callback(self._on_refreshed)
+
+    def _on_refreshed(self, task: asyncio.Task) -> None:
+        self._refreshing.discard(task)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            self.metrics.increment("response_cache_refresh_total", outcome="error")
+            self.logger.warning(f"⚠️ 后台刷新缓存失败，继续使用旧结果: {error}")
+        else:
+            self.metrics.increment("response_cache_refresh_total", outcome="success")
+
+    def _store(self, key: str, response: GenerateAwesomeListResponse) -> None:
+        self._entries[key] = CacheEntry(response=response, created_at=time.time())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _count(self, status: str) -> None:
+        self.metrics.increment("response_cache_requests_total", status=status)
+
+    def put(self, key: str, response: GenerateAwesomeListResponse) -> None:
+        """直接写入一条响应（如缓存预热的生成结果）"""
+        self._store(key, response)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """删除指定键，未指定时清空缓存"""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+
+@lru_cache()
+def get_response_cache() -> ResponseCache:
+    """
+    获取进程内共享的生成结果缓存（带缓存）
+
+    Returns:
+        ResponseCache: 生成结果缓存实例
+    """
+    settings = get_settings()
+    return ResponseCache(
+        fresh_ttl=settings.response_cache_fresh_ttl,
+        stale_ttl=settings.response_cache_stale_ttl,
+        max_entries=settings.response_cache_max_entries,
+    )
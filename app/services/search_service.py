@@ -1,17 +1,22 @@
 """
 搜索服务模块
-集成Tavily API实现多源智能搜索
+通过可替换的搜索后端（默认Tavily API）实现多源智能搜索
 """
 
 import asyncio
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
-from tavily import TavilyClient
 import httpx
 
-from app.models import SearchResult, SearchResults, ExtendedTopic
-from app.utils import get_settings, get_logger, SearchException, APIException, LoggerMixin
+from app.backends import create_search_backend
+from app.models import ResultRecord, ResultSet, ExtendedTopic
+from app.services.local_index import get_local_index
+from app.services.warm_store import get_warm_store, is_warming, record_search, search_key
+from app.services.admission import is_degraded, REDUCED_SEARCH
+from app.utils import (
+    get_settings, get_logger, get_metrics, SearchException, APIException, PreemptedException, LoggerMixin, retry_async
+)
 
 
 class SearchService(LoggerMixin):
@@ -22,7 +27,9 @@ class SearchService(LoggerMixin):
     
     def __init__(self):
         self.settings = get_settings()
-        self.tavily_client = TavilyClient(api_key=self.settings.tavily_api_key)
+        self.search_backend = create_search_backend(self.settings)
+        self.local_index = get_local_index() if self.settings.local_index_enabled else None
+        self.warm_store = get_warm_store() if self.settings.warm_enabled else None
         
     async def search_topic(
         self,
@@ -32,7 +39,7 @@ class SearchService(LoggerMixin):
         include_domains: Optional[List[str]] = None,
         exclude_domains: Optional[List[str]] = None,
         academic_only: bool = True
-    ) -> SearchResults:
+    ) -> ResultSet:
         """
         搜索指定主题的相关资源
         
@@ -45,7 +52,7 @@ class SearchService(LoggerMixin):
             academic_only: 是否仅搜索学术资源 (arXiv, GitHub, Hugging Face)
             
         Returns:
-            SearchResults: 搜索结果
+            ResultSet: 搜索结果
         """
         start_time = datetime.now()
         self.logger.info(f"开始搜索主题: {topic}, 最大结果数: {max_results}, 学术模式: {academic_only}")
@@ -61,9 +68,11 @@ class SearchService(LoggerMixin):
             
             # 执行多个搜索查询
             all_results = []
-            for query in extended_queries[:3]:  # 限制查询数量避免过多API调用
+            # 限制查询数量避免过多API调用，过载降级时只执行主查询
+            query_limit = 1 if is_degraded(REDUCED_SEARCH) else 3
+            for query in extended_queries[:query_limit]:
                 try:
-                    results = await self._search_with_tavily(
+                    results = await self._search_query(
                         query=query,
                         max_results=max(3, max_results // len(extended_queries)),
                         search_depth=search_depth,
@@ -72,8 +81,9 @@ class SearchService(LoggerMixin):
                     )
                     all_results.extend(results)
                     
-                    # 避免API限制，添加短暂延迟
-                    await asyncio.sleep(0.1)
+                    # 避免API限制，添加短暂延迟（纯离线检索无需等待）
+                    if self._uses_live_search:
+                        await asyncio.sleep(0.1)
                     
                 except Exception as e:
                     self.logger.warning(f"搜索查询 '{query}' 失败: {e}")
@@ -90,7 +100,7 @@ class SearchService(LoggerMixin):
             
             self.logger.info(f"搜索完成，找到 {len(final_results)} 个结果，耗时: {search_time:.2f}s")
             
-            return SearchResults(
+            return ResultSet(
                 query=topic,
                 results=final_results,
                 total_count=len(final_results),
@@ -100,7 +110,8 @@ class SearchService(LoggerMixin):
                     "search_depth": search_depth,
                     "include_domains": include_domains,
                     "exclude_domains": exclude_domains,
-                    "academic_only": academic_only
+                    "academic_only": academic_only,
+                    "local_index_mode": self.settings.local_index_mode if self.local_index else None
                 }
             )
             
@@ -166,6 +177,90 @@ class SearchService(LoggerMixin):
         
         return queries
     
+    @property
+    def _uses_live_search(self) -> bool:
+        """是否会调用Tavily（离线模式且启用了本地索引时不会）"""
+        return self.local_index is None or self.settings.local_index_mode != "offline"
+    
+    async def _search_query(
+        self,
+        query: str,
+        max_results: int = 5,
+        search_depth: str = "basic",
+        include_domains: Optional[List[str]] = None,
+        exclude_domains: Optional[List[str]] = None
+    ) -> List[ResultRecord]:
+        """
+        执行单个查询，按本地索引模式组合本地索引和Tavily
+        
+        - offline: 只查询本地索引，不发起外部调用
+        - hybrid: 本地索引结果作为第一批来源，与实时结果合并
+        - fallback: 只在Tavily失败（宕机、限流等）时使用本地索引
+        
+        预热存储中有该查询的结果时直接使用，不调用Tavily；Tavily返回的结果会增量写入本地索引，
+        预热任务的结果同时写入预热存储（其他任务的结果在任务被取消时写入）
+        
+        Returns:
+            List[ResultRecord]: 搜索结果列表（可能包含重复URL，由调用方去重）
+        """
+        metrics = get_metrics()
+        local_results: List[ResultRecord] = []
+        if self.local_index is not None and self.settings.local_index_mode in ("offline", "hybrid"):
+            local_results = await asyncio.to_thread(
+                self.local_index.search, query, max_results, include_domains, exclude_domains
+            )
+            metrics.increment("local_index_queries_total", hit=bool(local_results))
+            if self.settings.local_index_mode == "offline":
+                return local_results
+        
+        warm_key = search_key(query, max_results, include_domains, exclude_domains)
+        warm_results = await self._get_warm_results(warm_key)
+        if warm_results is not None:
+            return warm_results + local_results
+        
+        try:
+            live_results = await self._search_with_tavily(
+                query=query,
+                max_results=max_results,
+                search_depth=search_depth,
+                include_domains=include_domains,
+                exclude_domains=exclude_domains
+            )
+        except APIException as e:
+            if self.local_index is None:
+                raise
+            local_results = local_results or await asyncio.to_thread(
+                self.local_index.search, query, max_results, include_domains, exclude_domains
+            )
+            if not local_results:
+                raise
+            metrics.increment("local_index_fallback_total")
+            self.logger.warning(f"⚠️ Tavily不可用，使用本地索引的 {len(local_results)} 个结果: {e}")
+            return local_results
+        
+        if self.local_index is not None and live_results:
+            await asyncio.to_thread(self.local_index.add_results, live_results)
+        if self.warm_store is not None:
+            if is_warming():
+                await self.warm_store.put_search_async(warm_key, live_results)
+            else:
+                record_search(warm_key, live_results)
+        
+        # 实时结果在前，去重时优先保留Tavily的原始评分
+        return live_results + local_results
+    
+    async def _get_warm_results(self, key: str) -> Optional[List[ResultRecord]]:
+        """查询预热存储中的搜索结果（预热任务本身不读取，确保拿到新结果）"""
+        if self.warm_store is None or is_warming():
+            return None
+        try:
+            results = await self.warm_store.get_search_async(key, self.settings.warm_ttl)
+        except Exception as e:
+            self.logger.warning(f"⚠️ 查询预热存储失败，继续实时搜索: {e}")
+            return None
+        get_metrics().increment("warm_store_queries_total", kind="search", hit=results is not None)
+        return results
+    
     async def _search_with_tavily(
         self,
         query: str,
@@ -173,7 +268,7 @@ class SearchService(LoggerMixin):
         search_depth: str = "basic",
         include_domains: Optional[List[str]] = None,
         exclude_domains: Optional[List[str]] = None
-    ) -> List[SearchResult]:
+    ) -> List[ResultRecord]:
         """
         使用Tavily API执行搜索
         
@@ -185,10 +280,10 @@ class SearchService(LoggerMixin):
             exclude_domains: 排除的域名
             
         Returns:
-            List[SearchResult]: 搜索结果列表
+            List[ResultRecord]: 搜索结果列表
         """
         try:
-            self.logger.debug(f"执行Tavily搜索: {query}")
+            self.logger.debug("执行搜索 (%s): %s", self.search_backend.name, query)
             
             # 构建搜索参数
             search_params = {
@@ -204,14 +299,17 @@ class SearchService(LoggerMixin):
             if exclude_domains:
                 search_params["exclude_domains"] = exclude_domains
             
-            # 执行搜索
-            response = self.tavily_client.search(**search_params)
+            # 执行搜索（搜索为幂等操作，瞬时错误按统一策略重试）
+            async def attempt():
+                return await self.search_backend.search(**search_params)
+
+            response = await retry_async(attempt, provider="tavily")
             
-            # 解析结果
+            # 解析结果（轻量记录，URL只规范化一次）
             results = []
             for item in response.get("results", []):
                 try:
-                    result = SearchResult(
+                    result = ResultRecord.create(
                         title=item.get("title", ""),
                         url=item.get("url", ""),
                         content=item.get("content", ""),
@@ -226,6 +324,9 @@ class SearchService(LoggerMixin):
             
             return results
             
+        except PreemptedException as e:
+            # 后台或预热调用让位于用户请求，不是故障（仍可按本地索引模式回退）
+            raise APIException(f"Tavily搜索调用被抢占: {e.message}")
         except Exception as e:
             self.logger.error(f"Tavily搜索失败: {e}")
             raise APIException(f"Tavily搜索API调用失败: {str(e)}")
@@ -253,7 +354,7 @@ class SearchService(LoggerMixin):
         else:
             return "website"
     
-    def _deduplicate_results(self, results: List[SearchResult]) -> List[SearchResult]:
+    def _deduplicate_results(self, results: List[ResultRecord]) -> List[ResultRecord]:
         """
         去除重复的搜索结果
         """
@@ -269,13 +370,20 @@ class SearchService(LoggerMixin):
     
     def _sort_results_by_relevance(
         self, 
-        results: List[SearchResult], 
+        results: List[ResultRecord], 
         topic: str
-    ) -> List[SearchResult]:
+    ) -> List[ResultRecord]:
         """
         按相关性对搜索结果排序
         """
-        def calculate_relevance_score(result: SearchResult) -> float:
+        topic_keywords = topic.lower().split()
+        
+        def calculate_relevance_score(result: ResultRecord) -> float:
+            cache_key = ("search_relevance", topic)
+            cached = result.features.get(cache_key)
+            if cached is not None:
+                return cached
+            
             score = result.score
             
             # 根据源类型调整分数
@@ -291,19 +399,16 @@ class SearchService(LoggerMixin):
             }
             score *= source_weights.get(result.source, 1.0)
             
-            # 根据标题和内容中的关键词匹配调整分数
-            topic_keywords = topic.lower().split()
-            title_lower = result.title.lower()
-            content_lower = result.content.lower()
-            
+            # 根据标题和内容中的关键词匹配调整分数（使用预先转换的小写文本）
             keyword_bonus = 0
             for keyword in topic_keywords:
-                if keyword in title_lower:
+                if keyword in result.title_lower:
                     keyword_bonus += 0.1
-                if keyword in content_lower:
+                if keyword in result.content_lower:
                     keyword_bonus += 0.05
             
             score += keyword_bonus
+            result.features[cache_key] = score
             
             return score
         
@@ -0,0 +1,338 @@
+"""
+主题规范化模块
+把写法不同的同一主题（"Vue.js"、"vuejs"、"Vue JS"、"VUE.js 前端开发" 以及中文说法）映射到同一个规范键，
+供生成历史、结果缓存等所有缓存层共用
+
+规范化步骤：Unicode兼容归一和大小写折叠 → 按英文单词和中日韩文字片段切分、去除标点 →
+中英文别名表（中英文混写的别名先在原文中匹配，英文按相邻单词拼接匹配，中文按最长匹配）→ 从主题扩展结果中学到的同义词 →
+去掉停用词、去重并排序得到规范键
+"""
+
+import json
+import os
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.models import GenerateAwesomeListRequest
+from app.utils import get_settings, LoggerMixin
+
+
+# 规范词 -> 别名（别名中的空格和标点在匹配时忽略，英文复数形式自动处理）
+TOPIC_ALIASES: Dict[str, List[str]] = {
+    "vue": ["vue", "vuejs", "vue.js"],
+    "react": ["react", "reactjs", "react.js"],
+    "angular": ["angular", "angularjs"],
+    "nodejs": ["nodejs", "node.js"],
+    "javascript": ["javascript", "js"],
+    "typescript": ["typescript"],
+    "golang": ["golang", "go", "go语言"],
+    "kubernetes": ["kubernetes", "k8s"],
+    "frontend": ["frontend", "front end", "frontend development", "前端", "前端开发", "web前端"],
+    "backend": ["backend", "back end", "backend development", "后端", "后端开发"],
+    "web development": ["web development", "web开发", "网页开发"],
+    "microservice": ["microservice", "micro service", "微服务"],
+    "database": ["database", "数据库"],
+    "artificial intelligence": ["artificial intelligence", "ai", "人工智能"],
+    "machine learning": ["machine learning", "ml", "机器学习"],
+    "deep learning": ["deep learning", "dl", "深度学习"],
+    "large language model": ["large language model", "llm", "大语言模型", "大型语言模型", "大模型"],
+    "natural language processing": ["natural language processing", "nlp", "自然语言处理"],
+    "computer vision": ["computer vision", "cv", "计算机视觉"],
+    "reinforcement learning": ["reinforcement learning", "rl", "强化学习"],
+    "graph neural network": ["graph neural network", "gnn", "图神经网络"],
+    "generative adversarial network": ["generative adversarial network", "gan", "生成对抗网络"],
+    "diffusion model": ["diffusion model", "扩散模型"],
+    "vision transformer": ["vision transformer", "vit", "视觉transformer"],
+    "transformer": ["transformer"],
+    "retrieval augmented generation": ["retrieval augmented generation", "rag", "检索增强生成"],
+    "knowledge graph": ["knowledge graph", "kg", "知识图谱"],
+    "recommender system": ["recommender system", "recommendation system", "推荐系统"],
+    "speech recognition": ["speech recognition", "automatic speech recognition", "asr", "语音识别"],
+    "federated learning": ["federated learning", "联邦学习"],
+    "neural radiance field": ["neural radiance field", "nerf", "神经辐射场"],
+    "object detection": ["object detection", "目标检测"],
+    "semantic segmentation": ["semantic segmentation", "语义分割"],
+    "time series": ["time series", "时间序列"],
+    "autonomous driving": ["autonomous driving", "self driving", "自动驾驶"],
+    "multimodal": ["multimodal", "multi modal", "多模态"],
+}
+
+# 不影响主题含义的词
+STOPWORDS = {"awesome", "list", "the", "a", "an", "of", "for", "and", "in", "on", "with", "的", "和", "与"}
+
+# 以s结尾但不是复数的英文词
+NON_PLURALS = {"news", "series", "species", "kubernetes", "postgres", "windows", "pandas", "keras", "aws", "ios", "macos"}
+
+# 英文别名最多跨越的单词数
+MAX_ALIAS_WORDS = 5
+
+# 英文单词（保留 c++ / c# 这类符号）或中日韩文字片段
+_SEGMENT_PATTERN = re.compile(
+    r"[a-z0-9]+(?:\+\+|#)?|[぀-ヿ㐀-䶿一-鿿가-힯豈-﫿]+"
+)
+
+
+def _is_cjk(text: str) -> bool:
+    return text[0] >= "぀"
+
+
+def _singular(word: str) -> str:
+    """简单的英文复数还原（-ss、-us、-is、-ics结尾和NON_PLURALS中的词保持不变）"""
+    if (
+        len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is", "ics"))
+        and word not in NON_PLURALS
+    ):
+        return word[:-1]
+    return word
+
+
+def _compact(text: str) -> str:
+    """折叠后去掉空格和标点，作为别名匹配的形式"""
+    return "".join(_SEGMENT_PATTERN.findall(unicodedata.normalize("NFKC", text).casefold()))
+
+
+@dataclass
+class CanonicalTopic:
+    """规范化后的主题"""
+    __slots__ = ("text", "terms", "key")
+
+    text: str          # 保持原有顺序的规范写法，如 "vue frontend"
+    terms: Tuple[str, ...]
+    key: str           # 排序去重后的规范键，如 "frontend|vue"
+
+
+class TopicCanonicalizer(LoggerMixin):
+    """
+    主题规范化器
+    静态别名表之外，从智能模式的主题扩展中学习中英文同义词：
+    中文单词主题（如 "量子计算"）在多次扩展中第一个出现的英文关键词相同（如 "quantum computing"），
+    或英文主题的扩展中第一个中文关键词多次相同，即认为两者同义，此后两种写法得到相同的规范键
+    """
+
+    def __init__(self, path: Optional[str] = None, min_support: int = 2):
+        self.path = path
+        self.min_support = min_support
+        self._lock = threading.Lock()
+        self._latin_aliases: Dict[str, str] = {}
+        self._cjk_aliases: Dict[str, str] = {}
+        self._mixed_aliases: Dict[str, str] = {}
+        self._learned: Dict[str, List[str]] = {}
+        self._observations: Dict[str, Dict[str, int]] = {}
+
+        for canonical, aliases in TOPIC_ALIASES.items():
+            for alias in [canonical, *aliases]:
+                self._add_alias(_compact(alias), canonical)
+        self._max_cjk_alias = max((len(alias) for alias in self._cjk_aliases), default=1)
+        self._mixed_pattern = self._build_mixed_pattern()
+
+        if path and os.path.exists(path):
+            self._load()
+
+    def _add_alias(self, alias: str, canonical: str) -> None:
+        if not alias:
+            return
+        if len({_is_cjk(segment) for segment in _SEGMENT_PATTERN.findall(alias)}) > 1:
+            # 中英文混写（如 "go语言"）切分后会分到两种文字的片段中，需在切分前匹配
+            self._mixed_aliases[alias] = canonical
+        elif _is_cjk(alias):
+            self._cjk_aliases[alias] = canonical
+        else:
+            self._latin_aliases[alias] = canonical
+            self._latin_aliases.setdefault(_singular(alias), canonical)
+
+    def _build_mixed_pattern(self) -> Optional["re.Pattern[str]"]:
+        """匹配中英文混写别名的正则（片段之间允许空格和标点，英文一端须是完整单词）"""
+        alternatives = []
+        for alias in sorted(self._mixed_aliases, key=len, reverse=True):
+            segments = _SEGMENT_PATTERN.findall(alias)
+            pattern = r"[\W_]*".join(re.escape(segment) for segment in segments)
+            if not _is_cjk(segments[0]):
+                pattern = r"(?<![a-z0-9])" + pattern
+            if not _is_cjk(segments[-1]):
+                pattern += r"(?![a-z0-9])"
+            alternatives.append(pattern)
+        return re.compile("|".join(alternatives)) if alternatives else None
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"⚠️ 读取主题同义词失败，忽略: {e}")
+            return
+        self._learned = data.get("aliases", {})
+        self._observations = data.get("observations", {})
+        self.logger.info(f"📚 主题同义词已加载: {len(self._learned)} 个")
+
+    def _save(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"aliases": self._learned, "observations": self._observations},
+                f, ensure_ascii=False, indent=2
+            )
+        os.replace(temp_path, self.path)
+
+    def _terms(self, topic: str) -> Iterator[str]:
+        """切分并应用别名，逐个产出规范词"""
+        text = unicodedata.normalize("NFKC", topic).casefold()
+        if self._mixed_pattern is not None:
+            # 混写别名替换为规范词，规范词本身也是英文别名，切分后按英文别名匹配
+            text = self._mixed_pattern.sub(lambda match: f" {self._mixed_aliases[_compact(match.group(0))]} ", text)
+        segments = _SEGMENT_PATTERN.findall(text)
+        i = 0
+        while i < len(segments):
+            segment = segments[i]
+            if _is_cjk(segment):
+                yield from self._cjk_terms(segment)
+                i += 1
+                continue
+
+            # 英文：从最长的相邻单词组合开始匹配别名（"vue" + "js" -> "vuejs"）
+            end = i + 1
+            while end < len(segments) and end - i < MAX_ALIAS_WORDS and not _is_cjk(segments[end]):
+                end += 1
+            for stop in range(end, i, -1):
+                joined = "".join(segments[i:stop])
+                canonical = self._latin_aliases.get(joined) or self._latin_aliases.get(_singular(joined))
+                if canonical:
+                    yield canonical
+                    i = stop
+                    break
+            else:
+                yield _singular(segment)
+                i += 1
+
+    def _cjk_terms(self, run: str) -> Iterator[str]:
+        """中日韩文字片段按最长匹配应用别名，未匹配的连续文字作为一个词"""
+        pending = []
+        i = 0
+        while i < len(run):
+            for length in range(min(self._max_cjk_alias, len(run) - i), 1, -1):
+                canonical = self._cjk_aliases.get(run[i:i + length])
+                if canonical:
+                    if pending:
+                        yield "".join(pending)
+                        pending = []
+                    yield canonical
+                    i += length
+                    break
+            else:
+                pending.append(run[i])
+                i += 1
+        if pending:
+            yield "".join(pending)
+
+    def canonicalize(self, topic: str) -> CanonicalTopic:
+        """
+        规范化主题
+
+        Args:
+            topic: 原始主题
+
+        Returns:
+            CanonicalTopic: 规范写法、规范词和规范键
+        """
+        terms: List[str] = []
+        for term in self._terms(topic):
+            for learned in self._learned.get(term, (term,)):
+                if learned not in STOPWORDS and learned not in terms:
+                    terms.append(learned)
+        if not terms:
+            # 全部是停用词或标点时退回折叠后的原文
+            terms = [" ".join(unicodedata.normalize("NFKC", topic).casefold().split())]
+        return CanonicalTopic(text=" ".join(terms), terms=tuple(terms), key="|".join(sorted(terms)))
+
+    def learn(self, topic: str, extended_keywords: List[str]) -> Optional[str]:
+        """
+        从主题扩展结果中学习同义词
+        中文一侧须是别名表之外的单个词（如 "联邦学习"），英文一侧可以是多个词，学到后中文词展开为英文规范词
+
+        Args:
+            topic: 原始主题
+            extended_keywords: 大模型给出的扩展关键词
+
+        Returns:
+            Optional[str]: 本次新学到的同义词（未学到时为None）
+        """
+        terms = self.canonicalize(topic).terms
+        if len(terms) == 1 and _is_cjk(terms[0]):
+            alias, target = terms[0], None
+        elif all(not _is_cjk(term) for term in terms):
+            alias, target = None, terms
+        else:
+            return None
+
+        # 只看第一个与主题文字不同的关键词（大模型通常把译名放在最前面）
+        for keyword in extended_keywords:
+            keyword_terms = self.canonicalize(keyword).terms if keyword and keyword.strip() else ()
+            if not keyword_terms:
+                continue
+            if alias is not None and all(not _is_cjk(term) for term in keyword_terms):
+                target = keyword_terms
+                break
+            if alias is None and len(keyword_terms) == 1 and _is_cjk(keyword_terms[0]):
+                alias = keyword_terms[0]
+                break
+        if alias is None or target is None:
+            return None
+
+        target_key = "|".join(target)
+        with self._lock:
+            if alias in self._learned:
+                return None
+            counts = self._observations.setdefault(alias, {})
+            counts[target_key] = counts.get(target_key, 0) + 1
+            learned = counts[target_key] >= self.min_support and counts[target_key] >= max(counts.values())
+            if learned:
+                self._learned[alias] = list(target)
+                self._observations.pop(alias, None)
+            if self.path:
+                self._save()
+        if not learned:
+            return None
+        self.logger.info(f"📚 学到主题同义词: {alias} -> {' '.join(target)}")
+        return alias
+
+
+@lru_cache()
+def get_topic_canonicalizer() -> TopicCanonicalizer:
+    """
+    获取进程内共享的主题规范化器（带缓存）
+
+    Returns:
+        TopicCanonicalizer: 主题规范化器实例
+    """
+    settings = get_settings()
+    return TopicCanonicalizer(settings.topic_synonyms_path, settings.topic_synonym_min_support)
+
+
+def topic_key(topic: str) -> str:
+    """主题的规范键"""
+    return get_topic_canonicalizer().canonicalize(topic).key
+
+
+def request_key(request: GenerateAwesomeListRequest, pipeline: str) -> str:
+    """
+    生成请求的规范键，所有缓存层（生成历史、结果缓存、缓存预热）共用
+    规范键相同的请求会得到等价的结果
+
+    Args:
+        request: 生成请求
+        pipeline: 生成模式 (basic / intelligent)
+    """
+    return "/".join([
+        pipeline,
+        topic_key(request.topic),
+        request.model or "",
+        request.language or "",
+        str(request.max_results),
+        request.scoring_method or "",
+    ])
@@ -0,0 +1,267 @@
+"""
+缓存预热存储模块
+保存服务端的生成请求日志（用于统计热门主题）以及预热任务产生的搜索结果和GitHub/arXiv元数据；
+请求路径在调用外部服务前先查询这里，预热生成的完整Awesome List保存在生成历史中；
+被取消的生成任务（如客户端断开连接）已完成的搜索结果和元数据也保存在这里，重试时直接复用
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.models import GenerateAwesomeListRequest, ResultRecord
+from app.services.topic_canonicalizer import request_key, topic_key
+from app.utils import get_settings, LoggerMixin
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS request_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    request_key TEXT NOT NULL,
+    pipeline TEXT NOT NULL,
+    request TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS request_log_created_at ON request_log (created_at);
+CREATE TABLE IF NOT EXISTS search_results (
+    query_key TEXT PRIMARY KEY,
+    results TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS metadata (
+    provider TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (provider, item_id)
+);
+"""
+
+# 当前任务是否为预热任务：预热任务跳过预热存储的读取（确保拿到新结果）并把外部调用结果写入存储
+_warming: ContextVar[bool] = ContextVar("warming", default=False)
+
+
+@contextmanager
+def warming() -> Iterator[None]:
+    """在此上下文中执行的生成流水线视为预热任务"""
+    token = _warming.set(True)
+    try:
+        yield
+    finally:
+        _warming.reset(token)
+
+
+def is_warming() -> bool:
+    """当前任务是否为预热任务"""
+    return _warming.get()
+
+
+class PartialOutputs:
+    """生成任务中已完成的外部调用结果（搜索结果和元数据），任务被取消时写入预热存储"""
+
+    def __init__(self):
+        self.searches: Dict[str, List[ResultRecord]] = {}
+        self.metadata: Dict[Tuple[str, str], Any] = {}
+
+    def __len__(self) -> int:
+        return len(self.searches) + len(self.metadata)
+
+
+# 当前生成任务收集外部调用结果的容器（子任务共享同一容器）
+_outputs: ContextVar[Optional[PartialOutputs]] = ContextVar("partial_outputs", default=None)
+
+
+@contextmanager
+def collect_outputs() -> Iterator[PartialOutputs]:
+    """收集此上下文中（包括其中创建的子任务）完成的外部调用结果"""
+    outputs = PartialOutputs()
+    token = _outputs.set(outputs)
+    try:
+        yield outputs
+    finally:
+        _outputs.reset(token)
+
+
+def record_search(key: str, records: List[ResultRecord]) -> None:
+    """记录一次完成的搜索（不在收集上下文中时忽略）"""
+    outputs = _outputs.get()
+    if outputs is not None:
+        outputs.searches[key] = records
+
+
+def record_metadata(provider: str, item_id: str, payload: Any) -> None:
+    """记录一次完成的元数据获取（不在收集上下文中时忽略）"""
+    outputs = _outputs.get()
+    if outputs is not None:
+        outputs.metadata[(provider, item_id)] = payload
+
+
+def search_key(
+    query: str,
+    max_results: int,
+    include_domains: Optional[List[str]] = None,
+    exclude_domains: Optional[List[str]] = None
+) -> str:
+    """搜索查询的规范键（查询按主题规范化，"Vue.js paper" 与 "vuejs paper" 相同）"""
+    return "/".join([
+        topic_key(query),
+        str(max_results),
+        ",".join(sorted(include_domains or [])),
+        ",".join(sorted(exclude_domains or [])),
+    ])
+
+
+class WarmStore(LoggerMixin):
+    """
+    SQLite预热存储
+    同一连接由线程锁保护，异步接口在线程池中执行，不阻塞事件循环
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(SCHEMA)
+
+    def log_request(self, request: GenerateAwesomeListRequest, pipeline: str) -> None:
+        """记录一次生成请求"""
+        data = request.model_dump(exclude={"force_refresh", "lane"})
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO request_log (request_key, pipeline, request, created_at) VALUES (?, ?, ?, ?)",
+                (request_key(request, pipeline), pipeline, json.dumps(data, ensure_ascii=False), time.time())
+            )
+
+    def top_requests(self, since: float, limit: int) -> List[Dict[str, Any]]:
+        """
+        统计since之后请求次数最多的请求
+
+        Returns:
+            List[Dict[str, Any]]: 按次数降序的 {request_key, pipeline, request, count}，request为最近一次的请求参数
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT request_key, pipeline, request, COUNT(*) AS count, MAX(id) AS latest "
+                "FROM request_log WHERE created_at >= ? "
+                "GROUP BY request_key ORDER BY count DESC, latest DESC LIMIT ?",
+                (since, limit)
+            ).fetchall()
+        return [
+            {"request_key": key, "pipeline": pipeline, "request": json.loads(request), "count": count}
+            for key, pipeline, request, count, _ in rows
+        ]
+
+    def get_search(self, key: str, max_age: float) -> Optional[List[ResultRecord]]:
+        """读取max_age秒内预热的搜索结果"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT results FROM search_results WHERE query_key = ? AND fetched_at >= ?",
+                (key, time.time() - max_age)
+            ).fetchone()
+        if row is None:
+            return None
+        records = []
+        for item in json.loads(row[0]):
+            try:
+                records.append(ResultRecord.create(**item))
+            except ValueError:
+                continue
+        return records
+
+    def put_search(self, key: str, records: List[ResultRecord]) -> None:
+        """保存预热的搜索结果"""
+        items = [
+            {
+                "title": record.title,
+                "url": record.url,
+                "content": record.content,
+                "score": record.score,
+                "source": record.source,
+                "published_date": record.published_date,
+            }
+            for record in records
+        ]
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO search_results (query_key, results, fetched_at) VALUES (?, ?, ?)",
+                (key, json.dumps(items, ensure_ascii=False), time.time())
+            )
+
+    def get_metadata(self, provider: str, item_id: str, max_age: float) -> Optional[Any]:
+        """读取max_age秒内预热的元数据（arXiv为原始XML，GitHub为仓库JSON）"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT payload FROM metadata WHERE provider = ? AND item_id = ? AND fetched_at >= ?",
+                (provider, item_id, time.time() - max_age)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_metadata(self, provider: str, item_id: str, payload: Any) -> None:
+        """保存预热的元数据"""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO metadata (provider, item_id, payload, fetched_at) VALUES (?, ?, ?, ?)",
+                (provider, item_id, json.dumps(payload, ensure_ascii=False), time.time())
+            )
+
+    def save_outputs(self, outputs: PartialOutputs) -> None:
+        """保存被取消的生成任务已完成的搜索结果和元数据"""
+        for key, records in outputs.searches.items():
+            self.put_search(key, records)
+        for (provider, item_id), payload in outputs.metadata.items():
+            self.put_metadata(provider, item_id, payload)
+
+    def prune(self, before: float) -> int:
+        """删除before之前的请求日志和预热数据，返回删除的行数"""
+        with self._lock, self._connection:
+            deleted = 0
+            for table, column in (
+                ("request_log", "created_at"), ("search_results", "fetched_at"), ("metadata", "fetched_at")
+            ):
+                deleted += self._connection.execute(f"DELETE FROM {table} WHERE {column} < ?", (before,)).rowcount
+        return deleted
+
+    async def log_request_async(self, request: GenerateAwesomeListRequest, pipeline: str) -> None:
+        await asyncio.to_thread(self.log_request, request, pipeline)
+
+    async def get_search_async(self, key: str, max_age: float) -> Optional[List[ResultRecord]]:
+        return await asyncio.to_thread(self.get_search, key, max_age)
+
+    async def put_search_async(self, key: str, records: List[ResultRecord]) -> None:
+        await asyncio.to_thread(self.put_search, key, records)
+
+    async def get_metadata_async(self, provider: str, item_id: str, max_age: float) -> Optional[Any]:
+        return await asyncio.to_thread(self.get_metadata, provider, item_id, max_age)
+
+    async def put_metadata_async(self, provider: str, item_id: str, payload: Any) -> None:
+        await asyncio.to_thread(self.put_metadata, provider, item_id, payload)
+
+    async def save_outputs_async(self, outputs: PartialOutputs) -> None:
+        await asyncio.to_thread(self.save_outputs, outputs)
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+@lru_cache()
+def get_warm_store() -> WarmStore:
+    """
+    获取进程内共享的预热存储（带缓存）
+
+    Returns:
+        WarmStore: 预热存储实例
+    """
+    return WarmStore(get_settings().warm_store_path)
@@ -0,0 +1,40 @@
+"""
+缓存预热工作进程
+独立于应用进程运行缓存预热调度器，与应用共用预热存储和生成历史（SQLite）
+
+    python -m app.services.warm_worker                  # 按计划循环执行
+    python -m app.services.warm_worker --once           # 执行一轮后退出
+    python -m app.services.warm_worker --once --force   # 忽略低峰时段立即执行一轮
+    python -m app.services.warm_worker --plan           # 只打印预热计划
+"""
+
+import argparse
+import asyncio
+import json
+
+from app.services.cache_warmer import CacheWarmer
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="缓存预热工作进程")
+    parser.add_argument("--once", action="store_true", help="执行一轮后退出")
+    parser.add_argument("--force", action="store_true", help="忽略低峰时段限制")
+    parser.add_argument("--plan", action="store_true", help="只打印预热计划，不执行")
+    args = parser.parse_args()
+
+    warmer = CacheWarmer()
+    if args.plan:
+        print(json.dumps([job.to_dict() for job in warmer.plan()], ensure_ascii=False, indent=2))
+        return
+    if args.once:
+        summary = asyncio.run(warmer.run_once(force=args.force))
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return
+    try:
+        asyncio.run(warmer.run_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
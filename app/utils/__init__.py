@@ -4,7 +4,13 @@
 """
 
 from .config import get_settings
-from .logger import get_logger, LoggerMixin
+from .logger import get_logger, LoggerMixin, LogPayload
+from .token_budget import TokenCounter, PromptPacker, get_token_counter, plan_batches
+from .metrics import MetricsRegistry, get_metrics
+from .loop_monitor import LoopMonitor, get_loop_monitor
+from .profiling import RequestProfiler, get_request_profiler
+from .retry import RetryPolicy, get_retry_policy, request_deadline, retry_async
+from .scheduler import CallScheduler, get_call_scheduler, scheduling_lane, current_lane, preempted_calls
 from .exceptions import (
     AwesomeAgentException,
     SearchException,
@@ -13,6 +19,9 @@ from .exceptions import (
     ValidationException,
     RateLimitException,
     TimeoutException,
+    OverloadedException,
+    ClientDisconnectedException,
+    PreemptedException,
     APIException
 )
 
@@ -20,6 +29,26 @@ __all__ = [
     "get_settings",
     "get_logger",
     "LoggerMixin",
+    "LogPayload",
+    "TokenCounter",
+    "PromptPacker",
+    "get_token_counter",
+    "plan_batches",
+    "MetricsRegistry",
+    "get_metrics",
+    "LoopMonitor",
+    "get_loop_monitor",
+    "RequestProfiler",
+    "get_request_profiler",
+    "RetryPolicy",
+    "get_retry_policy",
+    "request_deadline",
+    "retry_async",
+    "CallScheduler",
+    "get_call_scheduler",
+    "scheduling_lane",
+    "current_lane",
+    "preempted_calls",
     "AwesomeAgentException",
     "SearchException",
     "LLMException", 
@@ -27,5 +56,8 @@ __all__ = [
     "ValidationException",
     "RateLimitException",
     "TimeoutException",
+    "OverloadedException",
+    "ClientDisconnectedException",
+    "PreemptedException",
     "APIException",
 ] 
\ No newline at end of file
@@ -5,7 +5,7 @@
 
 import os
 from functools import lru_cache
-from typing import Optional
+from typing import Dict, Optional
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
@@ -17,22 +17,35 @@ class Settings(BaseSettings):
     """
     
     # API Keys
-    openai_api_key: str = Field(
-        ...,
+    openai_api_key: Optional[str] = Field(
+        default=None,
         env="OPENAI_API_KEY",
-        description="OpenAI API密钥"
+        description="OpenAI API密钥（使用录制回放或合成后端时可不配置）"
     )
     
-    deepseek_api_key: str = Field(
-        ..., 
+    deepseek_api_key: Optional[str] = Field(
+        default=None,
         env="DEEPSEEK_API_KEY",
-        description="DeepSeek API密钥"
+        description="DeepSeek API密钥（使用录制回放或合成后端时可不配置）"
     )
     
-    tavily_api_key: str = Field(
-        ...,
-        env="TAVILY_API_KEY", 
-        description="Tavily API密钥"
+    tavily_api_key: Optional[str] = Field(
+        default=None,
+        env="TAVILY_API_KEY",
+        description="Tavily API密钥（使用录制回放或合成后端时可不配置）"
+    )
+    
+    # 提供商API地址（可指向本地OpenAI兼容桩服务做压测）
+    openai_base_url: Optional[str] = Field(
+        default=None,
+        env="OPENAI_BASE_URL",
+        description="OpenAI API地址，为空时使用官方地址"
+    )
+    
+    deepseek_base_url: str = Field(
+        default="https://api.deepseek.com/v1",
+        env="DEEPSEEK_BASE_URL",
+        description="DeepSeek API地址"
     )
     
     # Application Settings
@@ -60,6 +73,404 @@ class Settings(BaseSettings):
         description="请求超时时间（秒）"
     )
     
+    # Prompt Token Budget Settings
+    generation_prompt_token_budget: int = Field(
+        default=6000,
+        env="GENERATION_PROMPT_TOKEN_BUDGET",
+        description="生成Awesome List时搜索结果部分的输入token预算"
+    )
+    
+    scoring_prompt_token_budget: int = Field(
+        default=3000,
+        env="SCORING_PROMPT_TOKEN_BUDGET",
+        description="LLM评分时每批搜索结果部分的输入token预算"
+    )
+    
+    scoring_max_batch_size: int = Field(
+        default=12,
+        env="SCORING_MAX_BATCH_SIZE",
+        description="LLM评分时每批最多包含的结果数量"
+    )
+    
+    # LLM Routing Settings
+    llm_router_enabled: bool = Field(
+        default=True,
+        env="LLM_ROUTER_ENABLED",
+        description="辅助调用（关键词、评分、主题扩展）是否路由到当前最快的健康提供商"
+    )
+    
+    llm_failover_enabled: bool = Field(
+        default=True,
+        env="LLM_FAILOVER_ENABLED",
+        description="超时、限流或5xx错误时是否自动切换到其他提供商"
+    )
+    
+    llm_hedge_enabled: bool = Field(
+        default=False,
+        env="LLM_HEDGE_ENABLED",
+        description="延迟敏感阶段是否启用对冲请求"
+    )
+    
+    llm_hedge_delay: float = Field(
+        default=3.0,
+        env="LLM_HEDGE_DELAY",
+        description="延迟样本不足时发起对冲请求前的等待时间（秒）"
+    )
+    
+    llm_router_window: int = Field(
+        default=20,
+        env="LLM_ROUTER_WINDOW",
+        description="路由器统计延迟和错误率的滚动窗口大小"
+    )
+    
+    # Intelligent Pipeline Settings
+    intelligent_planning_mode: str = Field(
+        default="combined",
+        env="INTELLIGENT_PLANNING_MODE",
+        description="智能模式的规划方式 (combined: 一次调用完成扩展和搜索计划, two_step: 先扩展再规划)",
+        pattern="^(combined|two_step)$"
+    )
+    
+    llm_stream_tool_calls: bool = Field(
+        default=True,
+        env="LLM_STREAM_TOOL_CALLS",
+        description="是否流式接收工具调用，每个搜索调用参数完整后立即开始搜索"
+    )
+    
+    rerank_timeout: float = Field(
+        default=60.0,
+        env="RERANK_TIMEOUT",
+        description="搜索完成后等待重排序评分的最长时间（秒），超时的结果使用原始分数"
+    )
+    
+    # Local Index Settings
+    local_index_enabled: bool = Field(
+        default=True,
+        env="LOCAL_INDEX_ENABLED",
+        description="是否将检索到的结果写入本地BM25索引"
+    )
+    
+    local_index_path: str = Field(
+        default="data/local_index.jsonl",
+        env="LOCAL_INDEX_PATH",
+        description="本地索引文件路径"
+    )
+    
+    local_index_mode: str = Field(
+        default="fallback",
+        env="LOCAL_INDEX_MODE",
+        description="本地索引的使用方式 (fallback: Tavily失败时使用, hybrid: 与实时结果合并, offline: 只用本地索引)",
+        pattern="^(fallback|hybrid|offline)$"
+    )
+    
+    # History Settings
+    history_enabled: bool = Field(
+        default=True,
+        env="HISTORY_ENABLED",
+        description="是否把生成结果保存到服务端历史库"
+    )
+    
+    history_path: str = Field(
+        default="data/history.sqlite3",
+        env="HISTORY_PATH",
+        description="生成历史SQLite数据库路径"
+    )
+    
+    history_reuse_window: float = Field(
+        default=21600.0,
+        env="HISTORY_REUSE_WINDOW",
+        description="该时间（秒）内存在相同规范化请求的历史时直接返回，为0时不复用"
+    )
+    
+    # Topic Canonicalization Settings
+    topic_synonyms_path: str = Field(
+        default="data/topic_synonyms.json",
+        env="TOPIC_SYNONYMS_PATH",
+        description="从主题扩展结果中学到的主题同义词的保存路径"
+    )
+    
+    topic_synonym_min_support: int = Field(
+        default=2,
+        env="TOPIC_SYNONYM_MIN_SUPPORT",
+        description="同一译名在多少次主题扩展中出现后才作为同义词"
+    )
+    
+    # Response Cache Settings
+    response_cache_enabled: bool = Field(
+        default=True,
+        env="RESPONSE_CACHE_ENABLED",
+        description="是否缓存生成结果（stale-while-revalidate）"
+    )
+    
+    response_cache_fresh_ttl: float = Field(
+        default=3600.0,
+        env="RESPONSE_CACHE_FRESH_TTL",
+        description="缓存结果的新鲜期（秒），期内直接返回"
+    )
+    
+    response_cache_stale_ttl: float = Field(
+        default=86400.0,
+        env="RESPONSE_CACHE_STALE_TTL",
+        description="缓存结果的最长可用期（秒），超过新鲜期但未超过该值时立即返回旧结果并在后台刷新"
+    )
+    
+    response_cache_max_entries: int = Field(
+        default=256,
+        env="RESPONSE_CACHE_MAX_ENTRIES",
+        description="最多缓存的生成结果数量"
+    )
+    
+    # Cache Warming Settings
+    warm_enabled: bool = Field(
+        default=True,
+        env="WARM_ENABLED",
+        description="是否记录生成请求日志，并在调用外部服务前先查询预热存储"
+    )
+    
+    warm_store_path: str = Field(
+        default="data/warm.sqlite3",
+        env="WARM_STORE_PATH",
+        description="预热存储（请求日志、预热的搜索结果和元数据）SQLite数据库路径"
+    )
+    
+    warm_ttl: float = Field(
+        default=172800.0,
+        env="WARM_TTL",
+        description="预热数据（搜索结果、元数据和预热生成的历史）的有效期（秒）"
+    )
+    
+    warm_scheduler_enabled: bool = Field(
+        default=False,
+        env="WARM_SCHEDULER_ENABLED",
+        description="是否随应用运行缓存预热调度器（也可用 python -m app.services.warm_worker 单独运行）"
+    )
+    
+    warm_interval: float = Field(
+        default=900.0,
+        env="WARM_INTERVAL",
+        description="缓存预热的执行间隔（秒）"
+    )
+    
+    warm_hours: str = Field(
+        default="0-6",
+        env="WARM_HOURS",
+        description="允许预热的低峰时段（本地小时，如 0-6 或 22-24,0-6），为空时不限制"
+    )
+    
+    warm_topics: str = Field(
+        default="",
+        env="WARM_TOPICS",
+        description="始终预热的主题（逗号分隔）"
+    )
+    
+    warm_topics_file: Optional[str] = Field(
+        default=None,
+        env="WARM_TOPICS_FILE",
+        description="始终预热的主题列表文件（每行一个）"
+    )
+    
+    warm_pipelines: str = Field(
+        default="basic",
+        env="WARM_PIPELINES",
+        description="配置的主题预热哪些生成模式（basic, intelligent，逗号分隔）"
+    )
+    
+    warm_log_window: float = Field(
+        default=604800.0,
+        env="WARM_LOG_WINDOW",
+        description="按该时间（秒）内的请求日志统计热门主题"
+    )
+    
+    warm_top_n: int = Field(
+        default=200,
+        env="WARM_TOP_N",
+        description="每轮最多考虑的热门请求数"
+    )
+    
+    warm_min_requests: int = Field(
+        default=2,
+        env="WARM_MIN_REQUESTS",
+        description="统计窗口内至少被请求多少次才预热"
+    )
+    
+    warm_refresh_after: float = Field(
+        default=43200.0,
+        env="WARM_REFRESH_AFTER",
+        description="生成结果超过该时间（秒）后才重新预热"
+    )
+    
+    warm_max_jobs: int = Field(
+        default=300,
+        env="WARM_MAX_JOBS",
+        description="每轮最多执行的预热任务数"
+    )
+    
+    warm_budget: str = Field(
+        default="tavily=200,gpt=100,deepseek=100,github=500,arxiv=200",
+        env="WARM_BUDGET",
+        description="预热任务每小时对各外部服务的调用预算（服务=次数，逗号分隔）"
+    )
+    
+    # Admission Control Settings
+    admission_enabled: bool = Field(
+        default=True,
+        env="ADMISSION_ENABLED",
+        description="是否对生成请求进行准入控制（过载时降级或拒绝）"
+    )
+    
+    admission_max_inflight: int = Field(
+        default=8,
+        env="ADMISSION_MAX_INFLIGHT",
+        description="同时执行的生成任务数上限"
+    )
+    
+    admission_max_queue: int = Field(
+        default=16,
+        env="ADMISSION_MAX_QUEUE",
+        description="等待执行的生成任务数上限，队列已满时直接返回503"
+    )
+    
+    admission_queue_timeout: float = Field(
+        default=15.0,
+        env="ADMISSION_QUEUE_TIMEOUT",
+        description="生成任务最长排队时间（秒），超时返回503"
+    )
+    
+    admission_soft_limit: int = Field(
+        default=6,
+        env="ADMISSION_SOFT_LIMIT",
+        description="负载（执行中+排队中）达到该值时改用规则评分并跳过关键词提取的大模型调用"
+    )
+    
+    admission_search_limit: int = Field(
+        default=12,
+        env="ADMISSION_SEARCH_LIMIT",
+        description="负载达到该值时另外减少搜索调用"
+    )
+    
+    # Call Scheduler Settings
+    scheduler_rate_limits: str = Field(
+        default="",
+        env="SCHEDULER_RATE_LIMITS",
+        description="各外部服务每分钟的调用配额（服务=次数，逗号分隔），未配置的服务不排队"
+    )
+    
+    scheduler_burst: float = Field(
+        default=5.0,
+        env="SCHEDULER_BURST",
+        description="允许突发使用的配额（秒），即令牌桶容量"
+    )
+    
+    scheduler_lane_weights: str = Field(
+        default="interactive=6,background=3,warmup=1",
+        env="SCHEDULER_LANE_WEIGHTS",
+        description="配额不足时各调度通道的权重（通道=权重，逗号分隔）"
+    )
+    
+    scheduler_max_queue: int = Field(
+        default=64,
+        env="SCHEDULER_MAX_QUEUE",
+        description="每个外部服务排队调用数上限，达到后高优先级调用抢占低优先级调用"
+    )
+    
+    # Backend Settings
+    search_backend: str = Field(
+        default="tavily",
+        env="SEARCH_BACKEND",
+        description="搜索后端 (tavily, record: 调用Tavily并录制, replay: 回放录制数据, synthetic: 合成数据)",
+        pattern="^(tavily|record|replay|synthetic)$"
+    )
+    
+    llm_backend: str = Field(
+        default="openai",
+        env="LLM_BACKEND",
+        description="大模型后端 (openai: OpenAI兼容API, record, replay, synthetic)",
+        pattern="^(openai|record|replay|synthetic)$"
+    )
+    
+    metadata_backend: str = Field(
+        default="http",
+        env="METADATA_BACKEND",
+        description="arXiv/GitHub元数据后端 (http, record, replay, synthetic)",
+        pattern="^(http|record|replay|synthetic)$"
+    )
+    
+    fixture_dir: str = Field(
+        default="fixtures",
+        env="FIXTURE_DIR",
+        description="录制数据目录"
+    )
+    
+    backend_latency: str = Field(
+        default="recorded",
+        env="BACKEND_LATENCY",
+        description="回放和合成后端的延迟分布 (none, recorded, fixed:秒, uniform:最小,最大, lognormal:中位数,sigma)"
+    )
+    
+    # Retry Settings
+    retry_max_attempts: Dict[str, int] = Field(
+        default={"tavily": 3, "gpt": 2, "deepseek": 2, "github": 3, "arxiv": 3},
+        env="RETRY_MAX_ATTEMPTS",
+        description="各外部服务的最大尝试次数（JSON格式）"
+    )
+    
+    retry_base_delay: float = Field(
+        default=0.5,
+        env="RETRY_BASE_DELAY",
+        description="指数退避的基础等待时间（秒）"
+    )
+    
+    retry_max_delay: float = Field(
+        default=8.0,
+        env="RETRY_MAX_DELAY",
+        description="指数退避的最大等待时间（秒）"
+    )
+    
+    pipeline_deadline: float = Field(
+        default=180.0,
+        env="PIPELINE_DEADLINE",
+        description="单次生成请求的截止时间（秒），重试不会超过该时间"
+    )
+    
+    # Event Loop Monitor Settings
+    loop_monitor_enabled: bool = Field(
+        default=True,
+        env="LOOP_MONITOR_ENABLED",
+        description="是否持续采样事件循环延迟"
+    )
+    
+    loop_monitor_interval: float = Field(
+        default=0.5,
+        env="LOOP_MONITOR_INTERVAL",
+        description="事件循环延迟采样间隔（秒）"
+    )
+    
+    loop_block_threshold: float = Field(
+        default=0.1,
+        env="LOOP_BLOCK_THRESHOLD",
+        description="事件循环被阻塞超过该时长（秒）视为卡顿，调试模式下记录阻塞处的调用栈"
+    )
+    
+    # Profiling Settings
+    profiling_token: Optional[str] = Field(
+        default=None,
+        env="PROFILING_TOKEN",
+        description="按请求性能分析的管理员令牌，未设置时不启用性能分析"
+    )
+    
+    profile_dir: str = Field(
+        default="data/profiles",
+        env="PROFILE_DIR",
+        description="性能分析结果的保存目录"
+    )
+    
+    profiler: str = Field(
+        default="cprofile",
+        env="PROFILER",
+        description="性能分析器 (cprofile: 确定性分析, pyinstrument: 采样分析，需单独安装)",
+        pattern="^(cprofile|pyinstrument)$"
+    )
+    
     # Server Settings
     host: str = Field(
         default="0.0.0.0",
@@ -85,6 +496,25 @@ class Settings(BaseSettings):
         env="LOG_LEVEL",
         description="日志级别"
     )
+    
+    log_format: str = Field(
+        default="text",
+        env="LOG_FORMAT",
+        description="日志输出格式 (text: 文本, json: 每行一条JSON)",
+        pattern="^(text|json)$"
+    )
+    
+    log_queue: bool = Field(
+        default=True,
+        env="LOG_QUEUE",
+        description="是否经队列由后台线程写日志，避免阻塞事件循环"
+    )
+    
+    log_payload_limit: int = Field(
+        default=2000,
+        env="LOG_PAYLOAD_LIMIT",
+        description="DEBUG日志中大模型响应、工具调用等负载的最大长度（字符）"
+    )
 
     class Config:
         """Pydantic配置"""
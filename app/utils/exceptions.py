@@ -89,6 +89,33 @@ class TimeoutException(AwesomeAgentException):
     pass
 
 
+class OverloadedException(AwesomeAgentException):
+    """
+    服务过载异常
+    当准入控制拒绝生成请求时抛出，retry_after为建议的重试间隔（秒）
+    """
+    
+    def __init__(self, message: str, retry_after: int, **kwargs):
+        super().__init__(message, **kwargs)
+        self.retry_after = retry_after
+
+
+class PreemptedException(AwesomeAgentException):
+    """
+    调用被抢占异常
+    后台或预热的外部调用在排队时被更高优先级的调用抢占（或队列已满）时抛出
+    """
+    pass
+
+
+class ClientDisconnectedException(AwesomeAgentException):
+    """
+    客户端断开连接异常
+    生成过程中客户端提前断开连接、生成任务已被取消时抛出
+    """
+    pass
+
+
 class APIException(AwesomeAgentException):
     """
     API调用异常
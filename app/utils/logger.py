@@ -1,16 +1,31 @@
 """
 日志管理模块
 提供统一的日志记录功能
+
+日志记录只把记录放入队列，由后台线程的QueueListener格式化并写入stdout，避免在事件循环中阻塞写入
 """
 
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
+import queue
 import sys
+from datetime import datetime
 from functools import lru_cache
-from typing import Optional
+from typing import Any, Optional
 
 from .config import get_settings
 
 
+# LogRecord的标准属性，其余属性视为通过extra传入的结构化字段
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+# 后台写日志的监听器
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
 class ColorFormatter(logging.Formatter):
     """
     彩色日志格式化器
@@ -28,16 +43,85 @@ class ColorFormatter(logging.Formatter):
     RESET = '\033[0m'
 
     def format(self, record):
-        """格式化日志记录"""
+        """格式化日志记录（在副本上着色，不修改原记录，避免影响其他处理器）"""
         log_color = self.COLORS.get(record.levelname, self.RESET)
+        record = copy.copy(record)
         record.levelname = f"{log_color}{record.levelname}{self.RESET}"
         return super().format(record)
 
 
+class JsonFormatter(logging.Formatter):
+    """
+    JSON日志格式化器
+    每条日志输出一行JSON，包含时间、级别、记录器名称、消息以及通过extra传入的字段
+    """
+
+    def format(self, record):
+        """格式化日志记录"""
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    队列处理器
+    在调用方线程中合并消息参数并渲染异常，其余格式化交给监听线程中的处理器
+    （标准QueueHandler会在入队前按默认格式格式化整条消息，导致JSON输出丢失结构）
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class LogPayload:
+    """
+    延迟格式化的日志负载
+    只有日志级别启用、消息真正被格式化时才序列化，超出长度的部分截断
+
+    用法: logger.debug("工具调用参数: %s", LogPayload(arguments))
+    """
+
+    __slots__ = ("value", "limit")
+
+    def __init__(self, value: Any, limit: Optional[int] = None):
+        self.value = value
+        self.limit = limit
+
+    def __str__(self) -> str:
+        if isinstance(self.value, str):
+            text = self.value
+        else:
+            text = json.dumps(self.value, ensure_ascii=False, default=str)
+        limit = self.limit or get_settings().log_payload_limit
+        if len(text) <= limit:
+            return text
+        return f"{text[:limit]}...(共{len(text)}字符)"
+
+
 def setup_logging(
     level: str = "INFO",
     format_string: Optional[str] = None,
-    use_colors: bool = True
+    use_colors: bool = True,
+    json_output: bool = False,
+    use_queue: bool = True
 ) -> None:
     """
     设置日志配置
@@ -46,7 +130,11 @@ def setup_logging(
         level: 日志级别
         format_string: 日志格式字符串
         use_colors: 是否使用彩色输出
+        json_output: 是否输出结构化JSON
+        use_queue: 是否经队列由后台线程写日志
     """
+    global _listener
+
     if format_string is None:
         format_string = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     
@@ -55,6 +143,7 @@ def setup_logging(
     root_logger.setLevel(getattr(logging, level.upper()))
     
     # 移除已有的处理器
+    stop_logging()
     for handler in root_logger.handlers[:]:
         root_logger.removeHandler(handler)
     
@@ -63,13 +152,22 @@ def setup_logging(
     console_handler.setLevel(getattr(logging, level.upper()))
     
     # 选择格式化器
-    if use_colors and sys.stdout.isatty():
+    if json_output:
+        formatter = JsonFormatter()
+    elif use_colors and sys.stdout.isatty():
         formatter = ColorFormatter(format_string)
     else:
         formatter = logging.Formatter(format_string)
     
     console_handler.setFormatter(formatter)
-    root_logger.addHandler(console_handler)
+
+    if use_queue:
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        root_logger.addHandler(_QueueHandler(log_queue))
+        _listener = logging.handlers.QueueListener(log_queue, console_handler, respect_handler_level=True)
+        _listener.start()
+    else:
+        root_logger.addHandler(console_handler)
     
     # 设置第三方库的日志级别
     logging.getLogger("httpx").setLevel(logging.WARNING)
@@ -77,6 +175,18 @@ def setup_logging(
     logging.getLogger("urllib3").setLevel(logging.WARNING)
 
 
+def stop_logging() -> None:
+    """停止后台写日志线程，写完队列中剩余的日志"""
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
+
+
 @lru_cache()
 def get_logger(name: str = __name__) -> logging.Logger:
     """
@@ -94,7 +204,9 @@ def get_logger(name: str = __name__) -> logging.Logger:
     if not logging.getLogger().handlers:
         setup_logging(
             level=settings.log_level,
-            use_colors=settings.is_development
+            use_colors=settings.is_development,
+            json_output=settings.log_format == "json",
+            use_queue=settings.log_queue
         )
     
     return logging.getLogger(name)
@@ -109,4 +221,4 @@ class LoggerMixin:
     @property
     def logger(self) -> logging.Logger:
         """获取当前类的日志记录器"""
-        return get_logger(self.__class__.__module__ + "." + self.__class__.__name__) 
\ No newline at end of file
+        return get_logger(self.__class__.__module__ + "." + self.__class__.__name__) 
@@ -0,0 +1,161 @@
+"""
+事件循环健康监控模块
+持续采样事件循环延迟；调试模式下由看门狗线程检测阻塞事件循环的同步调用并记录其调用栈
+"""
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Deque, Dict, List, Optional
+
+from .config import get_settings
+from .logger import LoggerMixin
+from .metrics import Summary, get_metrics
+
+
+# 保留的最近阻塞事件数
+BLOCKING_EVENT_WINDOW = 20
+
+# 记录的调用栈帧数（从阻塞处向外）
+STACK_LIMIT = 25
+
+
+class LoopMonitor(LoggerMixin):
+    """
+    事件循环监控器
+
+    - 延迟采样：循环内的任务每隔interval休眠一次，实际唤醒时间超出interval的部分即为事件循环延迟
+    - 阻塞检测（capture_stacks=True）：看门狗线程向事件循环投递回调，
+      若threshold秒内未被执行，说明有回调长时间占用事件循环，此时抓取事件循环线程的调用栈
+    """
+
+    def __init__(self, interval: float, threshold: float, capture_stacks: bool):
+        self.interval = interval
+        self.threshold = threshold
+        self.capture_stacks = capture_stacks
+        self.metrics = get_metrics()
+        self.lag = Summary()
+        self.stalls = 0
+        self.blocking_events: Deque[Dict[str, Any]] = deque(maxlen=BLOCKING_EVENT_WINDOW)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._sampler: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._sampler is not None and not self._sampler.done()
+
+    def start(self) -> None:
+        """在当前事件循环中启动监控（需在事件循环内调用）"""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stopped.clear()
+        self._sampler = self._loop.create_task(self._sample())
+
+        if self.capture_stacks:
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+        self.logger.info(
+            f"事件循环监控已启动: 采样间隔 {self.interval}s, 阻塞阈值 {self.threshold}s, "
+            f"调用栈记录 {'开启' if self.capture_stacks else '关闭'}"
+        )
+
+    async def stop(self) -> None:
+        """停止监控"""
+        self._stopped.set()
+        if self._sampler is not None:
+            self._sampler.cancel()
+            try:
+                await self._sampler
+            except asyncio.CancelledError:
+                pass
+            self._sampler = None
+        if self._watchdog is not None:
+            await asyncio.to_thread(self._watchdog.join, 1.0)
+            self._watchdog = None
+
+    async def _sample(self) -> None:
+        """循环内的延迟采样任务"""
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - start - self.interval)
+            self.lag.observe(lag)
+            self.metrics.observe("event_loop_lag_seconds", lag)
+            if lag >= self.threshold:
+                self.stalls += 1
+                self.metrics.increment("event_loop_stalls_total")
+
+    def _watch(self) -> None:
+        """看门狗线程：检测事件循环阻塞并抓取阻塞处的调用栈"""
+        while not self._stopped.is_set():
+            executed = threading.Event()
+            posted = time.monotonic()
+            try:
+                self._loop.call_soon_threadsafe(executed.set)
+            except RuntimeError:
+                # 事件循环已关闭
+                return
+
+            if executed.wait(self.threshold):
+                self._stopped.wait(self.threshold)
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = traceback.format_stack(frame, limit=STACK_LIMIT) if frame is not None else []
+            del frame
+            while not executed.wait(0.5):
+                if self._stopped.is_set():
+                    return
+
+            self._record_blocking(time.monotonic() - posted, stack)
+
+    def _record_blocking(self, duration: float, stack: List[str]) -> None:
+        """记录一次阻塞事件"""
+        self.blocking_events.append({
+            "timestamp": datetime.now().isoformat(),
+            "duration": round(duration, 4),
+            "stack": [line.rstrip() for line in stack],
+        })
+        self.metrics.observe("event_loop_blocking_seconds", duration)
+        location = stack[-1].strip().splitlines()[0] if stack else "未知位置"
+        self.logger.warning(f"事件循环被阻塞 {duration:.3f}s，阻塞位置: {location}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """获取监控状态"""
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "threshold": self.threshold,
+            "capture_stacks": self.capture_stacks,
+            "lag": self.lag.to_dict(),
+            "stalls": self.stalls,
+            "blocking_events": list(self.blocking_events),
+        }
+
+
+@lru_cache()
+def get_loop_monitor() -> LoopMonitor:
+    """
+    获取进程内共享的事件循环监控器（带缓存）
+
+    Returns:
+        LoopMonitor: 事件循环监控器实例
+    """
+    settings = get_settings()
+    return LoopMonitor(
+        interval=settings.loop_monitor_interval,
+        threshold=settings.loop_block_threshold,
+        capture_stacks=settings.debug,
+    )
@@ -0,0 +1,143 @@
+"""
+指标统计模块
+提供进程内的计数器和耗时统计，供外部调用、事件循环等模块记录运行指标
+"""
+
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Deque, Dict, Iterator
+
+
+# 每个统计项保留的最近样本数（用于计算分位数）
+SAMPLE_WINDOW = 1024
+
+
+def _metric_key(name: str, labels: Dict[str, Any]) -> str:
+    """生成Prometheus风格的指标键，如 name{provider="gpt"}"""
+    if not labels:
+        return name
+    label_text = ",".join(f'{key}="{labels[key]}"' for key in sorted(labels))
+    return f"{name}{{{label_text}}}"
+
+
+class Summary:
+    """耗时等数值型指标的汇总统计"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: Deque[float] = deque(maxlen=SAMPLE_WINDOW)
+
+    def observe(self, value: float) -> None:
+        """记录一个样本"""
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.samples.append(value)
+
+    def percentile(self, percentile: float) -> float:
+        """最近样本的分位数"""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(percentile * (len(ordered) - 1))))
+        return ordered[index]
+
+    def to_dict(self) -> Dict[str, float]:
+        """转换为字典格式"""
+        return {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "avg": round(self.total / self.count, 6) if self.count else 0.0,
+            "max": round(self.max, 6),
+            "p50": round(self.percentile(0.5), 6),
+            "p95": round(self.percentile(0.95), 6),
+            "p99": round(self.percentile(0.99), 6),
+        }
+
+
+class MetricsRegistry:
+    """
+    进程内指标注册表
+    线程安全，支持带标签的计数器和汇总统计
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._summaries: Dict[str, Summary] = defaultdict(Summary)
+
+    def increment(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        """
+        增加计数器
+
+        Args:
+            name: 指标名称
+            value: 增量
+            **labels: 指标标签
+        """
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._counters[key] += value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """
+        记录数值样本（如耗时）
+
+        Args:
+            name: 指标名称
+            value: 样本值
+            **labels: 指标标签
+        """
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._summaries[key].observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels: Any) -> Iterator[None]:
+        """
+        统计代码块耗时（异常退出时同样记录）
+
+        Args:
+            name: 指标名称
+            **labels: 指标标签
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def get_counter(self, name: str, **labels: Any) -> float:
+        """读取计数器的当前值"""
+        with self._lock:
+            return self._counters.get(_metric_key(name, labels), 0.0)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """获取所有指标的快照"""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "summaries": {key: summary.to_dict() for key, summary in self._summaries.items()},
+            }
+
+    def reset(self) -> None:
+        """清空所有指标"""
+        with self._lock:
+            self._counters.clear()
+            self._summaries.clear()
+
+
+@lru_cache()
+def get_metrics() -> MetricsRegistry:
+    """
+    获取进程内共享的指标注册表（带缓存）
+
+    Returns:
+        MetricsRegistry: 指标注册表实例
+    """
+    return MetricsRegistry()
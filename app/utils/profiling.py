@@ -0,0 +1,176 @@
+"""
+按请求的性能分析模块
+携带管理员令牌的请求（X-Profile 请求头或 profile 查询参数）会在分析器下执行，
+分析结果按请求ID保存到本地目录；未配置令牌时完全不启用
+"""
+
+import asyncio
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import re
+import time
+import uuid
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Tuple
+
+from .config import get_settings
+from .logger import LoggerMixin
+
+try:
+    from pyinstrument import Profiler as SamplingProfiler
+except ImportError:  # pyinstrument为可选依赖，仅 PROFILER=pyinstrument 时需要
+    SamplingProfiler = None
+
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_QUERY_PARAM = "profile"
+
+# 文本报告中列出的函数数
+REPORT_LIMIT = 60
+
+_PROFILE_ID_PATTERN = re.compile(r"^[0-9a-f]{12}$")
+
+
+class RequestProfiler(LoggerMixin):
+    """
+    请求级性能分析器
+
+    - cprofile: 确定性分析，输出 profile.pstats 和按累计耗时排序的 profile.txt
+    - pyinstrument: 采样分析，只统计当前请求所在的协程链，额外输出 profile.html
+
+    cProfile按线程统计，分析期间同一事件循环上并发请求的开销也会计入，
+    因此同一时刻只分析一个请求，忙碌时其余请求照常执行、不做分析
+    """
+
+    def __init__(self, token: Optional[str], directory: str, mode: str):
+        self.token = token
+        self.directory = directory
+        self.mode = mode
+        self._lock = asyncio.Lock()
+
+        if mode == "pyinstrument" and SamplingProfiler is None:
+            self.logger.warning("未安装pyinstrument，性能分析退化为cProfile")
+            self.mode = "cprofile"
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.token)
+
+    def is_authorized(self, headers: Mapping[str, str], query_params: Mapping[str, str]) -> bool:
+        """请求是否携带了正确的管理员令牌"""
+        supplied = headers.get(PROFILE_HEADER) or query_params.get(PROFILE_QUERY_PARAM)
+        if not self.enabled or not supplied:
+            return False
+        return hmac.compare_digest(supplied.encode(), self.token.encode())
+
+    async def run(
+        self,
+        call: Callable[[], Awaitable[Any]],
+        description: Dict[str, Any]
+    ) -> Tuple[Any, Optional[str]]:
+        """
+        在分析器下执行请求
+
+        Args:
+            call: 执行请求的协程函数
+            description: 写入meta.json的请求信息（方法、路径等）
+
+        Returns:
+            Tuple[Any, Optional[str]]: (请求结果, 分析结果ID)，另一个请求正在分析时ID为None（请求照常执行）
+        """
+        if self._lock.locked():
+            return await call(), None
+
+        async with self._lock:
+            profile_id = uuid.uuid4().hex[:12]
+            start = time.perf_counter()
+            if self.mode == "pyinstrument":
+                profiler = SamplingProfiler(async_mode="enabled")
+                profiler.start()
+                try:
+                    result = await call()
+                finally:
+                    profiler.stop()
+            else:
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    result = await call()
+                finally:
+                    profiler.disable()
+
+            meta = {
+                **description,
+                "profile_id": profile_id,
+                "profiler": self.mode,
+                "duration": round(time.perf_counter() - start, 4),
+                "timestamp": datetime.now().isoformat(),
+            }
+            await asyncio.to_thread(self._save, profile_id, profiler, meta)
+            self.logger.info(f"已保存性能分析结果 {profile_id}: {description.get('path')} 耗时 {meta['duration']}s")
+            return result, profile_id
+
+    def _save(self, profile_id: str, profiler: Any, meta: Dict[str, Any]) -> None:
+        """写入分析结果（在线程池中执行）"""
+        directory = os.path.join(self.directory, profile_id)
+        os.makedirs(directory, exist_ok=True)
+
+        if self.mode == "pyinstrument":
+            with open(os.path.join(directory, "profile.html"), "w", encoding="utf-8") as f:
+                f.write(profiler.output_html())
+            report = profiler.output_text(unicode=True)
+        else:
+            profiler.dump_stats(os.path.join(directory, "profile.pstats"))
+            buffer = io.StringIO()
+            stats = pstats.Stats(profiler, stream=buffer)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(REPORT_LIMIT)
+            report = buffer.getvalue()
+
+        with open(os.path.join(directory, "profile.txt"), "w", encoding="utf-8") as f:
+            f.write(report)
+        with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    def artifact_path(self, profile_id: str, name: Optional[str] = None) -> Optional[str]:
+        """
+        获取分析结果目录或其中某个文件的路径，不存在时返回None
+        """
+        if not _PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        path = os.path.join(self.directory, profile_id)
+        if name is not None:
+            if name != os.path.basename(name):
+                return None
+            path = os.path.join(path, name)
+        return path if os.path.exists(path) else None
+
+    def describe(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        """读取分析结果的请求信息和文件列表"""
+        directory = self.artifact_path(profile_id)
+        if directory is None:
+            return None
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        artifacts: List[str] = sorted(name for name in os.listdir(directory) if name != "meta.json")
+        return {**meta, "artifacts": artifacts}
+
+
+@lru_cache()
+def get_request_profiler() -> RequestProfiler:
+    """
+    获取进程内共享的请求分析器（带缓存）
+
+    Returns:
+        RequestProfiler: 请求分析器实例
+    """
+    settings = get_settings()
+    return RequestProfiler(
+        token=settings.profiling_token,
+        directory=settings.profile_dir,
+        mode=settings.profiler,
+    )
@@ -0,0 +1,262 @@
+"""
+重试策略模块
+为所有外部客户端提供统一的抖动指数退避重试，支持Retry-After和请求截止时间
+"""
+
+import asyncio
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Iterator, Optional, TypeVar
+
+from .config import get_settings
+from .exceptions import TimeoutException
+from .logger import get_logger
+from .metrics import get_metrics
+from .scheduler import get_call_scheduler
+
+
+T = TypeVar("T")
+
+# 当前请求的截止时间（time.monotonic()时间戳），由流水线入口设置
+_request_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+# 不携带状态码的SDK异常按类名映射到HTTP状态码（Tavily同步客户端只按状态码抛出不同的异常类）
+_STATUS_BY_CLASS_NAME = {
+    "UsageLimitExceededError": 429,
+    "BadRequestError": 400,
+    "InvalidAPIKeyError": 401,
+    "MissingAPIKeyError": 401,
+    "ForbiddenError": 403,
+}
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """重试策略配置"""
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+    multiplier: float = 2.0
+    max_retry_after: float = 30.0  # 服务端要求等待更久时直接放弃重试
+
+    def compute_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        计算第attempt次失败后的等待时间
+
+        服务端给出Retry-After时以其为准，否则使用全抖动指数退避：
+        在 [0, min(max_delay, base_delay * multiplier^(attempt-1))] 内随机取值
+
+        Args:
+            attempt: 已完成的尝试次数（从1开始）
+            retry_after: 服务端建议的等待秒数
+
+        Returns:
+            float: 等待秒数
+        """
+        if retry_after is not None:
+            return max(0.0, retry_after)
+        ceiling = min(self.max_delay, self.base_delay * (self.multiplier ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+
+def get_retry_policy(provider: str) -> RetryPolicy:
+    """
+    获取指定提供商的重试策略
+
+    Args:
+        provider: 提供商名称 (tavily/gpt/deepseek/github/arxiv)
+
+    Returns:
+        RetryPolicy: 重试策略
+    """
+    settings = get_settings()
+    return RetryPolicy(
+        max_attempts=settings.retry_max_attempts.get(provider, 3),
+        base_delay=settings.retry_base_delay,
+        max_delay=settings.retry_max_delay,
+    )
+
+
+@contextmanager
+def request_deadline(seconds: float) -> Iterator[None]:
+    """
+    为当前请求设置截止时间，内部发起的所有重试都会遵守
+
+    已存在更早的截止时间时保留原值
+
+    Args:
+        seconds: 从现在开始的剩余秒数
+    """
+    deadline = time.monotonic() + seconds
+    current = _request_deadline.get()
+    token = _request_deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _request_deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """当前请求的剩余时间（秒），未设置截止时间时返回None"""
+    deadline = _request_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def parse_retry_after(value: Any) -> Optional[float]:
+    """
+    解析Retry-After头，支持秒数和HTTP日期两种格式
+
+    Args:
+        value: 响应头的值
+
+    Returns:
+        Optional[float]: 等待秒数，无法解析时返回None
+    """
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        retry_at = parsedate_to_datetime(str(value))
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def get_status_code(error: BaseException) -> Optional[int]:
+    """从各类客户端异常中提取HTTP状态码"""
+    for source in (error, getattr(error, "response", None)):
+        for attr in ("status_code", "status"):
+            value = getattr(source, attr, None)
+            if isinstance(value, int):
+                return value
+    for cls in type(error).__mro__:
+        if cls.__name__ in _STATUS_BY_CLASS_NAME:
+            return _STATUS_BY_CLASS_NAME[cls.__name__]
+    return None
+
+
+def get_retry_after(error: BaseException) -> Optional[float]:
+    """从异常携带的响应头或响应数据中提取Retry-After"""
+    response_data = getattr(error, "response_data", None) or {}
+    if response_data.get("retry_after") is not None:
+        return parse_retry_after(response_data["retry_after"])
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if headers:
+        return parse_retry_after(headers.get("retry-after") or headers.get("Retry-After"))
+    return None
+
+
+def _class_names(error: BaseException) -> str:
+    return " ".join(cls.__name__ for cls in type(error).__mro__)
+
+
+def is_retryable_error(error: BaseException, idempotent: bool = True) -> bool:
+    """
+    判断错误是否可以重试
+
+    429和连接失败说明请求未被处理，总是可以重试；
+    超时和5xx时服务端可能已经处理了请求，只有幂等操作才重试
+
+    Args:
+        error: 捕获的异常
+        idempotent: 操作是否幂等
+
+    Returns:
+        bool: 是否可以重试
+    """
+    status = get_status_code(error)
+    if status is not None:
+        if status == 429:
+            return True
+        return idempotent and status >= 500
+
+    names = _class_names(error)
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError)) or "Timeout" in names:
+        return idempotent
+    if isinstance(error, ConnectionError) or "Connection" in names or "Connector" in names:
+        return True
+    return False
+
+
+async def retry_async(
+    operation: Callable[[], Awaitable[T]],
+    provider: str,
+    idempotent: bool = True,
+    policy: Optional[RetryPolicy] = None
+) -> T:
+    """
+    按重试策略执行异步操作
+
+    每次尝试前按当前请求或任务的调度通道获取该服务的调用配额；
+    每次尝试都会计入指标；等待时间超过请求剩余时间时放弃重试
+
+    Args:
+        operation: 无参异步函数，每次尝试调用一次
+        provider: 提供商名称，用于选择策略和标记指标
+        idempotent: 操作是否幂等
+        policy: 重试策略，默认按提供商读取配置
+
+    Returns:
+        T: 操作结果
+    """
+    policy = policy or get_retry_policy(provider)
+    metrics = get_metrics()
+    logger = get_logger(__name__)
+    attempt = 0
+
+    while True:
+        attempt += 1
+        remaining = remaining_time()
+        if remaining is not None and remaining <= 0:
+            metrics.increment("external_call_deadline_exceeded_total", provider=provider)
+            raise TimeoutException(f"{provider} 调用前请求已超过截止时间", details={"provider": provider})
+
+        await get_call_scheduler().acquire(provider, timeout=remaining)
+        remaining = remaining_time()
+
+        start = time.monotonic()
+        try:
+            if remaining is not None:
+                result = await asyncio.wait_for(operation(), timeout=remaining)
+            else:
+                result = await operation()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            elapsed = time.monotonic() - start
+            metrics.increment("external_call_attempts_total", provider=provider, outcome="error")
+            metrics.observe("external_call_seconds", elapsed, provider=provider)
+
+            if attempt >= policy.max_attempts or not is_retryable_error(e, idempotent):
+                raise
+
+            retry_after = get_retry_after(e)
+            if retry_after is not None and retry_after > policy.max_retry_after:
+                logger.warning(f"{provider} 要求等待 {retry_after:.0f}s，超过上限，放弃重试: {e}")
+                raise
+
+            delay = policy.compute_delay(attempt, retry_after)
+            remaining = remaining_time()
+            if remaining is not None and delay >= remaining:
+                logger.warning(f"{provider} 第{attempt}次调用失败，剩余时间不足以等待 {delay:.2f}s，放弃重试: {e}")
+                raise
+
+            metrics.increment("external_call_retries_total", provider=provider)
+            logger.warning(f"{provider} 第{attempt}次调用失败，{delay:.2f}s 后重试: {e}")
+            await asyncio.sleep(delay)
+        else:
+            metrics.increment("external_call_attempts_total", provider=provider, outcome="success")
+            metrics.observe("external_call_seconds", time.monotonic() - start, provider=provider)
+            return result
@@ -0,0 +1,340 @@
+"""
+外部调用调度模块
+用户请求、后台刷新和缓存预热共用各外部服务的调用配额：
+每个服务一个令牌桶限速，没有令牌时调用按调度通道排队，各通道按权重加权公平地分配令牌；
+等待队列已满时，高优先级通道的调用抢占排队中的低优先级调用
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Deque, Dict, Iterator, Optional
+
+from .config import get_settings
+from .exceptions import ConfigException, PreemptedException, TimeoutException
+from .logger import LoggerMixin
+from .metrics import get_metrics
+
+
+# 调度通道（按优先级从高到低）
+INTERACTIVE = "interactive"  # 用户请求
+BACKGROUND = "background"    # 结果缓存的后台刷新、批量重新生成
+WARMUP = "warmup"            # 缓存预热
+LANES = (INTERACTIVE, BACKGROUND, WARMUP)
+
+
+class LaneScope:
+    """一个请求或任务的调度通道，同时统计其中被抢占的外部调用数（子任务共享）"""
+    __slots__ = ("lane", "preempted")
+
+    def __init__(self, lane: str):
+        if lane not in LANES:
+            raise ConfigException(f"未知的调度通道: {lane}")
+        self.lane = lane
+        self.preempted = 0
+
+
+_scope: ContextVar[Optional[LaneScope]] = ContextVar("lane_scope", default=None)
+
+
+@contextmanager
+def scheduling_lane(lane: str) -> Iterator[LaneScope]:
+    """此上下文中（包括其中创建的子任务）发起的外部调用使用指定的调度通道"""
+    scope = LaneScope(lane)
+    token = _scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _scope.reset(token)
+
+
+def current_lane() -> str:
+    """当前请求或任务的调度通道，未指定时为用户请求"""
+    scope = _scope.get()
+    return scope.lane if scope is not None else INTERACTIVE
+
+
+def preempted_calls() -> int:
+    """当前请求或任务中被抢占的外部调用数"""
+    scope = _scope.get()
+    return scope.preempted if scope is not None else 0
+
+
+def parse_rates(spec: str) -> Dict[str, float]:
+    """
+    解析形如 "tavily=120,gpt=300" 的配置（服务或通道=数值）
+
+    Raises:
+        ConfigException: 格式无效
+    """
+    values = {}
+    for part in filter(None, (item.strip() for item in spec.split(","))):
+        name, _, value = part.partition("=")
+        try:
+            values[name.strip()] = float(value)
+        except ValueError:
+            raise ConfigException(f"无效的调度配置: {part}")
+    return values
+
+
+class _Waiter:
+    """排队中的调用"""
+    __slots__ = ("lane", "scope", "future", "enqueued_at")
+
+    def __init__(self, lane: str, scope: Optional[LaneScope], future: "asyncio.Future[None]"):
+        self.lane = lane
+        self.scope = scope
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class ProviderScheduler(LoggerMixin):
+    """
+    单个外部服务的调用调度器
+
+    - 令牌桶每分钟补充 rate 个令牌，容量为 burst 秒的配额，每次调用（包括重试）消耗一个令牌
+    - 没有令牌时调用进入所在通道的队列，令牌按步幅调度（stride scheduling）分给各通道：
+      每个通道每获得一个令牌步幅增加 1/权重，下一个令牌给步幅最小的通道。
+      积压时各通道获得的配额与权重成正比；空闲的通道不积累配额，
+      重新有调用时从当前进度开始，因此新到达的用户请求不必排在已积压的批量调用之后
+    - 队列达到 max_queue 时，新调用抢占优先级更低的通道中最新排队的调用（被抢占的调用抛出 PreemptedException）；
+      没有可抢占的调用时后台和预热调用直接被拒绝，用户请求仍然排队
+    """
+
+    def __init__(self, provider: str, rate: float, burst: float, weights: Dict[str, float], max_queue: int):
+        self.provider = provider
+        self.rate = rate / 60.0
+        self.capacity = max(1.0, self.rate * burst)
+        self.weights = weights
+        self.max_queue = max_queue
+        self.metrics = get_metrics()
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._queues: Dict[str, Deque[_Waiter]] = {lane: deque() for lane in LANES}
+        self._pass: Dict[str, float] = {lane: 0.0 for lane in LANES}
+        self._virtual_time = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, timeout: Optional[float] = None) -> None:
+        """
+        获取一次调用配额
+
+        Args:
+            timeout: 最长等待秒数（请求的剩余时间），None表示一直等待
+
+        Raises:
+            PreemptedException: 排队时被更高优先级的调用抢占，或队列已满
+            TimeoutException: 超过timeout秒仍未获得配额
+        """
+        scope = _scope.get()
+        lane = scope.lane if scope is not None else INTERACTIVE
+        self._bind_loop()
+        self._refill()
+        if self._tokens >= 1 and not self.queued:
+            self._tokens -= 1
+            self._record(lane, 0.0)
+            return
+
+        waiter = self._enqueue(lane, scope)
+        try:
+            await asyncio.wait_for(waiter.future, timeout)
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            self.metrics.increment("scheduler_timeouts_total", provider=self.provider, lane=lane)
+            raise TimeoutException(
+                f"{self.provider} 等待调用配额超过请求截止时间",
+                details={"provider": self.provider, "lane": lane}
+            )
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        self._record(lane, time.monotonic() - waiter.enqueued_at)
+
+    def _bind_loop(self) -> None:
+        """调度器是进程内单例，事件循环变化时（如测试或工作进程重启循环）丢弃旧循环留下的定时器和排队调用"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self.close()
+            self._loop = loop
+
+    def close(self) -> None:
+        """取消补充令牌的定时器和排队中的调用（应用关闭时调用）"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for queue in self._queues.values():
+            for waiter in queue:
+                # 只取消当前循环中的等待；其他（已结束的）循环中的等待直接丢弃
+                if waiter.future.get_loop() is self._running_loop():
+                    waiter.future.cancel()
+            queue.clear()
+        self._loop = None
+
+    @staticmethod
+    def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+        try:
+            return asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+
+    def _enqueue(self, lane: str, scope: Optional[LaneScope]) -> _Waiter:
+        if self.queued >= self.max_queue:
+            victim = self._preemptible(lane)
+            if victim is not None:
+                self._queues[victim.lane].pop()
+                self._preempt(victim, f"被 {lane} 调用抢占")
+            elif lane != INTERACTIVE:
+                self._count_preempted(lane, scope)
+                raise PreemptedException(
+                    f"{self.provider} 调用队列已满，{lane} 调用被拒绝",
+                    details={"provider": self.provider, "lane": lane}
+                )
+
+        queue = self._queues[lane]
+        if not queue:
+            # 通道由空闲变为积压：从当前进度开始，空闲期间不积累配额
+            self._pass[lane] = max(self._pass[lane], self._virtual_time)
+        waiter = _Waiter(lane, scope, asyncio.get_running_loop().create_future())
+        queue.append(waiter)
+        self._dispatch()
+        return waiter
+
+    def _preemptible(self, lane: str) -> Optional[_Waiter]:
+        """优先级低于lane的通道中最新排队的调用（从最低优先级的通道找起）"""
+        for candidate in reversed(LANES[LANES.index(lane) + 1:]):
+            if self._queues[candidate]:
+                return self._queues[candidate][-1]
+        return None
+
+    def _preempt(self, waiter: _Waiter, reason: str) -> None:
+        self._count_preempted(waiter.lane, waiter.scope)
+        waiter.future.set_exception(PreemptedException(
+            f"{self.provider} {waiter.lane} 调用{reason}",
+            details={"provider": self.provider, "lane": waiter.lane}
+        ))
+        self.logger.info(f"⏏️ {self.provider} 排队中的 {waiter.lane} 调用{reason}")
+
+    def _count_preempted(self, lane: str, scope: Optional[LaneScope]) -> None:
+        if scope is not None:
+            scope.preempted += 1
+        self.metrics.increment("scheduler_preempted_total", provider=self.provider, lane=lane)
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        """放弃排队（超时或被取消），已分配但未使用的令牌归还"""
+        future = waiter.future
+        if future.done() and not future.cancelled() and future.exception() is None:
+            self._tokens = min(self.capacity, self._tokens + 1)
+        else:
+            future.cancel()
+            try:
+                self._queues[waiter.lane].remove(waiter)
+            except ValueError:
+                pass
+        self._dispatch()
+
+    def _next_lane(self) -> Optional[str]:
+        """有排队调用的通道中步幅最小的一个（相同时优先级高的优先）"""
+        backlogged = [lane for lane in LANES if self._queues[lane]]
+        if not backlogged:
+            return None
+        return min(backlogged, key=lambda lane: (self._pass[lane], LANES.index(lane)))
+
+    def _dispatch(self) -> None:
+        """把可用的令牌分配给排队的调用，令牌不足时定时补充后继续"""
+        self._refill()
+        while self._tokens >= 1:
+            lane = self._next_lane()
+            if lane is None:
+                break
+            waiter = self._queues[lane].popleft()
+            if waiter.future.done():
+                continue
+            self._tokens -= 1
+            self._virtual_time = self._pass[lane]
+            self._pass[lane] += 1.0 / self.weights[lane]
+            waiter.future.set_result(None)
+
+        if self.queued and self._timer is None:
+            delay = (1.0 - self._tokens) / self.rate
+            self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    def _record(self, lane: str, waited: float) -> None:
+        self.metrics.increment("scheduler_calls_total", provider=self.provider, lane=lane)
+        self.metrics.observe("scheduler_wait_seconds", waited, provider=self.provider, lane=lane)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """当前令牌数和各通道的排队调用数"""
+        self._refill()
+        return {
+            "rate_per_minute": self.rate * 60,
+            "capacity": round(self.capacity, 3),
+            "tokens": round(self._tokens, 3),
+            "queued": {lane: len(self._queues[lane]) for lane in LANES},
+        }
+
+
+class CallScheduler:
+    """各外部服务的调用调度器，未配置配额的服务不排队"""
+
+    def __init__(self, rates: Dict[str, float], burst: float, weights: Dict[str, float], max_queue: int):
+        unknown = set(weights) - set(LANES)
+        if unknown:
+            raise ConfigException(f"未知的调度通道: {', '.join(sorted(unknown))}")
+        self.weights = {lane: weights.get(lane, 1.0) for lane in LANES}
+        if any(weight <= 0 for weight in self.weights.values()):
+            raise ConfigException("调度通道的权重必须大于0")
+        self.providers = {
+            provider: ProviderScheduler(provider, rate, burst, self.weights, max_queue)
+            for provider, rate in rates.items() if rate > 0
+        }
+
+    async def acquire(self, provider: str, timeout: Optional[float] = None) -> None:
+        """按当前请求或任务的调度通道获取一次provider的调用配额"""
+        scheduler = self.providers.get(provider)
+        if scheduler is not None:
+            await scheduler.acquire(timeout)
+
+    def close(self) -> None:
+        """关闭各服务的调度器（应用关闭时调用）"""
+        for scheduler in self.providers.values():
+            scheduler.close()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "weights": self.weights,
+            "providers": {provider: scheduler.snapshot() for provider, scheduler in self.providers.items()},
+        }
+
+
+@lru_cache()
+def get_call_scheduler() -> CallScheduler:
+    """
+    获取进程内共享的外部调用调度器（带缓存）
+
+    Returns:
+        CallScheduler: 外部调用调度器实例
+    """
+    settings = get_settings()
+    return CallScheduler(
+        rates=parse_rates(settings.scheduler_rate_limits),
+        burst=settings.scheduler_burst,
+        weights=parse_rates(settings.scheduler_lane_weights),
+        max_queue=settings.scheduler_max_queue,
+    )
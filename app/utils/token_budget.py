@@ -0,0 +1,244 @@
+"""
+Token预算模块
+按目标模型统计token数量，并在给定的输入预算内打包搜索结果
+"""
+
+import math
+import re
+from functools import lru_cache
+from typing import Any, Callable, List, Optional, Sequence
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken为可选依赖，缺失时退化为启发式估算
+    tiktoken = None
+
+
+# 逻辑模型名到实际模型名的映射（与LLMService保持一致）
+MODEL_ALIASES = {
+    "gpt": "gpt-4-turbo-preview",
+    "deepseek": "deepseek-chat",
+}
+
+# CJK字符（中日韩统一表意文字、假名、全角标点）
+_CJK_PATTERN = re.compile(r"[　-〿぀-ヿ㐀-䶿一-鿿＀-￯]")
+
+TRUNCATION_MARK = "..."
+
+
+class TokenCounter:
+    """
+    Token计数器
+    优先使用tiktoken精确计数，不可用时使用字符启发式估算
+    """
+
+    def __init__(self, model: str):
+        self.model = MODEL_ALIASES.get((model or "").lower(), model or "")
+        self._encoding = self._load_encoding(self.model)
+
+    @staticmethod
+    def _load_encoding(model: str):
+        """加载模型对应的编码器，DeepSeek等非OpenAI模型使用cl100k_base近似"""
+        if tiktoken is None:
+            return None
+        try:
+            try:
+                return tiktoken.encoding_for_model(model)
+            except KeyError:
+                return tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            # 编码文件需要首次下载，离线环境下退化为启发式估算
+            return None
+
+    @property
+    def is_exact(self) -> bool:
+        """是否为精确计数"""
+        return self._encoding is not None
+
+    def count(self, text: str) -> int:
+        """统计文本的token数量"""
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text))
+        cjk_chars = len(_CJK_PATTERN.findall(text))
+        other_chars = len(text) - cjk_chars
+        # 经验值：CJK字符约1 token/字，其余约4字符/token
+        return cjk_chars + math.ceil(other_chars / 4)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """
+        将文本截断到指定token数量以内
+
+        Args:
+            text: 原始文本
+            max_tokens: 最大token数量
+
+        Returns:
+            str: 截断后的文本，发生截断时以省略号结尾
+        """
+        if max_tokens <= 0 or not text:
+            return ""
+        if self.count(text) <= max_tokens:
+            return text
+
+        budget = max(0, max_tokens - self.count(TRUNCATION_MARK))
+        if self._encoding is not None:
+            tokens = self._encoding.encode(text)
+            return self._encoding.decode(tokens[:budget]).rstrip() + TRUNCATION_MARK
+
+        # 启发式模式下逐字符累计成本
+        cost = 0.0
+        end = 0
+        for end, char in enumerate(text):
+            cost += 1.0 if _CJK_PATTERN.match(char) else 0.25
+            if cost > budget:
+                break
+        return text[:end].rstrip() + TRUNCATION_MARK
+
+
+@lru_cache()
+def get_token_counter(model: str) -> TokenCounter:
+    """
+    获取模型对应的Token计数器（带缓存）
+
+    Args:
+        model: 模型名称 (gpt/deepseek 或实际模型名)
+
+    Returns:
+        TokenCounter: Token计数器实例
+    """
+    return TokenCounter(model)
+
+
+class PromptPacker:
+    """
+    提示词打包器
+    在输入token预算内尽可能多地放入搜索结果，并按重要性分配摘要长度
+    """
+
+    def __init__(
+        self,
+        model: str,
+        min_snippet_tokens: int = 24,
+        max_snippet_tokens: int = 160
+    ):
+        self.counter = get_token_counter(model)
+        self.min_snippet_tokens = min_snippet_tokens
+        self.max_snippet_tokens = max_snippet_tokens
+
+    def pack_results(
+        self,
+        results: Sequence[Any],
+        budget_tokens: int,
+        format_item: Callable[[int, Any, str], str]
+    ) -> List[str]:
+        """
+        按预算打包搜索结果
+
+        结果需已按重要性降序排列。先保证每个入选结果的固定部分和最小摘要，
+        再把剩余预算按重要性权重分配给摘要，超出预算的低优先级结果被丢弃。
+
+        Args:
+            results: 搜索结果序列（需有content和score属性）
+            budget_tokens: 输入token预算
+            format_item: 渲染函数 (序号, 结果, 摘要) -> 文本行
+
+        Returns:
+            List[str]: 渲染后的结果文本列表
+        """
+        headers = []
+        used = 0
+        for i, result in enumerate(results, 1):
+            header_tokens = self.counter.count(format_item(i, result, ""))
+            content_tokens = self.counter.count(result.content or "")
+            reserve = min(self.min_snippet_tokens, content_tokens)
+            if used + header_tokens + reserve > budget_tokens:
+                break
+            used += header_tokens + reserve
+            headers.append((result, header_tokens, content_tokens))
+
+        if not headers:
+            return []
+
+        allocations = self._allocate_snippets(
+            [(result.score, content_tokens) for result, _, content_tokens in headers],
+            budget_tokens - sum(header for _, header, _ in headers)
+        )
+
+        packed = []
+        for i, ((result, _, _), allocation) in enumerate(zip(headers, allocations), 1):
+            snippet = self.counter.truncate(result.content or "", allocation)
+            packed.append(format_item(i, result, snippet))
+        return packed
+
+    def _allocate_snippets(self, items: List[tuple], remaining: int) -> List[int]:
+        """
+        按重要性权重分配摘要token（注水式分配，封顶的结果把余量让给其他结果）
+
+        Args:
+            items: (评分, 摘要完整token数) 列表，顺序即排名
+            remaining: 可分配的token数量
+
+        Returns:
+            List[int]: 每个结果的摘要token配额
+        """
+        caps = [min(content, self.max_snippet_tokens) for _, content in items]
+        weights = [(max(score, 0.0) + 0.1) / (1 + 0.05 * rank) for rank, (score, _) in enumerate(items)]
+        allocations = [0] * len(items)
+        open_items = set(range(len(items)))
+
+        while remaining > 0 and open_items:
+            total_weight = sum(weights[i] for i in open_items)
+            distributed = 0
+            for i in sorted(open_items):
+                share = int(remaining * weights[i] / total_weight)
+                grant = min(share, caps[i] - allocations[i])
+                allocations[i] += grant
+                distributed += grant
+            open_items = {i for i in open_items if allocations[i] < caps[i]}
+            if distributed == 0:
+                break
+            remaining -= distributed
+
+        return allocations
+
+
+def plan_batches(
+    item_tokens: Sequence[int],
+    budget_tokens: int,
+    max_batch_size: int,
+    output_tokens_per_item: int = 0,
+    max_output_tokens: Optional[int] = None
+) -> List[List[int]]:
+    """
+    根据每个结果的token数量动态划分批次
+
+    每批同时满足：输入token不超过预算、条目数不超过上限、
+    预计输出token不超过单次调用的max_tokens。
+
+    Args:
+        item_tokens: 每个结果渲染后的token数量
+        budget_tokens: 每批输入token预算
+        max_batch_size: 每批最大条目数
+        output_tokens_per_item: 每个结果的预计输出token
+        max_output_tokens: 单次调用的最大输出token
+
+    Returns:
+        List[List[int]]: 每批包含的结果下标
+    """
+    if output_tokens_per_item and max_output_tokens:
+        max_batch_size = min(max_batch_size, max(1, max_output_tokens // output_tokens_per_item))
+
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+    for index, tokens in enumerate(item_tokens):
+        if current and (current_tokens + tokens > budget_tokens or len(current) >= max_batch_size):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(index)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
@@ -0,0 +1,229 @@
+"""
+端到端桩服务基准测试
+启动大模型桩服务和真实的FastAPI应用（搜索与元数据使用合成后端），
+并发请求生成接口，统计端到端延迟、桩服务收到的调用和token数量
+
+用法: python -m benchmarks.e2e_stub [--requests 20] [--concurrency 4]
+      [--endpoint intelligent] [--stub-latency fixed:0.3] [--error-rate 0.0]
+      [--stream-abort-rate 0.0] [--output result.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+
+ENDPOINTS = {
+    "basic": "/api/v1/generate_awesome_list",
+    "intelligent": "/api/v1/generate_awesome_list_intelligent",
+}
+
+TOPICS = [
+    "vision transformer", "graph neural networks", "diffusion models", "reinforcement learning",
+    "大语言模型", "speech recognition", "federated learning", "neural radiance fields",
+]
+
+
+def percentile(values: List[float], q: float) -> float:
+    """计算分位数（最近秩法）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def layer_env(
+    data_dir: str,
+    response_cache: bool = False,
+    history: bool = False,
+    warm: bool = False,
+    admission: bool = False
+) -> Dict[str, str]:
+    """
+    结果缓存、生成历史复用、预热存储和准入控制的开关，
+    存储放在本次运行的临时目录中，不受之前运行和 data/ 下已有数据的影响
+    """
+    def flag(enabled: bool) -> str:
+        return "true" if enabled else "false"
+
+    return {
+        "RESPONSE_CACHE_ENABLED": flag(response_cache),
+        "HISTORY_ENABLED": flag(history),
+        "WARM_ENABLED": flag(warm),
+        "WARM_SCHEDULER_ENABLED": "false",
+        "ADMISSION_ENABLED": flag(admission),
+        "HISTORY_PATH": os.path.join(data_dir, "history.sqlite3"),
+        "WARM_STORE_PATH": os.path.join(data_dir, "warm.sqlite3"),
+        "TOPIC_SYNONYMS_PATH": os.path.join(data_dir, "topic_synonyms.json"),
+    }
+
+
+def start_process(args: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m"] + args, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, url: str, timeout: float = 30.0) -> None:
+    """等待服务启动"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            await client.get(url)
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"服务未在{timeout}秒内启动: {url}")
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    app_url: str,
+    endpoint: str,
+    requests: int,
+    concurrency: int,
+    max_results: int,
+    scoring_method: str,
+    model: str
+) -> Dict[str, Any]:
+    """以固定并发发送请求，返回延迟和状态码统计"""
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(TOPICS[i % len(TOPICS)])
+
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+
+    async def worker() -> None:
+        while not queue.empty():
+            topic = queue.get_nowait()
+            body = {
+                "topic": topic, "model": model, "max_results": max_results,
+                "scoring_method": scoring_method,
+            }
+            start = time.perf_counter()
+            try:
+                response = await client.post(f"{app_url}{ENDPOINTS[endpoint]}", json=body)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall_time = time.perf_counter() - start
+
+    return {
+        "wall_time": round(wall_time, 3),
+        "throughput_rps": round(requests / wall_time, 3) if wall_time else 0.0,
+        "latency": {
+            "mean": round(statistics.mean(latencies), 3) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(max(latencies), 3) if latencies else 0.0,
+        },
+        "statuses": statuses,
+    }
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    app_url = f"http://127.0.0.1:{args.app_port}"
+
+    # 每个请求都完整执行流水线：关闭结果缓存、历史复用、预热存储和准入控制（避免过载降级）
+    data_dir = tempfile.mkdtemp(prefix="e2e_stub_")
+    layers = layer_env(data_dir)
+    env = dict(os.environ)
+    env.update(layers)
+    env.update({
+        "LLM_BACKEND": "openai",
+        "OPENAI_BASE_URL": f"{stub_url}/v1",
+        "DEEPSEEK_BASE_URL": f"{stub_url}/v1",
+        "OPENAI_API_KEY": env.get("OPENAI_API_KEY") or "stub",
+        "DEEPSEEK_API_KEY": env.get("DEEPSEEK_API_KEY") or "stub",
+        "SEARCH_BACKEND": "synthetic",
+        "METADATA_BACKEND": "synthetic",
+        "BACKEND_LATENCY": args.backend_latency,
+        "LOCAL_INDEX_ENABLED": "false",
+    })
+
+    stub = start_process([
+        "benchmarks.llm_stub", "--port", str(args.stub_port),
+        "--latency", args.stub_latency, "--tokens-per-second", str(args.tokens_per_second),
+        "--error-rate", str(args.error_rate), "--stream-abort-rate", str(args.stream_abort_rate), "--seed", "0",
+    ], env)
+    app = start_process([
+        "uvicorn", "main:app", "--port", str(args.app_port), "--log-level", "warning",
+    ], env)
+
+    try:
+        async with httpx.AsyncClient(timeout=args.timeout) as client:
+            await wait_ready(client, f"{stub_url}/stats")
+            await wait_ready(client, f"{app_url}/health")
+
+            result = await run_load(
+                client, app_url, args.endpoint, args.requests, args.concurrency,
+                args.max_results, args.scoring_method, args.model
+            )
+            result["stub"] = (await client.get(f"{stub_url}/stats")).json()
+            result["app_metrics"] = (await client.get(f"{app_url}/api/v1/metrics")).json()
+    finally:
+        for process in (app, stub):
+            process.terminate()
+            process.wait(timeout=10)
+
+    result["config"] = {
+        key: getattr(args, key) for key in (
+            "endpoint", "requests", "concurrency", "max_results", "scoring_method", "model",
+            "stub_latency", "tokens_per_second", "error_rate", "stream_abort_rate", "backend_latency",
+        )
+    }
+    result["config"]["layers"] = {key: value for key, value in layers.items() if key.endswith("_ENABLED")}
+    return result
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="端到端桩服务基准测试")
+    parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), default="intelligent")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--max-results", type=int, default=10)
+    parser.add_argument("--scoring-method", choices=["rule_based", "llm_based"], default="llm_based")
+    parser.add_argument("--model", default="gpt")
+    parser.add_argument("--stub-latency", default="fixed:0.3", help="桩服务首字延迟分布")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--stream-abort-rate", type=float, default=0.0)
+    parser.add_argument("--backend-latency", default="fixed:0.2", help="合成搜索和元数据后端的延迟分布")
+    parser.add_argument("--stub-port", type=int, default=8900)
+    parser.add_argument("--app-port", type=int, default=8901)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--output", help="把结果写入JSON文件")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    result = asyncio.run(main_async(args))
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
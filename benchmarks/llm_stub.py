@@ -0,0 +1,203 @@
+"""
+OpenAI兼容的本地桩服务
+模拟 /v1/chat/completions，返回主题扩展、搜索规划、评分、关键词和列表生成的预置响应，
+支持可配置的首字延迟、输出速率、流式响应、工具调用和错误注入，用于不消耗真实token的压测
+
+用法: python -m benchmarks.llm_stub [--port 8900] [--latency lognormal:0.6,0.4]
+      [--tokens-per-second 60] [--error-rate 0.05] [--error-codes 429,500,503]
+然后配置 OPENAI_BASE_URL / DEEPSEEK_BASE_URL 为 http://127.0.0.1:8900/v1
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.backends.canned import (
+    build_chunks, build_completion, build_usage, canned_reply, estimate_tokens, prompt_tokens_of, wants_stream_usage
+)
+from app.backends.latency import LatencyModel
+
+
+@dataclass
+class StubConfig:
+    """桩服务配置"""
+    latency: str = "lognormal:0.6,0.4"        # 首字延迟分布
+    tokens_per_second: float = 60.0           # 输出速率，0表示不限速
+    error_rate: float = 0.0                   # 注入错误的概率
+    error_codes: List[int] = field(default_factory=lambda: [429, 500, 503])
+    retry_after: float = 1.0                  # 429响应的Retry-After秒数
+    stream_abort_rate: float = 0.0            # 流式响应中途断开的概率
+    chunk_chars: int = 16                     # 每个流式分片的字符数
+    seed: Optional[int] = None
+
+
+@dataclass
+class StubStats:
+    """桩服务统计，供基准测试读取"""
+    requests: int = 0
+    streamed: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    errors: Counter = field(default_factory=Counter)
+    aborted_streams: int = 0
+    by_model: Counter = field(default_factory=Counter)
+
+    def reset(self) -> None:
+        self.__dict__.update(StubStats().__dict__)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "streamed": self.streamed,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "errors": {str(code): count for code, count in self.errors.items()},
+            "aborted_streams": self.aborted_streams,
+            "by_model": dict(self.by_model),
+        }
+
+
+def _error_response(status: int, config: StubConfig) -> JSONResponse:
+    """构建与OpenAI错误格式一致的响应"""
+    headers = {"Retry-After": str(config.retry_after)} if status == 429 else None
+    error_type = "rate_limit_exceeded" if status == 429 else "server_error"
+    return JSONResponse(
+        status_code=status,
+        content={"error": {"message": f"Injected {status} error", "type": error_type, "code": error_type}},
+        headers=headers,
+    )
+
+
+def create_stub_app(config: Optional[StubConfig] = None) -> FastAPI:
+    """
+    创建桩服务应用
+
+    Args:
+        config: 桩服务配置
+
+    Returns:
+        FastAPI: 桩服务应用
+    """
+    config = config or StubConfig()
+    latency = LatencyModel.parse(config.latency, seed=config.seed)
+    rng = random.Random(config.seed)
+    stats = StubStats()
+
+    app = FastAPI(title="OpenAI Compatible Stub")
+    app.state.config = config
+    app.state.stats = stats
+
+    async def pace(text: str) -> None:
+        """按输出速率等待"""
+        if config.tokens_per_second > 0 and text:
+            await asyncio.sleep(estimate_tokens(text) / config.tokens_per_second)
+
+    async def stream_chunks(
+        model: str,
+        content: Optional[str],
+        tool_calls: List[Dict[str, str]],
+        usage: Optional[Dict[str, int]]
+    ) -> AsyncIterator[bytes]:
+        chunks = build_chunks(model, content, tool_calls, config.chunk_chars, usage)
+        abort_at = rng.randrange(1, len(chunks)) if rng.random() < config.stream_abort_rate else None
+        for index, chunk in enumerate(chunks):
+            if index == abort_at:
+                stats.aborted_streams += 1
+                raise ConnectionError("Injected stream abort")
+            delta = chunk["choices"][0]["delta"] if chunk["choices"] else {}
+            text = delta.get("content") or "".join(
+                part.get("function", {}).get("arguments", "") for part in delta.get("tool_calls", [])
+            )
+            await pace(text)
+            stats.completion_tokens += estimate_tokens(text) if text else 0
+            yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8")
+        yield b"data: [DONE]\n\n"
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        params = await request.json()
+        model = params.get("model", "stub")
+        stats.requests += 1
+        stats.by_model[model] += 1
+        prompt_tokens = prompt_tokens_of(params)
+        stats.prompt_tokens += prompt_tokens
+
+        await latency.wait()
+        if rng.random() < config.error_rate:
+            status = rng.choice(config.error_codes)
+            stats.errors[status] += 1
+            return _error_response(status, config)
+
+        content, tool_calls = canned_reply(params)
+        if params.get("stream"):
+            stats.streamed += 1
+            usage = build_usage(prompt_tokens, content, tool_calls) if wants_stream_usage(params) else None
+            return StreamingResponse(stream_chunks(model, content, tool_calls, usage), media_type="text/event-stream")
+
+        completion = build_completion(model, content, tool_calls, prompt_tokens)
+        await pace((content or "") + "".join(call["arguments"] for call in tool_calls))
+        stats.completion_tokens += completion["usage"]["completion_tokens"]
+        return completion
+
+    @app.get("/v1/models")
+    async def list_models():
+        return {"object": "list", "data": [
+            {"id": model, "object": "model", "created": int(time.time()), "owned_by": "stub"}
+            for model in ("gpt-4-turbo-preview", "deepseek-chat")
+        ]}
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats.to_dict()
+
+    @app.post("/stats/reset")
+    async def reset_stats():
+        stats.reset()
+        return {"status": "reset"}
+
+    return app
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="OpenAI兼容的本地桩服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", default=StubConfig.latency, help="首字延迟分布，如 fixed:0.5 或 lognormal:0.6,0.4")
+    parser.add_argument("--tokens-per-second", type=float, default=StubConfig.tokens_per_second)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-codes", default="429,500,503")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--stream-abort-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args(argv)
+
+
+def config_from_args(args: argparse.Namespace) -> StubConfig:
+    return StubConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        error_codes=[int(code) for code in args.error_codes.split(",") if code.strip()],
+        retry_after=args.retry_after,
+        stream_abort_rate=args.stream_abort_rate,
+        seed=args.seed,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import uvicorn
+
+    args = parse_args(argv)
+    uvicorn.run(create_stub_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+"""
+并发压测工具
+按配置的到达速率（开环泊松到达）或固定并发（闭环）请求生成接口和搜索预览接口，
+主题可按均匀分布或Zipf分布（少数热门主题占大部分请求）抽取，
+统计吞吐、p50/p95/p99延迟、错误率、缓存命中状态（X-Cache响应头）、降级响应（X-Degraded响应头）
+和事件循环延迟（通过/health探测，并读取服务端事件循环监控的指标）
+
+默认启动使用合成后端的应用；--llm stub 时大模型调用走本地桩服务，--url 时压测已运行的服务。
+自动启动的应用默认开启结果缓存和准入控制、关闭生成历史复用和预热存储（存储在临时目录中），
+可用 --[no-]response-cache / --[no-]history / --[no-]warm / --[no-]admission 调整，结果的 layers 字段记录实际配置
+
+用法: python -m benchmarks.loadtest [--rate 2 --duration 30 | --concurrency 8 --requests 100]
+      [--mix basic=1,intelligent=1,preview=2] [--topics 50 --zipf 1.1]
+      [--llm synthetic|stub] [--backend-latency lognormal:0.5,0.4] [--no-response-cache] [--no-admission]
+      [--output result.json]
+"""
+
+import argparse
+import asyncio
+import bisect
+import itertools
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import httpx
+
+from benchmarks.e2e_stub import TOPICS, layer_env, percentile, start_process, wait_ready
+
+
+ENDPOINTS = ("basic", "intelligent", "preview")
+
+
+class TopicSampler:
+    """按Zipf分布抽取主题，s=0时为均匀分布"""
+
+    def __init__(self, count: int, s: float, rng: random.Random):
+        self.topics = [
+            TOPICS[i] if i < len(TOPICS) else f"{TOPICS[i % len(TOPICS)]} {i // len(TOPICS)}"
+            for i in range(count)
+        ]
+        weights = [1.0 / (rank ** s) for rank in range(1, count + 1)]
+        self.cumulative = list(itertools.accumulate(weights))
+        self.rng = rng
+
+    def sample(self) -> str:
+        point = self.rng.random() * self.cumulative[-1]
+        return self.topics[bisect.bisect_left(self.cumulative, point)]
+
+
+class EndpointMix:
+    """按权重选择被压测的接口"""
+
+    def __init__(self, spec: str, rng: random.Random):
+        weights = {}
+        for part in spec.split(","):
+            name, _, weight = part.partition("=")
+            name = name.strip()
+            if name not in ENDPOINTS:
+                raise ValueError(f"未知接口: {name}，可选 {', '.join(ENDPOINTS)}")
+            weights[name] = float(weight or 1)
+        self.names = list(weights)
+        self.cumulative = list(itertools.accumulate(weights.values()))
+        self.rng = rng
+
+    def sample(self) -> str:
+        point = self.rng.random() * self.cumulative[-1]
+        return self.names[bisect.bisect_left(self.cumulative, point)]
+
+
+class LoadRecorder:
+    """记录每个请求的接口、延迟和结果"""
+
+    def __init__(self):
+        self.samples: List[Tuple[str, float, str]] = []
+        self.topics: Dict[str, int] = {}
+        self.cache: Dict[str, int] = {}
+        self.degraded: Dict[str, int] = {}
+        self.dropped = 0
+
+    def record(self, endpoint: str, latency: float, outcome: str) -> None:
+        self.samples.append((endpoint, latency, outcome))
+
+    def summary(self, duration: float) -> Dict[str, Any]:
+        report = {"overall": self._summarize(self.samples, duration)}
+        for endpoint in ENDPOINTS:
+            samples = [sample for sample in self.samples if sample[0] == endpoint]
+            if samples:
+                report[endpoint] = self._summarize(samples, duration)
+        report["overall"]["dropped"] = self.dropped
+        total = sum(self.topics.values())
+        if total:
+            top = max(self.topics.values())
+            report["topics"] = {"distinct": len(self.topics), "top_share": round(top / total, 3)}
+        if self.cache:
+            report["cache"] = dict(self.cache)
+        if self.degraded:
+            report["degraded"] = dict(self.degraded)
+        return report
+
+    @staticmethod
+    def _summarize(samples: List[Tuple[str, float, str]], duration: float) -> Dict[str, Any]:
+        latencies = [latency for _, latency, outcome in samples if outcome == "200"]
+        outcomes: Dict[str, int] = {}
+        for _, _, outcome in samples:
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        errors = len(samples) - len(latencies)
+        return {
+            "requests": len(samples),
+            "throughput_rps": round(len(latencies) / duration, 3) if duration else 0.0,
+            "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+            "outcomes": outcomes,
+            "latency": {
+                "mean": round(statistics.mean(latencies), 4) if latencies else 0.0,
+                "p50": round(percentile(latencies, 50), 4),
+                "p95": round(percentile(latencies, 95), 4),
+                "p99": round(percentile(latencies, 99), 4),
+                "max": round(max(latencies), 4) if latencies else 0.0,
+            },
+        }
+
+
+async def send_request(
+    client: httpx.AsyncClient,
+    base_url: str,
+    endpoint: str,
+    topic: str,
+    args: argparse.Namespace,
+    recorder: LoadRecorder
+) -> None:
+    body = {
+        "topic": topic, "model": args.model, "max_results": args.max_results,
+        "scoring_method": args.scoring_method,
+    }
+    recorder.topics[topic] = recorder.topics.get(topic, 0) + 1
+    start = time.perf_counter()
+    try:
+        if endpoint == "preview":
+            response = await client.get(
+                f"{base_url}/api/v1/search_preview/{quote(topic)}", params={"max_results": 5}
+            )
+        else:
+            path = "generate_awesome_list" if endpoint == "basic" else "generate_awesome_list_intelligent"
+            response = await client.post(f"{base_url}/api/v1/{path}", json=body)
+        outcome = str(response.status_code)
+        cache_status = response.headers.get("X-Cache")
+        if cache_status:
+            recorder.cache[cache_status] = recorder.cache.get(cache_status, 0) + 1
+        for degradation in filter(None, response.headers.get("X-Degraded", "").split(",")):
+            recorder.degraded[degradation] = recorder.degraded.get(degradation, 0) + 1
+    except httpx.HTTPError as e:
+        outcome = type(e).__name__
+    recorder.record(endpoint, time.perf_counter() - start, outcome)
+
+
+async def probe_loop_lag(client: httpx.AsyncClient, base_url: str, interval: float, stop: asyncio.Event) -> List[float]:
+    """
+    周期性请求/health，响应时间超出空载基线的部分近似为服务端事件循环延迟
+    """
+    samples = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            await client.get(f"{base_url}/health")
+            samples.append(time.perf_counter() - start)
+        except httpx.HTTPError:
+            pass
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+    return samples
+
+
+async def open_loop(client, base_url, args, recorder, topics, mix, rng) -> None:
+    """开环：按泊松过程发送请求，不等待前一个请求完成"""
+    in_flight: set = set()
+    deadline = time.monotonic() + args.duration
+    while time.monotonic() < deadline:
+        await asyncio.sleep(rng.expovariate(args.rate))
+        if len(in_flight) >= args.max_inflight:
+            recorder.dropped += 1
+            continue
+        task = asyncio.create_task(
+            send_request(client, base_url, mix.sample(), topics.sample(), args, recorder)
+        )
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+    if in_flight:
+        await asyncio.gather(*in_flight)
+
+
+async def closed_loop(client, base_url, args, recorder, topics, mix) -> None:
+    """闭环：固定数量的并发用户，每个用户收到响应后立即发送下一个请求"""
+    remaining = itertools.count()
+
+    async def user() -> None:
+        while next(remaining) < args.requests:
+            await send_request(client, base_url, mix.sample(), topics.sample(), args, recorder)
+
+    await asyncio.gather(*(user() for _ in range(args.concurrency)))
+
+
+def service_layers(args: argparse.Namespace) -> Dict[str, str]:
+    """被压测应用的结果缓存、生成历史复用、预热存储和准入控制配置"""
+    return layer_env(
+        tempfile.mkdtemp(prefix="loadtest_"),
+        response_cache=args.response_cache,
+        history=args.history,
+        warm=args.warm,
+        admission=args.admission,
+    )
+
+
+def spawn_services(args: argparse.Namespace, layers: Dict[str, str]) -> Tuple[str, List[Any]]:
+    """启动被压测的应用（以及大模型桩服务）"""
+    env = dict(os.environ)
+    env.update(layers)
+    env.update({
+        "SEARCH_BACKEND": "synthetic",
+        "METADATA_BACKEND": "synthetic",
+        "BACKEND_LATENCY": args.backend_latency,
+        "LOCAL_INDEX_ENABLED": "false",
+        "LOG_LEVEL": "WARNING",
+    })
+    processes = []
+    if args.llm == "stub":
+        stub_url = f"http://127.0.0.1:{args.stub_port}"
+        env.update({
+            "LLM_BACKEND": "openai",
+            "OPENAI_BASE_URL": f"{stub_url}/v1",
+            "DEEPSEEK_BASE_URL": f"{stub_url}/v1",
+            "OPENAI_API_KEY": env.get("OPENAI_API_KEY") or "stub",
+            "DEEPSEEK_API_KEY": env.get("DEEPSEEK_API_KEY") or "stub",
+        })
+        processes.append(start_process([
+            "benchmarks.llm_stub", "--port", str(args.stub_port), "--latency", args.stub_latency,
+            "--tokens-per-second", str(args.tokens_per_second), "--error-rate", str(args.error_rate),
+        ], env))
+    else:
+        env["LLM_BACKEND"] = "synthetic"
+    processes.append(start_process([
+        "uvicorn", "main:app", "--port", str(args.app_port), "--log-level", "warning",
+    ], env))
+    return f"http://127.0.0.1:{args.app_port}", processes
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    topics = TopicSampler(args.topics, args.zipf, rng)
+    mix = EndpointMix(args.mix, rng)
+    recorder = LoadRecorder()
+
+    processes: List[Any] = []
+    base_url = args.url
+    layers: Optional[Dict[str, str]] = None
+    if not base_url:
+        layers = service_layers(args)
+        base_url, processes = spawn_services(args, layers)
+
+    try:
+        limits = httpx.Limits(max_connections=args.max_inflight + 10)
+        async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+            await wait_ready(client, f"{base_url}/health")
+            baseline = await probe_loop_lag(client, base_url, 0.05, _event_after(0.5))
+
+            stop = asyncio.Event()
+            prober = asyncio.create_task(probe_loop_lag(client, base_url, args.probe_interval, stop))
+            start = time.perf_counter()
+            if args.rate:
+                await open_loop(client, base_url, args, recorder, topics, mix, rng)
+            else:
+                await closed_loop(client, base_url, args, recorder, topics, mix)
+            duration = time.perf_counter() - start
+            stop.set()
+            probes = await prober
+
+            try:
+                app_metrics = (await client.get(f"{base_url}/api/v1/metrics")).json()
+            except (httpx.HTTPError, ValueError):
+                app_metrics = None
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait(timeout=10)
+
+    idle = min(baseline) if baseline else 0.0
+    lags = [max(0.0, probe - idle) for probe in probes]
+    result = recorder.summary(duration)
+    result["duration"] = round(duration, 3)
+    result["event_loop_lag"] = {
+        "probes": len(lags),
+        "p50": round(percentile(lags, 50), 4),
+        "p99": round(percentile(lags, 99), 4),
+        "max": round(max(lags), 4) if lags else 0.0,
+    }
+    if app_metrics:
+        # 服务端事件循环监控的采样结果（未开启监控时为空）
+        server_lag = app_metrics.get("summaries", {}).get("event_loop_lag_seconds")
+        if server_lag:
+            result["event_loop_lag"]["server"] = server_lag
+            result["event_loop_lag"]["server_stalls"] = app_metrics["counters"].get("event_loop_stalls_total", 0)
+    result["app_metrics"] = app_metrics
+    result["config"] = {key: value for key, value in vars(args).items() if key != "output"}
+    # 压测已运行的服务时以该服务自身的配置为准，这里不记录
+    result["layers"] = (
+        {key: value for key, value in layers.items() if key.endswith("_ENABLED")} if layers else None
+    )
+    return result
+
+
+def _event_after(seconds: float) -> asyncio.Event:
+    """返回一个在指定秒数后被设置的事件"""
+    event = asyncio.Event()
+    asyncio.get_running_loop().call_later(seconds, event.set)
+    return event
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="并发压测工具")
+    load = parser.add_argument_group("负载")
+    load.add_argument("--rate", type=float, default=0.0, help="开环到达速率（请求/秒），为0时使用闭环并发")
+    load.add_argument("--duration", type=float, default=30.0, help="开环压测时长（秒）")
+    load.add_argument("--concurrency", type=int, default=4, help="闭环并发用户数")
+    load.add_argument("--requests", type=int, default=40, help="闭环请求总数")
+    load.add_argument("--max-inflight", type=int, default=200, help="开环最大在途请求数，超过时丢弃")
+    load.add_argument("--mix", default="basic=1,intelligent=1,preview=2", help="接口权重")
+    load.add_argument("--topics", type=int, default=50, help="主题池大小")
+    load.add_argument("--zipf", type=float, default=1.1, help="Zipf指数，0为均匀分布")
+    load.add_argument("--max-results", type=int, default=10)
+    load.add_argument("--scoring-method", choices=["rule_based", "llm_based"], default="rule_based")
+    load.add_argument("--model", default="gpt")
+    load.add_argument("--seed", type=int, default=0)
+    load.add_argument("--timeout", type=float, default=300.0)
+    load.add_argument("--probe-interval", type=float, default=0.25, help="事件循环延迟探测间隔（秒）")
+
+    target = parser.add_argument_group("被测服务")
+    target.add_argument("--url", help="压测已运行的服务，不再自动启动")
+    target.add_argument("--llm", choices=["synthetic", "stub"], default="synthetic")
+    target.add_argument("--backend-latency", default="lognormal:0.5,0.4", help="合成后端的延迟分布")
+    target.add_argument("--stub-latency", default="lognormal:0.6,0.4", help="桩服务首字延迟分布")
+    target.add_argument("--tokens-per-second", type=float, default=60.0)
+    target.add_argument("--error-rate", type=float, default=0.0)
+    target.add_argument("--response-cache", action=argparse.BooleanOptionalAction, default=True,
+                        help="开启生成结果缓存（仅对自动启动的应用生效）")
+    target.add_argument("--history", action=argparse.BooleanOptionalAction, default=False,
+                        help="开启生成历史复用（仅对自动启动的应用生效）")
+    target.add_argument("--warm", action=argparse.BooleanOptionalAction, default=False,
+                        help="开启预热存储（仅对自动启动的应用生效）")
+    target.add_argument("--admission", action=argparse.BooleanOptionalAction, default=True,
+                        help="开启准入控制，过载时降级或拒绝（仅对自动启动的应用生效）")
+    target.add_argument("--stub-port", type=int, default=8900)
+    target.add_argument("--app-port", type=int, default=8901)
+
+    parser.add_argument("--output", help="把结果写入JSON文件")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    result = asyncio.run(main_async(args))
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    summary = {
+        key: result[key] for key in ("overall", "cache", "degraded", "layers", "event_loop_lag", "duration")
+        if key in result
+    }
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+重排序评分、响应解析和去重热点路径的微基准测试
+在10到10k条合成结果上分别测量每个函数的吞吐（条/秒）、单次耗时和内存分配
+
+用法: python -m benchmarks.microbench [--sizes 10,100,1000,10000] [--only dedup,sort]
+      [--min-time 0.2] [--output result.json]
+"""
+
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.pipeline import configure_environment
+
+
+HOSTS = ["github.com", "arxiv.org", "huggingface.co", "paperswithcode.com", "medium.com", "docs.python.org"]
+QUERY = "vision transformer"
+
+
+def make_records(size: int) -> List[Any]:
+    """生成合成搜索结果，约20%的URL重复（大小写和末尾斜杠不同）"""
+    from app.models import ResultRecord
+
+    records = []
+    for i in range(size):
+        index = i if i % 5 else i // 2
+        host = HOSTS[index % len(HOSTS)]
+        url = f"https://{host}/owner{index}/Vision-Transformer-{index}" + ("/" if i % 2 else "")
+        records.append(ResultRecord.create(
+            title=f"Vision Transformer variant {index} - efficient attention",
+            url=url.upper() if i % 7 == 0 else url,
+            content=f"A PyTorch implementation of vision transformers for image classification, variant {index}. " * 3,
+            score=(i % 100) / 100,
+            source="website",
+            published_date="2024-01-01",
+        ))
+    return records
+
+
+def make_arxiv_feed(size: int) -> str:
+    """生成包含size个条目的arXiv Atom响应"""
+    entries = "".join(
+        f"<entry><id>http://arxiv.org/abs/2401.{i:05d}v1</id>"
+        f"<title>Vision Transformer Study {i}</title>"
+        "<published>2024-01-15T00:00:00Z</published><updated>2024-02-01T00:00:00Z</updated>"
+        f"<summary>We study vision transformers, part {i}.</summary>"
+        "<author><name>Alice</name></author><author><name>Bob</name></author>"
+        '<category term="cs.CV"/><category term="cs.LG"/>'
+        "<arxiv:comment>12 pages</arxiv:comment><arxiv:journal_ref>CVPR 2024</arxiv:journal_ref>"
+        "</entry>"
+        for i in range(size)
+    )
+    return (
+        '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:arxiv="http://arxiv.org/schemas/atom">'
+        f"{entries}</feed>"
+    )
+
+
+def make_github_payloads(size: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "full_name": f"owner{i}/vision-transformer-{i}",
+            "description": "Vision Transformer implementation",
+            "stargazers_count": i * 37 % 50000,
+            "forks_count": i * 7 % 8000,
+            "language": "Python",
+            "created_at": "2021-03-01T00:00:00Z",
+            "updated_at": "2024-06-01T00:00:00Z",
+            "topics": ["vision-transformer", "pytorch"],
+            "has_issues": True,
+            "has_wiki": bool(i % 2),
+            "has_pages": bool(i % 3),
+            "size": i * 101,
+        }
+        for i in range(size)
+    ]
+
+
+def make_scoring_json(size: int) -> str:
+    return json.dumps({"scores": [
+        {
+            "result_index": i + 1,
+            "relevance_score": 0.8, "authority_score": 0.7, "quality_score": 0.75, "utility_score": 0.6,
+            "reasoning": "相关的实现",
+        }
+        for i in range(size)
+    ]}, ensure_ascii=False)
+
+
+def build_cases() -> Dict[str, Callable[[int], Callable[[], Any]]]:
+    """
+    每个用例接收数据规模，返回被测的无参函数
+    单条处理的函数在函数内遍历全部结果，按请求处理的函数整体调用一次
+    """
+    from app.models import ScoringOutput
+    from app.services import RerankerService, SearchService
+
+    reranker = RerankerService()
+    search = SearchService()
+
+    def text_relevance(size: int) -> Callable[[], Any]:
+        texts = [f"{r.title} {r.content}" for r in make_records(size)]
+
+        def run():
+            for text in texts:
+                reranker._calculate_text_relevance(QUERY, text, 0.5)
+        return run
+
+    def arxiv_feed(size: int) -> Callable[[], Any]:
+        feed = make_arxiv_feed(size)
+        return lambda: reranker._parse_arxiv_response(feed)
+
+    def github(size: int) -> Callable[[], Any]:
+        payloads = make_github_payloads(size)
+
+        def run():
+            for payload in payloads:
+                reranker._parse_github_response(payload)
+        return run
+
+    def llm_scoring(size: int) -> Callable[[], Any]:
+        records = make_records(size)
+        raw = make_scoring_json(size)
+        return lambda: reranker._build_llm_scores(ScoringOutput.model_validate_json(raw), records)
+
+    def dedup(size: int) -> Callable[[], Any]:
+        records = make_records(size)
+        return lambda: search._deduplicate_results(records)
+
+    def sort_relevance(size: int) -> Callable[[], Any]:
+        records = make_records(size)
+
+        def run():
+            # 清空结果上缓存的相关性评分，测量首次排序的开销
+            for record in records:
+                record.features.clear()
+            return search._sort_results_by_relevance(records, QUERY)
+        return run
+
+    def source_type(size: int) -> Callable[[], Any]:
+        urls = [r.url for r in make_records(size)]
+
+        def run():
+            for url in urls:
+                search._determine_source_type(url)
+        return run
+
+    return {
+        "text_relevance": text_relevance,
+        "arxiv_feed": arxiv_feed,
+        "github": github,
+        "llm_scoring": llm_scoring,
+        "dedup": dedup,
+        "sort_relevance": sort_relevance,
+        "source_type": source_type,
+    }
+
+
+def measure(run: Callable[[], Any], min_time: float) -> Tuple[float, int]:
+    """
+    测量单次调用耗时：重复调用直到总时间超过min_time，取多轮中的最小值
+
+    Returns:
+        Tuple[float, int]: (单次耗时秒数, 每轮调用次数)
+    """
+    run()  # 预热
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / 5 or loops >= 1 << 20:
+            break
+        loops *= 2
+
+    best = elapsed / loops
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(4):
+            start = time.perf_counter()
+            for _ in range(loops):
+                run()
+            best = min(best, (time.perf_counter() - start) / loops)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return best, loops
+
+
+def measure_allocations(run: Callable[[], Any]) -> Dict[str, float]:
+    """用tracemalloc统计单次调用的内存分配：峰值，以及调用结束时仍存活的新增内存块数（含返回值）"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    start_current, _ = tracemalloc.get_traced_memory()
+    result = run()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    del result
+
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+    return {"peak_kb": round((peak - start_current) / 1024, 2), "retained_blocks": blocks}
+
+
+def parse_list(value: str, cast=str) -> List[Any]:
+    return [cast(item.strip()) for item in value.split(",") if item.strip()]
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="热点路径微基准测试")
+    parser.add_argument("--sizes", type=lambda v: parse_list(v, int), default=[10, 100, 1000, 10000])
+    parser.add_argument("--only", type=parse_list, default=None, help="只运行指定用例，逗号分隔")
+    parser.add_argument("--min-time", type=float, default=0.2, help="每个测量轮次的最短时间（秒）")
+    parser.add_argument("--output", help="把结果写入JSON文件")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    configure_environment("none")
+
+    cases = build_cases()
+    selected = args.only or list(cases)
+    results: Dict[str, Dict[str, Any]] = {}
+
+    print(f"{'case':<16}{'size':>7}{'items/sec':>14}{'per call':>12}{'peak KB':>10}{'blocks':>9}")
+    for name in selected:
+        results[name] = {}
+        for size in args.sizes:
+            run = cases[name](size)
+            per_call, loops = measure(run, args.min_time)
+            allocations = measure_allocations(run)
+            entry = {
+                "items_per_sec": round(size / per_call, 1),
+                "calls_per_sec": round(1 / per_call, 1),
+                "per_call_us": round(per_call * 1e6, 2),
+                "loops": loops,
+                **allocations,
+            }
+            results[name][str(size)] = entry
+            print(
+                f"{name:<16}{size:>7}{entry['items_per_sec']:>14,.0f}{entry['per_call_us']:>10.1f}us"
+                f"{entry['peak_kb']:>10.1f}{entry['retained_blocks']:>9}"
+            )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
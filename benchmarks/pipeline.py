@@ -0,0 +1,287 @@
+"""
+生成流水线端到端基准测试
+在进程内用合成的搜索、大模型和arXiv/GitHub后端运行 generate_awesome_list 和
+generate_awesome_list_intelligent，按 max_results × scoring_method × 并发数 的矩阵统计
+总耗时、各阶段耗时、外部调用次数、token数量和内存峰值，结果写入JSON，可与基线对比发现性能回退
+
+用法: python -m benchmarks.pipeline [--max-results 10,20] [--scoring rule_based,llm_based]
+      [--concurrency 1,4] [--latency fixed:0.2] [--output result.json]
+      [--baseline baseline.json --tolerance 0.2]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+
+PIPELINES = ("basic", "intelligent")
+
+TOPICS = [
+    "vision transformer", "graph neural networks", "diffusion models", "reinforcement learning",
+    "大语言模型", "speech recognition", "federated learning", "neural radiance fields",
+]
+
+# 参与回退判断的指标：(路径, 绝对容差)，耗时类指标允许一定的绝对抖动
+REGRESSION_METRICS = [
+    (("wall_time",), 0.05),
+    (("latency", "p95"), 0.05),
+    (("peak_memory_mb",), 1.0),
+    (("external_calls_total",), 0.0),
+    (("tokens_total",), 0.0),
+]
+
+
+def configure_environment(latency: str) -> None:
+    """
+    在导入应用前把所有外部服务切换为离线合成后端，
+    并关闭生成历史复用、预热存储和结果缓存，确保每次生成都完整执行流水线
+    （否则同一次运行中重复的主题以及第二次运行的所有请求都直接复用之前的结果）
+    """
+    os.environ.update({
+        "SEARCH_BACKEND": "synthetic",
+        "LLM_BACKEND": "synthetic",
+        "METADATA_BACKEND": "synthetic",
+        "BACKEND_LATENCY": latency,
+        "LOCAL_INDEX_ENABLED": "false",
+        "HISTORY_ENABLED": "false",
+        "WARM_ENABLED": "false",
+        "WARM_SCHEDULER_ENABLED": "false",
+        "RESPONSE_CACHE_ENABLED": "false",
+        "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+    })
+
+
+def percentile(values: List[float], q: float) -> float:
+    """计算分位数（最近秩法）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def _parse_metric_key(key: str) -> Tuple[str, Dict[str, str]]:
+    """解析 name{a="x",b="y"} 格式的指标键"""
+    name, _, label_text = key.partition("{")
+    labels = {}
+    for part in label_text.rstrip("}").split(","):
+        if "=" in part:
+            label, value = part.split("=", 1)
+            labels[label] = value.strip('"')
+    return name, labels
+
+
+def summarize_metrics(snapshot: Dict[str, Dict[str, Any]], pipeline: str) -> Dict[str, Any]:
+    """从指标快照中提取阶段耗时、外部调用次数和token数量"""
+    stages: Dict[str, Dict[str, float]] = {}
+    for key, summary in snapshot["summaries"].items():
+        name, labels = _parse_metric_key(key)
+        if name == "pipeline_stage_seconds" and labels.get("pipeline") == pipeline:
+            stages[labels["stage"]] = {
+                "avg": summary["avg"], "p95": summary["p95"], "max": summary["max"],
+            }
+
+    calls: Dict[str, float] = {}
+    errors: Dict[str, float] = {}
+    tokens: Dict[str, float] = {}
+    for key, value in snapshot["counters"].items():
+        name, labels = _parse_metric_key(key)
+        if name == "external_call_attempts_total":
+            target = calls if labels.get("outcome") == "success" else errors
+            target[labels["provider"]] = target.get(labels["provider"], 0) + value
+        elif name == "llm_tokens_total":
+            label = f'{labels["provider"]}_{labels["kind"]}'
+            tokens[label] = tokens.get(label, 0) + value
+
+    return {
+        "stages": stages,
+        "external_calls": calls,
+        "external_calls_total": sum(calls.values()),
+        "external_call_errors": errors,
+        "tokens": tokens,
+        "tokens_total": sum(tokens.values()),
+    }
+
+
+async def run_case(
+    pipeline: str,
+    max_results: int,
+    scoring_method: str,
+    concurrency: int,
+    requests: int
+) -> Dict[str, Any]:
+    """运行一个矩阵组合：以固定并发执行requests次生成"""
+    from app.models import GenerateAwesomeListRequest
+    from app.services import AwesomeListService
+    from app.utils import get_metrics, get_settings, request_deadline
+
+    settings = get_settings()
+    metrics = get_metrics()
+    metrics.reset()
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(TOPICS[i % len(TOPICS)])
+
+    latencies: List[float] = []
+    failures: List[str] = []
+
+    async def worker() -> None:
+        while not queue.empty():
+            topic = queue.get_nowait()
+            request = GenerateAwesomeListRequest(
+                topic=topic, max_results=max_results, scoring_method=scoring_method
+            )
+            service = AwesomeListService()
+            generate = (
+                service.generate_awesome_list if pipeline == "basic"
+                else service.generate_awesome_list_intelligent
+            )
+            start = time.perf_counter()
+            try:
+                with request_deadline(settings.pipeline_deadline):
+                    await generate(request)
+            except Exception as e:
+                failures.append(f"{topic}: {e}")
+            latencies.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall_time = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        "wall_time": round(wall_time, 4),
+        "latency": {
+            "mean": round(statistics.mean(latencies), 4) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50), 4),
+            "p95": round(percentile(latencies, 95), 4),
+        },
+        "peak_memory_mb": round(peak / 1024 / 1024, 3),
+        "failures": failures,
+    }
+    result.update(summarize_metrics(metrics.snapshot(), pipeline))
+    return result
+
+
+async def run_matrix(args: argparse.Namespace) -> Dict[str, Any]:
+    cases: Dict[str, Any] = {}
+    matrix = itertools.product(args.pipelines, args.max_results, args.scoring, args.concurrency)
+    for pipeline, max_results, scoring_method, concurrency in matrix:
+        case_id = f"{pipeline}/max{max_results}/{scoring_method}/c{concurrency}"
+        requests = args.requests or concurrency * 2
+        result = await run_case(pipeline, max_results, scoring_method, concurrency, requests)
+        result["config"] = {
+            "pipeline": pipeline, "max_results": max_results, "scoring_method": scoring_method,
+            "concurrency": concurrency, "requests": requests,
+        }
+        cases[case_id] = result
+        print(
+            f"{case_id:<40} wall={result['wall_time']:.3f}s p95={result['latency']['p95']:.3f}s "
+            f"calls={result['external_calls_total']:.0f} tokens={result['tokens_total']:.0f} "
+            f"peak={result['peak_memory_mb']:.1f}MB failures={len(result['failures'])}",
+            file=sys.stderr
+        )
+    return cases
+
+
+def _lookup(data: Dict[str, Any], path: Tuple[str, ...]) -> Optional[float]:
+    for key in path:
+        if not isinstance(data, dict) or key not in data:
+            return None
+        data = data[key]
+    return data
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    与基线对比，返回回退列表
+    指标超过 基线 × (1 + tolerance) + 绝对容差 视为回退，基线中不存在的组合跳过
+    """
+    regressions = []
+    for case_id, result in current["cases"].items():
+        base = baseline.get("cases", {}).get(case_id)
+        if base is None:
+            continue
+        if result["failures"] and not base.get("failures"):
+            regressions.append(f"{case_id}: {len(result['failures'])} 个请求失败")
+        for path, slack in REGRESSION_METRICS:
+            value, base_value = _lookup(result, path), _lookup(base, path)
+            if value is None or base_value is None:
+                continue
+            limit = base_value * (1 + tolerance) + slack
+            if value > limit:
+                regressions.append(
+                    f"{case_id}: {'.'.join(path)} {base_value} -> {value} (上限 {limit:.4f})"
+                )
+    return regressions
+
+
+def parse_list(value: str, cast=str) -> List[Any]:
+    return [cast(item.strip()) for item in value.split(",") if item.strip()]
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="生成流水线端到端基准测试")
+    parser.add_argument("--pipelines", type=parse_list, default=list(PIPELINES), help="basic,intelligent")
+    parser.add_argument("--max-results", type=lambda v: parse_list(v, int), default=[10, 20])
+    parser.add_argument("--scoring", type=parse_list, default=["rule_based", "llm_based"])
+    parser.add_argument("--concurrency", type=lambda v: parse_list(v, int), default=[1, 4])
+    parser.add_argument("--requests", type=int, default=0, help="每个组合的请求数，默认为并发数的2倍")
+    parser.add_argument("--latency", default="fixed:0.2", help="合成后端的延迟分布")
+    parser.add_argument("--output", help="把结果写入JSON文件")
+    parser.add_argument("--baseline", help="基线结果JSON文件，存在回退时以非零状态码退出")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="相对基线允许的增幅")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    configure_environment(args.latency)
+
+    result = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "latency": args.latency,
+        },
+        "cases": asyncio.run(run_matrix(args)),
+    }
+
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        directory = os.path.dirname(args.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        if regressions:
+            print("❌ 发现性能回退:", file=sys.stderr)
+            for line in regressions:
+                print(f"  - {line}", file=sys.stderr)
+            return 1
+        print("✅ 未发现性能回退", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+内部结果记录基准测试
+对比pydantic SearchResult和轻量ResultRecord在1k结果批次上的耗时和内存分配
+
+用法: python -m benchmarks.result_records [--size 1000] [--repeat 20]
+"""
+
+import argparse
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from app.models import ResultRecord, SearchResult
+
+
+def make_items(size: int) -> List[Dict[str, Any]]:
+    """生成模拟Tavily返回的结果项"""
+    hosts = ["github.com", "arxiv.org", "huggingface.co"]
+    return [
+        {
+            "title": f"Result {i} - Vision Transformer Implementation",
+            "url": f"https://{hosts[i % 3]}/owner{i}/Project-{i}/",
+            "content": f"A PyTorch implementation of vision transformers, variant {i}. " * 4,
+            "score": (i % 100) / 100,
+            "published_date": "2024-01-01",
+        }
+        for i in range(size)
+    ]
+
+
+def pydantic_pipeline(items: List[Dict[str, Any]]) -> List[SearchResult]:
+    """原流程：每个结果创建模型，标记来源时修改，重排序时重建"""
+    results = [
+        SearchResult(
+            title=item["title"], url=item["url"], content=item["content"],
+            score=item["score"], source="github", published_date=item["published_date"]
+        )
+        for item in items
+    ]
+    for result in results:
+        result.source = f"{result.source}_github_repos"
+    return [
+        SearchResult(
+            title=r.title, url=r.url, content=r.content,
+            score=min(1.0, r.score + 0.01), source=r.source, published_date=r.published_date
+        )
+        for r in results
+    ]
+
+
+def record_pipeline(items: List[Dict[str, Any]]) -> List[ResultRecord]:
+    """新流程：创建记录时规范化一次URL，重排序只替换评分"""
+    records = [
+        ResultRecord.create(
+            title=item["title"], url=item["url"], content=item["content"],
+            score=item["score"], source="github", published_date=item["published_date"]
+        )
+        for item in items
+    ]
+    for record in records:
+        record.source = f"{record.source}_github_repos"
+    return [record.with_score(record.score + 0.01) for record in records]
+
+
+def measure(name: str, func: Callable[[List[Dict[str, Any]]], Any], items: List[Dict[str, Any]], repeat: int) -> Dict[str, float]:
+    """测量平均耗时和单次运行的峰值内存"""
+    func(items)  # 预热
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(items)
+    elapsed = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    kept = func(items)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+
+    return {"name": name, "ms": elapsed * 1000, "peak_kib": peak / 1024}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="对比SearchResult和ResultRecord")
+    parser.add_argument("--size", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    items = make_items(args.size)
+    rows = [
+        measure("pydantic SearchResult", pydantic_pipeline, items, args.repeat),
+        measure("ResultRecord", record_pipeline, items, args.repeat),
+    ]
+
+    print(f"批次大小: {args.size}，重复: {args.repeat}")
+    for row in rows:
+        print(f"{row['name']:<24} {row['ms']:>9.2f} ms  峰值内存 {row['peak_kib']:>9.1f} KiB")
+    print(f"加速: {rows[0]['ms'] / rows[1]['ms']:.1f}x，内存: {rows[0]['peak_kib'] / rows[1]['peak_kib']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
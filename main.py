@@ -3,13 +3,15 @@ Awesome List Agent - FastAPI 主应用程序
 智能生成Awesome List的Web API服务
 """
 
+import asyncio
 import time
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Optional
+from typing import Awaitable, Optional, TypeVar
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, JSONResponse
 from pydantic import ValidationError
 
 from app.models import (
@@ -18,19 +20,58 @@ from app.models import (
     HealthCheckResponse,
     ErrorResponse
 )
-from app.utils import get_settings, get_logger, AwesomeAgentException
+from app.utils import (
+    get_settings,
+    get_logger,
+    get_metrics,
+    get_loop_monitor,
+    get_request_profiler,
+    request_deadline,
+    scheduling_lane,
+    get_call_scheduler,
+    AwesomeAgentException,
+    ClientDisconnectedException,
+    OverloadedException
+)
 
 # 获取配置和日志
 settings = get_settings()
 logger = get_logger(__name__)
 
+T = TypeVar("T")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    应用生命周期
+    启动时开启事件循环监控和缓存预热调度器，关闭时停止（并取消外部调用调度器的定时器）
+    """
+    # 提前导入业务服务，避免首个请求在事件循环中同步导入openai等依赖（约0.5秒）
+    from app import services
+
+    if settings.local_index_enabled:
+        # 在线程中预先回放本地索引文件，首个请求创建SearchService时不再同步加载
+        await asyncio.to_thread(services.get_local_index)
+    if settings.loop_monitor_enabled:
+        get_loop_monitor().start()
+    if settings.warm_scheduler_enabled:
+        services.get_cache_warmer().start()
+    yield
+    if settings.warm_scheduler_enabled:
+        await services.get_cache_warmer().stop()
+    get_call_scheduler().close()
+    await get_loop_monitor().stop()
+
+
 # 创建FastAPI应用实例
 app = FastAPI(
     title="Awesome List Agent",
     description="智能生成Awesome List的API服务",
     version="0.1.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # 配置CORS
@@ -70,6 +111,29 @@ async def log_requests(request: Request, call_next):
     return response
 
 
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    """
+    按请求性能分析中间件
+    携带管理员令牌的请求在分析器下执行，响应头 X-Profile-Url 给出分析结果地址；
+    未配置 PROFILING_TOKEN 时直接放行
+    """
+    profiler = get_request_profiler()
+    if not profiler.enabled or not profiler.is_authorized(request.headers, request.query_params):
+        return await call_next(request)
+
+    response, profile_id = await profiler.run(
+        lambda: call_next(request),
+        {"method": request.method, "path": request.url.path}
+    )
+    if profile_id is None:
+        response.headers["X-Profile-Status"] = "busy"
+    else:
+        response.headers["X-Profile-Id"] = profile_id
+        response.headers["X-Profile-Url"] = f"/api/v1/profiles/{profile_id}"
+    return response
+
+
 @app.exception_handler(AwesomeAgentException)
 async def awesome_agent_exception_handler(request: Request, exc: AwesomeAgentException):
     """
@@ -156,8 +220,196 @@ async def health_check():
     )
 
 
+@app.get("/api/v1/metrics")
+async def get_runtime_metrics():
+    """
+    获取运行指标（调试用）
+    包括外部调用的尝试次数、重试次数和耗时统计
+    """
+    return {
+        **get_metrics().snapshot(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/api/v1/diagnostics/event_loop")
+async def event_loop_diagnostics():
+    """
+    获取事件循环健康状态（调试用）
+    包括延迟分位数、卡顿次数，以及调试模式下最近阻塞事件的调用栈
+    """
+    return {
+        **get_loop_monitor().snapshot(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/api/v1/diagnostics/admission")
+async def admission_diagnostics():
+    """
+    获取准入控制状态：执行中和排队中的生成任务数、阈值和当前负载下的降级措施
+    """
+    from app.services import get_admission_controller
+    
+    return {
+        **get_admission_controller().snapshot(),
+        "enabled": settings.admission_enabled,
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/api/v1/diagnostics/scheduler")
+async def scheduler_diagnostics():
+    """
+    获取外部调用调度状态：各服务的剩余配额和各通道（interactive / background / warmup）的排队调用数
+    """
+    return {
+        **get_call_scheduler().snapshot(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/api/v1/diagnostics/warmup")
+async def warmup_diagnostics(limit: int = 20):
+    """
+    获取缓存预热状态：随应用运行的调度器状态和当前的预热计划（前limit个）
+    """
+    from app.services import get_cache_warmer
+    
+    warmer = get_cache_warmer()
+    plan = await asyncio.to_thread(warmer.plan)
+    return {
+        "scheduler": warmer.snapshot() if settings.warm_scheduler_enabled else None,
+        "planned": len(plan),
+        "plan": [job.to_dict() for job in plan[:limit]],
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/api/v1/profiles/{profile_id}")
+async def get_profile(profile_id: str, request: Request):
+    """
+    获取性能分析结果的请求信息和文件列表（需管理员令牌）
+    """
+    profiler = get_request_profiler()
+    if not profiler.is_authorized(request.headers, request.query_params):
+        raise HTTPException(status_code=403, detail="需要性能分析令牌")
+
+    profile = await asyncio.to_thread(profiler.describe, profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="分析结果不存在")
+    profile["links"] = {name: f"/api/v1/profiles/{profile_id}/{name}" for name in profile["artifacts"]}
+    return profile
+
+
+@app.get("/api/v1/profiles/{profile_id}/{artifact}")
+async def get_profile_artifact(profile_id: str, artifact: str, request: Request):
+    """
+    下载性能分析文件（profile.pstats / profile.txt / profile.html，需管理员令牌）
+    """
+    profiler = get_request_profiler()
+    if not profiler.is_authorized(request.headers, request.query_params):
+        raise HTTPException(status_code=403, detail="需要性能分析令牌")
+
+    path = profiler.artifact_path(profile_id, artifact)
+    if path is None:
+        raise HTTPException(status_code=404, detail="分析文件不存在")
+    return FileResponse(path, filename=f"{profile_id}-{artifact}")
+
+
+async def _wait_for_disconnect(http_request: Request) -> None:
+    """等待客户端断开连接（请求体已读取完毕，之后只会收到 http.disconnect 消息）"""
+    while (await http_request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _cancel_on_disconnect(http_request: Request, awaitable: Awaitable[T]) -> T:
+    """
+    执行生成任务，客户端提前断开连接时取消任务（连同其中的搜索、元数据获取和大模型调用）
+    
+    Raises:
+        ClientDisconnectedException: 客户端已断开连接
+    """
+    task = asyncio.ensure_future(awaitable)
+    watcher = asyncio.create_task(_wait_for_disconnect(http_request))
+    try:
+        done, _ = await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    finally:
+        watcher.cancel()
+    
+    if task in done:
+        return task.result()
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    get_metrics().increment("client_disconnects_total", path=http_request.url.path)
+    raise ClientDisconnectedException("客户端已断开连接，生成已取消")
+
+
+async def _generate_with_cache(
+    request: GenerateAwesomeListRequest,
+    pipeline: str,
+    http_request: Request,
+    http_response: Response
+) -> GenerateAwesomeListResponse:
+    """
+    经生成结果缓存和准入控制执行生成流水线，客户端断开连接时取消
+    响应头 X-Cache 为缓存状态 (HIT / STALE / MISS / BYPASS)，Age 为响应生成至今的秒数，
+    X-Degraded 为过载时应用的降级措施
+    """
+    from app.services import (
+        AwesomeListService, get_admission_controller, get_response_cache, get_warm_store, request_key
+    )
+    
+    if settings.warm_enabled:
+        # 请求日志用于统计缓存预热的热门主题
+        try:
+            await get_warm_store().log_request_async(request, pipeline)
+        except Exception as e:
+            logger.warning(f"记录请求日志失败: {e}")
+    
+    async def generate(refresh: bool) -> GenerateAwesomeListResponse:
+        # 后台刷新时跳过生成历史复用，确保得到新结果
+        if refresh and not request.force_refresh:
+            generate_request = request.model_copy(update={"force_refresh": True})
+        else:
+            generate_request = request
+        service = AwesomeListService()
+        if not settings.admission_enabled:
+            with request_deadline(settings.pipeline_deadline):
+                return await service.generate(generate_request, pipeline)
+        
+        # 准入控制：过载时降级或拒绝（OverloadedException）
+        async with get_admission_controller().admit() as degradations:
+            with request_deadline(settings.pipeline_deadline):
+                response = await service.generate(generate_request, pipeline)
+        if degradations and not response.reused:
+            response.degradations = list(degradations) + response.degradations
+        return response
+    
+    # 生成任务（包括共享的生成任务）在请求的调度通道中发起外部调用
+    with scheduling_lane(request.lane):
+        if not settings.response_cache_enabled:
+            response = await _cancel_on_disconnect(http_request, generate(False))
+        else:
+            response, status, age = await _cancel_on_disconnect(http_request, get_response_cache().get_or_generate(
+                request_key(request, pipeline), generate, bypass=request.force_refresh
+            ))
+            http_response.headers["X-Cache"] = status
+            http_response.headers["Age"] = str(int(age))
+    if response.degradations:
+        http_response.headers["X-Degraded"] = ",".join(response.degradations)
+    return response
+
+
 @app.post("/api/v1/generate_awesome_list", response_model=GenerateAwesomeListResponse)
-async def generate_awesome_list(request: GenerateAwesomeListRequest):
+async def generate_awesome_list(
+    request: GenerateAwesomeListRequest,
+    http_request: Request,
+    http_response: Response
+):
     """
     生成Awesome List
     
@@ -167,17 +419,21 @@ async def generate_awesome_list(request: GenerateAwesomeListRequest):
     logger.info(f"开始生成Awesome List，主题: {request.topic}")
     
     try:
-        # 使用真实的业务服务
-        from app.services import AwesomeListService
-        
-        service = AwesomeListService()
-        response = await service.generate_awesome_list(request)
+        response = await _generate_with_cache(request, "basic", http_request, http_response)
         
         processing_time = time.time() - start_time
         logger.info(f"Awesome List生成完成，总耗时: {processing_time:.3f}s")
         
         return response
         
+    except OverloadedException as e:
+        raise HTTPException(
+            status_code=503, detail=e.message, headers={"Retry-After": str(e.retry_after)}
+        )
+    except ClientDisconnectedException:
+        # 客户端已离开，响应不会被接收（499: Client Closed Request）
+        logger.info(f"客户端已断开连接，取消生成，主题: {request.topic}")
+        return Response(status_code=499)
     except Exception as e:
         logger.error(f"生成Awesome List时发生错误: {e}", exc_info=True)
         
@@ -191,7 +447,11 @@ async def generate_awesome_list(request: GenerateAwesomeListRequest):
 
 
 @app.post("/api/v1/generate_awesome_list_intelligent", response_model=GenerateAwesomeListResponse)
-async def generate_awesome_list_intelligent(request: GenerateAwesomeListRequest):
+async def generate_awesome_list_intelligent(
+    request: GenerateAwesomeListRequest,
+    http_request: Request,
+    http_response: Response
+):
     """
     智能生成Awesome List（使用Function Calling）
     
@@ -201,17 +461,21 @@ async def generate_awesome_list_intelligent(request: GenerateAwesomeListRequest)
     logger.info(f"开始智能生成Awesome List，主题: {request.topic}")
     
     try:
-        # 使用智能生成服务
-        from app.services import AwesomeListService
-        
-        service = AwesomeListService()
-        response = await service.generate_awesome_list_intelligent(request)
+        response = await _generate_with_cache(request, "intelligent", http_request, http_response)
         
         processing_time = time.time() - start_time
         logger.info(f"智能Awesome List生成完成，总耗时: {processing_time:.3f}s")
         
         return response
         
+    except OverloadedException as e:
+        raise HTTPException(
+            status_code=503, detail=e.message, headers={"Retry-After": str(e.retry_after)}
+        )
+    except ClientDisconnectedException:
+        # 客户端已离开，响应不会被接收（499: Client Closed Request）
+        logger.info(f"客户端已断开连接，取消生成，主题: {request.topic}")
+        return Response(status_code=499)
     except Exception as e:
         logger.error(f"智能生成Awesome List时发生错误: {e}", exc_info=True)
         
@@ -258,6 +522,48 @@ async def search_preview(topic: str, max_results: int = 5):
         raise HTTPException(status_code=500, detail=f"搜索预览失败: {str(e)}")
 
 
+@app.get("/api/v1/history")
+async def list_history(limit: int = 20, offset: int = 0, topic: Optional[str] = None):
+    """
+    按时间倒序列出服务端生成历史（不含Markdown正文）
+    
+    Args:
+        limit: 返回条数（最多100）
+        offset: 偏移量
+        topic: 只返回该主题（规范化后精确匹配）的历史
+    """
+    from app.services import get_history_store
+    
+    entries = await asyncio.to_thread(
+        get_history_store().list_recent, min(max(limit, 1), 100), max(offset, 0), topic
+    )
+    return {"entries": entries, "count": len(entries)}
+
+
+@app.get("/api/v1/history/search")
+async def search_history(q: str, limit: int = 20):
+    """
+    全文检索生成历史的主题、关键词和正文
+    """
+    from app.services import get_history_store
+    
+    entries = await asyncio.to_thread(get_history_store().search, q, min(max(limit, 1), 100))
+    return {"query": q, "entries": entries, "count": len(entries)}
+
+
+@app.get("/api/v1/history/{entry_id}")
+async def get_history_entry(entry_id: int):
+    """
+    获取一条完整的生成历史（含Markdown正文、结果URL和各阶段耗时）
+    """
+    from app.services import get_history_store
+    
+    entry = await asyncio.to_thread(get_history_store().get, entry_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="历史记录不存在")
+    return entry
+
+
 @app.get("/api/v1/test_llm")
 async def test_llm_connection(model: str = None):
     """
@@ -278,6 +584,22 @@ async def test_llm_connection(model: str = None):
         raise HTTPException(status_code=500, detail=f"LLM连接测试失败: {str(e)}")
 
 
+@app.get("/api/v1/llm_router_status")
+async def llm_router_status():
+    """
+    获取LLM路由器状态（调试用）
+    返回各提供商的滚动延迟、错误率和限流状态
+    """
+    from app.services.llm_router import get_llm_router
+    
+    router = get_llm_router()
+    return {
+        "providers": router.snapshot(),
+        "auxiliary_route": router.route("auto"),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
 @app.get("/api/v1/test_reranker/{topic}")
 async def test_reranker(
     topic: str, 
@@ -470,6 +792,12 @@ async def get_academic_info():
     }
 
 
+def _write_text(filepath: str, content: str) -> None:
+    """写入文本文件（同步，在线程池中执行以免阻塞事件循环）"""
+    with open(filepath, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+
 @app.post("/api/v1/save_markdown")
 async def save_markdown(request: dict):
     """
@@ -491,8 +819,7 @@ async def save_markdown(request: dict):
         # 保存到当前目录
         filepath = f"./{filename}"
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
+        await asyncio.to_thread(_write_text, filepath, content)
         
         return {
             "success": True,
@@ -507,13 +834,18 @@ async def save_markdown(request: dict):
 
 
 @app.post("/api/v1/generate_and_save")
-async def generate_and_save(request: GenerateAwesomeListRequest):
+async def generate_and_save(
+    request: GenerateAwesomeListRequest,
+    http_request: Request,
+    http_response: Response
+):
     """
     生成Awesome List并自动保存为本地文件
+    与智能生成接口一样经过结果缓存、准入控制和请求截止时间，客户端断开连接时取消生成
     """
     try:
         # 生成Awesome List
-        result = await awesome_list_service.generate_awesome_list_intelligent(request)
+        result = await _generate_with_cache(request, "intelligent", http_request, http_response)
         
         # 保存到本地文件
         import re
@@ -522,8 +854,7 @@ async def generate_and_save(request: GenerateAwesomeListRequest):
         filename = f"awesome-{safe_filename.lower()}.md"
         filepath = f"./{filename}"
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(result.awesome_list)
+        await asyncio.to_thread(_write_text, filepath, result.awesome_list)
         
         return {
             **result.dict(),
@@ -532,6 +863,13 @@ async def generate_and_save(request: GenerateAwesomeListRequest):
             "filepath": filepath
         }
         
+    except OverloadedException as e:
+        raise HTTPException(
+            status_code=503, detail=e.message, headers={"Retry-After": str(e.retry_after)}
+        )
+    except ClientDisconnectedException:
+        logger.info(f"客户端已断开连接，取消生成，主题: {request.topic}")
+        return Response(status_code=499)
     except Exception as e:
         logger.error(f"生成并保存失败: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"生成并保存失败: {str(e)}")
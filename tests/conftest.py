@@ -0,0 +1,115 @@
+"""
+测试夹具
+在后台线程中启动OpenAI兼容桩服务，并创建指向桩服务的LLMService
+"""
+
+import socket
+import threading
+import time
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import pytest
+import uvicorn
+from fastapi import FastAPI
+
+from app.backends import get_llm_clients
+from app.services import (
+    get_admission_controller,
+    get_history_store,
+    get_local_index,
+    get_response_cache,
+    get_topic_canonicalizer,
+    get_warm_store,
+)
+from app.services.llm_router import get_llm_router
+from app.services.llm_service import LLMService
+from app.utils import get_settings
+from app.utils.scheduler import get_call_scheduler
+from benchmarks.llm_stub import StubConfig, create_stub_app
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _clear_caches() -> None:
+    for cached in (
+        get_settings, get_llm_clients, get_llm_router, get_call_scheduler, get_admission_controller,
+        get_history_store, get_local_index, get_response_cache, get_topic_canonicalizer, get_warm_store,
+    ):
+        cached.cache_clear()
+
+
+@pytest.fixture
+def stub_server() -> Iterator[Callable[[StubConfig], Tuple[str, FastAPI]]]:
+    """启动桩服务的工厂，返回 (base_url, 桩服务应用)，测试结束时关闭"""
+    servers: List[Tuple[uvicorn.Server, threading.Thread]] = []
+
+    def start(config: StubConfig) -> Tuple[str, FastAPI]:
+        app = create_stub_app(config)
+        port = _free_port()
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        servers.append((server, thread))
+        deadline = time.monotonic() + 10
+        while not server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("桩服务启动超时")
+            time.sleep(0.01)
+        return f"http://127.0.0.1:{port}/v1", app
+
+    yield start
+
+    for server, thread in servers:
+        server.should_exit = True
+    for server, thread in servers:
+        thread.join(timeout=10)
+
+
+@pytest.fixture
+def offline_backends(monkeypatch, tmp_path) -> Iterator[None]:
+    """搜索、大模型和元数据全部使用合成后端，无需API密钥"""
+    for name in ("SEARCH_BACKEND", "LLM_BACKEND", "METADATA_BACKEND"):
+        monkeypatch.setenv(name, "synthetic")
+    monkeypatch.setenv("BACKEND_LATENCY", "fixed:0.001")
+    monkeypatch.setenv("WARM_STORE_PATH", str(tmp_path / "warm.db"))
+    monkeypatch.setenv("HISTORY_PATH", str(tmp_path / "history.db"))
+    monkeypatch.setenv("LOCAL_INDEX_PATH", str(tmp_path / "local_index.jsonl"))
+    monkeypatch.setenv("TOPIC_SYNONYMS_PATH", str(tmp_path / "synonyms.json"))
+    _clear_caches()
+    yield
+    _clear_caches()
+
+
+@pytest.fixture
+def llm_service(stub_server, monkeypatch) -> Iterator[Callable[..., Tuple[LLMService, FastAPI, FastAPI]]]:
+    """
+    创建LLMService的工厂：GPT和DeepSeek各指向一个桩服务
+
+    返回 (LLMService, GPT桩服务应用, DeepSeek桩服务应用)，桩服务应用的 state.stats 记录收到的请求
+    """
+
+    def create(
+        gpt: StubConfig,
+        deepseek: StubConfig,
+        hedge_delay: Optional[float] = None
+    ) -> Tuple[LLMService, FastAPI, FastAPI]:
+        gpt_url, gpt_app = stub_server(gpt)
+        deepseek_url, deepseek_app = stub_server(deepseek)
+        monkeypatch.setenv("LLM_BACKEND", "openai")
+        monkeypatch.setenv("OPENAI_API_KEY", "test")
+        monkeypatch.setenv("DEEPSEEK_API_KEY", "test")
+        monkeypatch.setenv("OPENAI_BASE_URL", gpt_url)
+        monkeypatch.setenv("DEEPSEEK_BASE_URL", deepseek_url)
+        monkeypatch.setenv("SCHEDULER_RATE_LIMITS", "")
+        if hedge_delay is not None:
+            monkeypatch.setenv("LLM_HEDGE_DELAY", str(hedge_delay))
+        _clear_caches()
+        return LLMService(), gpt_app, deepseek_app
+
+    yield create
+
+    _clear_caches()
@@ -0,0 +1,19 @@
+"""
+合成大模型回复测试
+"""
+
+import pytest
+
+from app.backends.canned import extract_topic
+from app.services.llm_service import LLMService
+
+
+@pytest.mark.parametrize("language", ["zh", "en"])
+def test_extract_topic_from_expansion_prompt(offline_backends, language):
+    prompt = LLMService()._build_topic_expansion_prompt("retrieval augmented generation", language)
+
+    assert extract_topic(prompt) == "retrieval augmented generation"
+
+
+def test_extract_topic_from_quoted_prompt():
+    assert extract_topic('用户想要了解关于"vector database"的相关资源') == "vector database"
@@ -0,0 +1,61 @@
+"""
+增量重排序测试
+"""
+
+import asyncio
+
+from app.models.result_record import ResultRecord, ResultSet
+from app.services.reranker_service import EARLY_SCORING_FACTOR, RerankerService
+
+
+def make_results(count: int, prefix: str = "r"):
+    return [
+        ResultRecord.create(
+            title=f"{prefix}{i} vector database guide",
+            url=f"https://example.com/{prefix}{i}",
+            content="vector database indexing and retrieval " * (i + 1),
+            score=0.5,
+            source="web",
+        )
+        for i in range(count)
+    ]
+
+
+def test_only_results_surviving_truncation_are_ranked(offline_backends):
+    target = 2
+    early = make_results(target * EARLY_SCORING_FACTOR + 3)
+
+    async def scenario():
+        reranker = RerankerService().incremental("vector database", target, "rule_based")
+        reranker.submit(early)
+        # 搜索截断后只保留了一个提前评分的结果和两个未提前评分的结果
+        kept = [early[0], early[-1], early[-2]]
+        ranked = await reranker.ranked_results(
+            ResultSet(query="vector database", results=kept, total_count=len(kept), search_time=0.0),
+            timeout=5
+        )
+        return reranker, kept, ranked
+
+    reranker, kept, ranked = asyncio.run(scenario())
+
+    assert len(ranked.results) == target
+    assert {result.url for result in ranked.results} <= {result.url for result in kept}
+    stats = ranked.filters_applied["incremental_rerank"]
+    assert stats["deferred"] == 3
+    assert stats["scored"] == target * EARLY_SCORING_FACTOR + 2
+    assert stats["discarded"] == target * EARLY_SCORING_FACTOR - 1
+
+
+def test_snapshot_breaks_ties_by_arrival_order(offline_backends):
+    class Score:
+        def __init__(self, total_score: float):
+            self.total_score = total_score
+
+    results = make_results(4)
+    reranker = RerankerService().incremental("vector database", 3, "rule_based")
+    for result, total in zip(results, [0.5, 0.9, 0.5, 0.5]):
+        reranker._push(result, Score(total))
+
+    ranked = [result.url for result, _ in reranker.snapshot(list(reversed(results)))]
+
+    assert ranked == [results[1].url, results[0].url, results[2].url]
@@ -0,0 +1,139 @@
+"""
+LLM路由测试
+LLMService通过真实的OpenAI客户端调用本地桩服务，覆盖故障转移、对冲请求、限流冷却和路由顺序
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.services.llm_router import FAILURE_THRESHOLD, PROVIDER_MODELS
+from app.utils import APIException
+from benchmarks.llm_stub import StubConfig
+
+
+FAST = "fixed:0.01"
+
+
+def failing(code: int, **kwargs) -> StubConfig:
+    """每次请求都返回指定错误码的桩服务配置"""
+    return StubConfig(latency=FAST, tokens_per_second=0, error_rate=1.0, error_codes=[code], seed=1, **kwargs)
+
+
+def healthy(latency: str = FAST) -> StubConfig:
+    return StubConfig(latency=latency, tokens_per_second=0, seed=1)
+
+
+def requests_for(app, provider: str) -> int:
+    return app.state.stats.by_model[PROVIDER_MODELS[provider]]
+
+
+def test_fails_over_on_server_error(llm_service):
+    service, gpt, deepseek = llm_service(gpt=failing(503), deepseek=healthy())
+
+    content = asyncio.run(service._call_llm("gpt", "hello"))
+
+    assert content
+    # 生成调用非幂等：5xx不在同一提供商重试，直接故障转移
+    assert requests_for(gpt, "gpt") == 1
+    assert requests_for(deepseek, "deepseek") == 1
+
+
+def test_no_failover_on_client_error(llm_service):
+    service, gpt, deepseek = llm_service(gpt=failing(400), deepseek=healthy())
+
+    with pytest.raises(APIException):
+        asyncio.run(service._call_llm("gpt", "hello"))
+
+    assert requests_for(deepseek, "deepseek") == 0
+
+
+def test_all_providers_failing_raises(llm_service):
+    service, gpt, deepseek = llm_service(gpt=failing(503), deepseek=failing(500))
+
+    with pytest.raises(APIException):
+        asyncio.run(service._call_llm("deepseek", "hello"))
+
+    assert requests_for(gpt, "gpt") == 1
+    assert requests_for(deepseek, "deepseek") == 1
+
+
+def test_rate_limit_honours_retry_after_and_marks_provider(llm_service):
+    service, gpt, deepseek = llm_service(gpt=failing(429, retry_after=0.5), deepseek=healthy())
+
+    start = time.monotonic()
+    content = asyncio.run(service._call_llm("gpt", "hello"))
+    elapsed = time.monotonic() - start
+
+    assert content
+    # 429按Retry-After等待后重试一次（gpt最多尝试2次），仍限流则故障转移
+    assert requests_for(gpt, "gpt") == 2
+    assert elapsed >= 0.5
+    assert requests_for(deepseek, "deepseek") == 1
+    # 限流期间gpt不再优先路由
+    assert not service.router.stats["gpt"].is_healthy(time.monotonic())
+    assert service.router.route("auto") == ["deepseek", "gpt"]
+
+
+def test_hedge_starts_backup_immediately_when_primary_fails(llm_service):
+    service, gpt, deepseek = llm_service(gpt=failing(503), deepseek=healthy(), hedge_delay=5.0)
+
+    start = time.monotonic()
+    content = asyncio.run(service._call_llm("gpt", "hello", hedge=True))
+
+    assert content
+    assert time.monotonic() - start < 2.0
+    assert requests_for(gpt, "gpt") == 1
+    assert requests_for(deepseek, "deepseek") == 1
+
+
+def test_hedge_after_delay_takes_first_result(llm_service):
+    service, gpt, deepseek = llm_service(gpt=healthy("fixed:2.0"), deepseek=healthy(), hedge_delay=0.2)
+
+    start = time.monotonic()
+    content = asyncio.run(service._call_llm("gpt", "hello", hedge=True))
+
+    assert content
+    assert time.monotonic() - start < 1.5
+    assert requests_for(deepseek, "deepseek") == 1
+    # 慢的主请求被取消，不计入延迟统计
+    assert len(service.router.stats["deepseek"].latencies) == 1
+    assert not service.router.stats["gpt"].latencies
+
+
+def test_auto_routes_to_fastest_healthy_provider(llm_service):
+    service, gpt, deepseek = llm_service(gpt=healthy("fixed:0.3"), deepseek=healthy())
+
+    async def scenario():
+        # 无样本的提供商优先探测
+        await service._call_llm("gpt", "hello")
+        await service._call_llm("deepseek", "hello")
+        assert service.router.route("auto") == ["deepseek", "gpt"]
+        assert service.resolve_model("auto") == "deepseek"
+        assert service.resolve_model("gpt") == "gpt"
+        await service._call_llm("auto", "hello")
+
+    asyncio.run(scenario())
+
+    assert requests_for(gpt, "gpt") == 1
+    assert requests_for(deepseek, "deepseek") == 2
+    assert service.router.route("gpt") == ["gpt", "deepseek"]
+    assert service.router.route("gpt", failover=False) == ["gpt"]
+    assert service.router.route("unknown") == []
+
+
+def test_repeated_failures_cool_down_provider(llm_service):
+    service, gpt, deepseek = llm_service(gpt=healthy(), deepseek=failing(503))
+
+    async def scenario():
+        for _ in range(FAILURE_THRESHOLD):
+            await service._call_llm("deepseek", "hello")
+
+    asyncio.run(scenario())
+
+    assert requests_for(deepseek, "deepseek") == FAILURE_THRESHOLD
+    assert requests_for(gpt, "gpt") == FAILURE_THRESHOLD
+    # 连续失败后进入冷却期，即使延迟更低也排在健康的提供商之后
+    assert not service.router.stats["deepseek"].is_healthy(time.monotonic())
+    assert service.router.route("auto") == ["gpt", "deepseek"]
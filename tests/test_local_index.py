@@ -0,0 +1,54 @@
+"""
+本地搜索索引测试
+"""
+
+import threading
+
+from app.models import ResultRecord
+from app.services.local_index import LocalIndex
+
+
+def make_record(i: int, content: str = "vector database indexing") -> ResultRecord:
+    return ResultRecord.create(
+        title=f"vector database {i}", url=f"https://github.com/example/repo-{i}",
+        content=content, score=0.5, source="github",
+    )
+
+
+def test_index_is_restored_from_file(tmp_path):
+    path = str(tmp_path / "index.jsonl")
+    index = LocalIndex(path)
+    index.add_results([make_record(i) for i in range(3)])
+    # 内容更新多次后触发压缩，重放结果与内存一致
+    for version in range(5):
+        index.add_results([make_record(0, f"vector database version {version}")])
+
+    restored = LocalIndex(path)
+
+    assert len(restored) == 3
+    assert restored.search("version 4", max_results=1)[0].url == "https://github.com/example/repo-0"
+    with open(path, encoding="utf-8") as f:
+        assert sum(1 for _ in f) <= 2 * len(restored)
+
+
+def test_search_does_not_wait_for_file_writes(tmp_path, monkeypatch):
+    index = LocalIndex(str(tmp_path / "index.jsonl"))
+    writing = threading.Event()
+    release = threading.Event()
+    write = index._write
+
+    def slow_write(documents, mode):
+        writing.set()
+        release.wait(5)
+        write(documents, mode)
+
+    monkeypatch.setattr(index, "_write", slow_write)
+    writer = threading.Thread(target=index.add_results, args=([make_record(1)],))
+    writer.start()
+    try:
+        assert writing.wait(5)
+        # 文件写入进行中时检索立即返回，并能看到已加入内存的文档
+        assert [r.url for r in index.search("vector database")] == ["https://github.com/example/repo-1"]
+    finally:
+        release.set()
+        writer.join()
@@ -0,0 +1,28 @@
+"""
+重试策略测试
+"""
+
+import pytest
+from tavily.errors import BadRequestError, ForbiddenError, InvalidAPIKeyError, UsageLimitExceededError
+
+from app.utils.retry import get_status_code, is_retryable_error
+
+
+def test_tavily_usage_limit_is_rate_limit():
+    error = UsageLimitExceededError("usage limit exceeded")
+
+    assert get_status_code(error) == 429
+    assert is_retryable_error(error)
+    assert is_retryable_error(error, idempotent=False)
+
+
+@pytest.mark.parametrize("error_class, status", [
+    (BadRequestError, 400),
+    (InvalidAPIKeyError, 401),
+    (ForbiddenError, 403),
+])
+def test_tavily_client_errors_are_not_retried(error_class, status):
+    error = error_class("rejected")
+
+    assert get_status_code(error) == status
+    assert not is_retryable_error(error)
@@ -0,0 +1,48 @@
+"""
+外部调用调度测试
+"""
+
+import asyncio
+
+from app.utils.scheduler import CallScheduler
+
+
+def make_scheduler() -> CallScheduler:
+    # 每分钟600次、容量1个令牌：第二次调用需要排队约0.1秒
+    return CallScheduler({"tavily": 600}, burst=0.0, weights={}, max_queue=8)
+
+
+def test_dispatch_survives_event_loop_change():
+    scheduler = make_scheduler()
+
+    async def leave_queued_call():
+        await scheduler.acquire("tavily")
+        waiting = asyncio.create_task(scheduler.acquire("tavily"))
+        await asyncio.sleep(0)
+        # 定时器已安排，循环在令牌补充前结束
+        assert scheduler.providers["tavily"]._timer is not None
+        waiting.cancel()
+
+    async def acquire_twice():
+        await scheduler.acquire("tavily")
+        await asyncio.wait_for(scheduler.acquire("tavily"), timeout=2)
+
+    asyncio.run(leave_queued_call())
+    asyncio.run(acquire_twice())
+
+
+def test_close_cancels_timer_and_waiters():
+    scheduler = make_scheduler()
+
+    async def scenario():
+        await scheduler.acquire("tavily")
+        waiting = asyncio.create_task(scheduler.acquire("tavily"))
+        await asyncio.sleep(0)
+        scheduler.close()
+        provider = scheduler.providers["tavily"]
+        assert provider._timer is None
+        assert provider.queued == 0
+        outcome = (await asyncio.gather(waiting, return_exceptions=True))[0]
+        assert isinstance(outcome, asyncio.CancelledError)
+
+    asyncio.run(scenario())
@@ -0,0 +1,34 @@
+"""
+主题规范化测试
+"""
+
+import pytest
+
+from app.services.topic_canonicalizer import TopicCanonicalizer
+
+
+@pytest.fixture
+def canonicalizer():
+    return TopicCanonicalizer()
+
+
+@pytest.mark.parametrize("left, right", [
+    ("Vue.js", "vue js"),
+    ("VUE.js 前端开发", "vue frontend development"),
+    ("Go语言", "golang"),
+    ("Go 语言", "Go"),
+    ("Web开发", "web development"),
+    ("视觉 Transformer", "ViT"),
+    ("diffusion models", "扩散模型"),
+])
+def test_equivalent_topics_share_key(canonicalizer, left, right):
+    assert canonicalizer.canonicalize(left).key == canonicalizer.canonicalize(right).key
+
+
+@pytest.mark.parametrize("word", ["news", "series", "physics", "analysis", "corpus"])
+def test_words_ending_in_s_are_not_singularized(canonicalizer, word):
+    assert canonicalizer.canonicalize(word).key == word
+
+
+def test_mixed_alias_requires_whole_latin_word(canonicalizer):
+    assert "golang" not in canonicalizer.canonicalize("cargo语言").terms
@@ -0,0 +1,38 @@
+"""
+预热存储测试
+"""
+
+import asyncio
+
+from app.services.intelligent_search_service import IntelligentSearchService
+from app.services.search_service import SearchService
+from app.services.warm_store import collect_outputs, get_warm_store
+
+
+def test_partial_outputs_keep_original_source(offline_backends, monkeypatch):
+    async def single_query(self, topic, academic_only=True):
+        return [topic]
+
+    # 每个搜索调用只执行一个查询，记录的搜索结果即返回的结果
+    monkeypatch.setattr(SearchService, "_generate_search_queries", single_query)
+    call = {"query": "vector database", "search_type": "github_repos", "max_results": 5}
+
+    async def scenario():
+        service = IntelligentSearchService()
+        with collect_outputs() as outputs:
+            first = await service._execute_search_call(call)
+        # 模拟被取消的生成任务保存已完成的搜索，下一次请求从预热存储复用
+        get_warm_store().save_outputs(outputs)
+        second = await service._execute_search_call(call)
+        third = await service._execute_search_call(call)
+        return outputs, first, second, third
+
+    outputs, first, second, third = asyncio.run(scenario())
+
+    recorded = [record for records in outputs.searches.values() for record in records]
+    assert recorded
+    assert not any(record.source.endswith("_github_repos") for record in recorded)
+    assert first.results
+    assert all(result.source.count("_github_repos") == 1 for result in first.results)
+    assert [r.source for r in second.results] == [r.source for r in first.results]
+    assert [r.source for r in third.results] == [r.source for r in first.results]